@@ -0,0 +1,1604 @@
+#!/usr/bin/env python
+# encoding: utf-8
+r"""
+visitoolkit_psc2alm\benchmark.py
+
+Benchmarks for hot paths of "psc2alm.py"
+(run it from project root: "python -m visitoolkit_psc2alm.benchmark")
+
+Benchmark "suite" doesn't need a ProMoS NT installation:
+it generates a synthetic project (PSC images and DMS datapoints)
+and uses an in-process stand-in for the DMS JSON Data Exchange.
+
+Copyright (C) 2018 Stefan Braun
+
+
+This program is free software: you can redistribute it and/or modify it under the terms of the
+GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with this program.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from visitoolkit_psc2alm import psc2alm
+from visitoolkit_connector import connector
+import argparse
+import asyncio
+import bisect
+import collections
+import contextlib
+import gc
+import io
+import json
+import logging
+import os
+import platform
+import queue
+import random
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+
+
+def generate_bmo_instances(nof_instances):
+    # synthetic DMS tree: PLC / plant / BMO instance
+    # (every 10th plant node is itself an OBJECT, so nested BMO instances are covered too)
+    bmo_instances = []
+    for x in range(nof_instances):
+        plant = 'MSR' + str(x // 1000).zfill(2) + ':H' + str((x // 10) % 100).zfill(2)
+        if x % 10 == 0:
+            bmo_instances.append(plant)
+        bmo_instances.append(plant + ':Bmo' + str(x).zfill(5))
+    return bmo_instances
+
+
+def generate_alm_datapoints(bmo_instances, nof_alarms_per_instance=2):
+    alm_dps = []
+    for bmo_instance in bmo_instances:
+        for x in range(nof_alarms_per_instance):
+            alm_dps.append(bmo_instance + ':Alm' + str(x).zfill(2))
+    # some ALM datapoints without OBJECT
+    alm_dps.append('MSR99:H99:Orphan:Alm00')
+    return alm_dps
+
+
+def _legacy_matching(bmo_instances, alm_dps):
+    # matching as done before BMO_instance_index() existed (O(#objects x #alarms))
+    result_dict = dict.fromkeys(alm_dps)
+    for bmo_instance in bmo_instances:
+        for alm in result_dict:
+            if bmo_instance in alm:
+                result_dict[alm] = bmo_instance
+    return result_dict
+
+
+def _indexed_matching(bmo_instances, alm_dps):
+    bmo_index = psc2alm.BMO_instance_index()
+    for bmo_instance in bmo_instances:
+        bmo_index.add(bmo_instance)
+    result_dict = {}
+    for alm in alm_dps:
+        result_dict[alm] = bmo_index.lookup(alm)
+    return result_dict
+
+
+def _check_legacy_rule():
+    # cases where matching by whole DMS path segments (nearest OBJECT) would give other answers than legacy matching:
+    # (BMO instances in order returned by DMS, ALM datapoint, expected BMO instance)
+    cases = [(['MSR01:H01', 'H01:Uwp'], 'MSR01:H01:Uwp:Stoer', 'H01:Uwp'),
+             (['MSR01:H1'], 'MSR01:H10:Uwp:Stoer', 'MSR01:H1'),
+             (['MSR01:H02:Uwp', 'MSR01:H02'], 'MSR01:H02:Uwp:Stoer', 'MSR01:H02'),
+             (['MSR01:H02', 'MSR01:H02:Uwp'], 'MSR01:H02:Uwp:Stoer', 'MSR01:H02:Uwp'),
+             (['Uwp', 'MSR01:H03:Uwp'], 'MSR01:H03:Uwp:Stoer', 'MSR01:H03:Uwp'),
+             (['MSR01:H03:Uwp', 'Uwp'], 'MSR01:H03:Uwp:Stoer', 'Uwp'),
+             (['MSR01:H04'], 'MSR02:H04:Uwp:Stoer', None)]
+    for bmo_instances, alm, expected in cases:
+        assert _legacy_matching(bmo_instances, [alm])[alm] == expected
+        assert _indexed_matching(bmo_instances, [alm])[alm] == expected, \
+            'BMO_instance_index(): "' + alm + '" does not belong to "' + str(expected) + '"!'
+
+    # removing the winning OBJECT: former match is used again
+    bmo_index = psc2alm.BMO_instance_index()
+    for bmo_instance in ['MSR01:H05', 'H05:Uwp', 'MSR01:H05:Uwp']:
+        bmo_index.add(bmo_instance)
+    assert bmo_index.lookup('MSR01:H05:Uwp:Stoer') == 'MSR01:H05:Uwp'
+    bmo_index.discard('MSR01:H05:Uwp')
+    assert bmo_index.lookup('MSR01:H05:Uwp:Stoer') == 'H05:Uwp'
+    bmo_index.discard('H05:Uwp')
+    assert bmo_index.lookup('MSR01:H05:Uwp:Stoer') == 'MSR01:H05'
+    bmo_index.discard('MSR01:H05')
+    assert bmo_index.lookup('MSR01:H05:Uwp:Stoer') is None and len(bmo_index) == 0
+
+
+def bench_bmo_index(sizes, legacy_limit=2000):
+    # scaling of OBJECT-to-ALM matching in ALM_datapoint.collect():
+    # duration per ALM datapoint should stay nearly constant when size grows
+    print('BMO_instance_index: OBJECT-to-ALM matching')
+    _check_legacy_rule()
+    print('\t{:>10} {:>10} {:>12} {:>14} {:>12}'.format('objects', 'alarms', 'indexed [s]', 'per alarm [us]', 'legacy [s]'))
+    for size in sizes:
+        bmo_instances = generate_bmo_instances(size)
+        alm_dps = generate_alm_datapoints(bmo_instances)
+
+        start = time.perf_counter()
+        indexed_dict = _indexed_matching(bmo_instances, alm_dps)
+        indexed_secs = time.perf_counter() - start
+
+        legacy_str = '-'
+        if size <= legacy_limit:
+            start = time.perf_counter()
+            legacy_dict = _legacy_matching(bmo_instances, alm_dps)
+            legacy_str = '{:.3f}'.format(time.perf_counter() - start)
+            assert indexed_dict == legacy_dict, 'BMO_instance_index() returned different results than legacy matching!'
+
+        print('\t{:>10} {:>10} {:>12.3f} {:>14.2f} {:>12}'.format(len(bmo_instances),
+                                                                 len(alm_dps),
+                                                                 indexed_secs,
+                                                                 indexed_secs / len(alm_dps) * 1e6,
+                                                                 legacy_str))
+
+
+def write_psc_file(fullpath, bmo_instances, link_targets, is_general=False, nof_other_records=20):
+    # synthetic PSC image: BMO instances as "LIB" records and as buttons with reinit,
+    # links to other PSC images as buttons without reinit,
+    # padded with graphical records which are ignored by psc2alm
+    with open(fullpath, mode='w', encoding='cp1252') as f:
+        if is_general:
+            f.write('LIB;Alarm01.plb;Alarm01;System:Alarm;BMO:Alarm01;10;10;0\n')
+        for idx, bmo_inst in enumerate(bmo_instances):
+            for x in range(nof_other_records):
+                f.write('TXT;Label ' + str(x) + ';' + str(idx * 10) + ';' + str(x * 12) + ';80;12;Arial;8;0;0\n')
+            if idx % 4 == 3:
+                f.write('IBW;BMO Popup.psc;' + str(idx) + ';10;20;20;BMO:Popup;' + bmo_inst + ';\n')
+            else:
+                f.write('LIB;Pump 01.plb;Pump;' + bmo_inst + ';BMO:Pump;' + str(idx * 10) + ';20;0\n')
+        for idx, target in enumerate(link_targets):
+            f.write('IBW;' + target + ';' + str(idx) + ';500;40;20;;Link\n')
+
+
+def _legacy_parse_psc_file(fullpath):
+    # parsing as done before _parse_psc_file() was streaming line by line:
+    # whole file in memory, patterns compiled for every file, one regex pass per pattern
+    psc_result = psc2alm.PSC_fileresult(fullpath)
+    with open(fullpath, mode='r', encoding='cp1252') as f:
+        psc_content = f.read()
+    patterns = [re.compile(r'LIB;[\w\s]+\.plb;\w+;([\w:]+);BMO:.+'),
+                re.compile(r'IBW;[\w\s]+\.*\w*;\d+;\d+;\d+;\d+;BMO[\w:]+;([\w:]+);')]
+    found_bmo_instances = collections.OrderedDict()
+    for pattern in patterns:
+        for bmo_inst in pattern.findall(psc_content):
+            found_bmo_instances[bmo_inst] = None
+            psc_result.keystats.update_statistic(bmo_inst)
+    psc_result.bmo_instances = list(found_bmo_instances)
+    psc_result.link_targets = re.compile(r'IBW;([\w\s]+\.*\w*);\d+;\d+;\d+;\d+;;').findall(psc_content)
+    if 'LIB;Alarm01.plb;Alarm01;' in psc_content or 'LIB;BATT01_LED.plb;BATT01;' in psc_content:
+        psc_result.is_general = True
+    return psc_result
+
+
+def bench_psc_parser(sizes_mb, nof_rounds=3):
+    # parsing speed of one PSC file in _parse_psc_file() compared to legacy whole-file parsing
+    print('_parse_psc_file(): parsing speed per MB')
+    print('\t{:>10} {:>16} {:>16} {:>10}'.format('size [MB]', 'block [s/MB]', 'legacy [s/MB]', 'speedup'))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size_mb in sizes_mb:
+            fullpath = os.path.join(tmpdir, 'BENCH.PSC')
+            # one BMO instance with its padding records is roughly 1.1kB
+            nof_instances = int(size_mb * 1024 * 1024 / 1100)
+            bmo_instances = generate_bmo_instances(nof_instances)[:nof_instances]
+            write_psc_file(fullpath, bmo_instances, ['P' + str(x).zfill(4) + '.psc' for x in range(nof_instances // 10)])
+            real_size_mb = os.path.getsize(fullpath) / (1024 * 1024)
+
+            durations = {}
+            for name, func in [('block', psc2alm._parse_psc_file), ('legacy', _legacy_parse_psc_file)]:
+                best_secs = None
+                for x in range(nof_rounds):
+                    start = time.perf_counter()
+                    psc_result = func(fullpath)
+                    curr_secs = time.perf_counter() - start
+                    if best_secs is None or curr_secs < best_secs:
+                        best_secs = curr_secs
+                durations[name] = (best_secs, psc_result)
+
+            block_result = durations['block'][1]
+            legacy_result = durations['legacy'][1]
+            assert block_result.as_dict() == legacy_result.as_dict(), '_parse_psc_file() returned different results than legacy parsing!'
+            print('\t{:>10.2f} {:>16.4f} {:>16.4f} {:>9.2f}x'.format(real_size_mb,
+                                                                     durations['block'][0] / real_size_mb,
+                                                                     durations['legacy'][0] / real_size_mb,
+                                                                     durations['legacy'][0] / durations['block'][0]))
+
+
+def _legacy_filelist(path):
+    # PSC discovery before PSC_discovery: listdir() with isfile() and regex search on every entry
+    for entry in os.listdir(path):
+        fullpath = os.path.join(path, entry)
+        if os.path.isfile(fullpath):
+            if re.search(r'.*\.PSC', entry, re.IGNORECASE):
+                yield fullpath
+
+
+def bench_discovery(sizes, nof_rounds=3):
+    # discovery of PSC files alone (without parsing) in a folder with given number of entries:
+    # 80% PSC files, 20% other files (e.g. bitmaps), plus subfolders with same content for recursive scan
+    print('PSC_discovery: listing of PSC folder')
+    print('\t{:>8} {:>8} {:>12} {:>12} {:>12} {:>14}'.format('entries', 'PSC', 'legacy', 'scandir', 'first [ms]', 'recursive'))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in sizes:
+            psc_path = os.path.join(tmpdir, 'scr' + str(size))
+            for sub_path in [psc_path, os.path.join(psc_path, 'sub1'), os.path.join(psc_path, 'sub2')]:
+                os.makedirs(sub_path)
+                for x in range(size):
+                    filename = 'P' + str(x).zfill(5) + ('.psc' if x % 5 else '.bmp')
+                    with open(os.path.join(sub_path, filename), mode='w') as f:
+                        f.write('')
+
+            psc_discovery = psc2alm.PSC_discovery()
+            recursive_discovery = psc2alm.PSC_discovery(recursive=True)
+            durations = collections.defaultdict(list)
+            for x in range(nof_rounds):
+                for name, func in [('legacy', lambda: list(_legacy_filelist(psc_path))),
+                                   ('scandir', lambda: [entry.path for entry in psc_discovery.scan(psc_path)]),
+                                   ('first', lambda: next(psc_discovery.scan(psc_path))),
+                                   ('recursive', lambda: [entry.path for entry in recursive_discovery.scan(psc_path)])]:
+                    start = time.perf_counter()
+                    result = func()
+                    durations[name].append(time.perf_counter() - start)
+                    if name == 'scandir':
+                        nof_psc = len(result)
+            assert sorted(_legacy_filelist(psc_path)) == sorted(entry.path for entry in psc_discovery.scan(psc_path)), 'PSC_discovery found other PSC files than legacy listing!'
+            print('\t{:>8} {:>8} {:>12.4f} {:>12.4f} {:>12.3f} {:>14.4f}'.format(size,
+                                                                               nof_psc,
+                                                                               min(durations['legacy']),
+                                                                               min(durations['scandir']),
+                                                                               min(durations['first']) * 1000,
+                                                                               min(durations['recursive'])))
+    _check_recursive_names()
+    print('\t(PSC files with same filename in subfolders: names and links are relative to PSC folder)')
+    _check_scan_errors()
+    print('\t(unreadable subfolder is skipped, other PSC files are found)')
+
+
+def _check_scan_errors():
+    # listing of one subfolder fails (as without permission on a network share)
+    with tempfile.TemporaryDirectory() as psc_path:
+        for sub_path in ['sub1', 'locked', os.path.join('locked', 'sub2')]:
+            os.makedirs(os.path.join(psc_path, sub_path))
+        for filename in ['A.psc', os.path.join('sub1', 'B.psc'), os.path.join('locked', 'C.psc'), os.path.join('locked', 'sub2', 'D.psc')]:
+            write_psc_file(os.path.join(psc_path, filename), [], [])
+
+        prev_scandir = os.scandir
+        def scandir(path):
+            if os.path.basename(path) == 'locked':
+                raise PermissionError(13, 'Permission denied', path)
+            return prev_scandir(path)
+        os.scandir = scandir
+        loglevel = psc2alm.logger.level
+        psc2alm.logger.setLevel(logging.ERROR)
+        try:
+            found_list = sorted(os.path.relpath(entry.path, psc_path) for entry in psc2alm.PSC_discovery(recursive=True).scan(psc_path))
+        finally:
+            os.scandir = prev_scandir
+            psc2alm.logger.setLevel(loglevel)
+        assert found_list == sorted(['A.psc', os.path.join('sub1', 'B.psc')]), 'PSC_discovery did not skip unreadable subfolder: ' + repr(found_list)
+
+
+def _check_recursive_names():
+    # same filenames in PSC folder and in a subfolder, links are resolved in folder of linking PSC file
+    with tempfile.TemporaryDirectory() as project_path:
+        scr_path = os.path.join(project_path, 'scr')
+        os.makedirs(os.path.join(scr_path, 'sub1'))
+        for name, bmo_instances, link_targets in [('A.psc', ['MSR01:H001:Bmo00'], ['B.psc']),
+                                                  ('B.psc', ['MSR01:H002:Bmo00'], []),
+                                                  (os.path.join('sub1', 'A.psc'), ['MSR01:H003:Bmo00'], ['B.psc', 'B.psc']),
+                                                  (os.path.join('sub1', 'B.psc'), ['MSR01:H004:Bmo00'], ['A.psc'])]:
+            write_psc_file(os.path.join(scr_path, name), bmo_instances, link_targets)
+        psc_analyzer = psc2alm.PSC_Analyzer(project_path, bmo_version=psc2alm.BMO_VERSION_1, psc_discovery=psc2alm.PSC_discovery(recursive=True))
+        loglevel = psc2alm.logger.level
+        psc2alm.logger.setLevel(logging.WARNING)
+        try:
+            psc_analyzer.analyze()
+        finally:
+            psc2alm.logger.setLevel(loglevel)
+        screens_dict = {bmo_instance: psc_analyzer.get_psc_name(psc_fullpath) for bmo_instance, psc_fullpath in psc_analyzer.get_psc_mapping().items()}
+        assert screens_dict == {'MSR01:H001:Bmo00': 'A.psc',
+                                'MSR01:H002:Bmo00': 'B.psc',
+                                'MSR01:H003:Bmo00': os.path.join('sub1', 'A.psc'),
+                                'MSR01:H004:Bmo00': os.path.join('sub1', 'B.psc')}, 'PSC files in subfolders got wrong names: ' + repr(screens_dict)
+        assert psc_analyzer.get_link_graph().get_indegrees() == {'A.psc': 0,
+                                                                 'B.psc': 1,
+                                                                 os.path.join('sub1', 'A.psc'): 1,
+                                                                 os.path.join('sub1', 'B.psc'): 2}, 'links between PSC files in subfolders are mixed up!'
+
+
+def bench_parallel(sizes, nof_workers=4):
+    # PSC_Analyzer.analyze() with one worker compared with "nof_workers" processes and threads:
+    # parallel scans have to give exactly the same result as the sequential scan
+    print('PSC_Analyzer: sequential and parallel scan (' + str(nof_workers) + ' workers)')
+    print('\t{:>8} {:>12} {:>12} {:>12} {:>8}'.format('files', 'sequential', 'processes', 'threads', 'equal'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as project_path:
+                generate_project(project_path, size)
+                durations = {}
+                results_dict = {}
+                for name, curr_nof_workers, use_threads in [('sequential', 1, False),
+                                                            ('processes', nof_workers, False),
+                                                            ('threads', nof_workers, True)]:
+                    psc_analyzer = psc2alm.PSC_Analyzer(project_path, bmo_version=psc2alm.BMO_VERSION_1)
+                    start = time.perf_counter()
+                    psc_analyzer.analyze(nof_workers=curr_nof_workers, use_threads=use_threads)
+                    durations[name] = time.perf_counter() - start
+                    # (link graph contains order of PSC files and all links, mapping contains the choice of PSC files)
+                    results_dict[name] = (psc_analyzer.get_psc_mapping(), psc_analyzer.get_link_graph().as_dict())
+                for name in ('processes', 'threads'):
+                    assert results_dict[name] == results_dict['sequential'], 'parallel scan with ' + name + ' returned different results than sequential scan!'
+                print('\t{:>8} {:>12.3f} {:>12.3f} {:>12.3f} {:>8}'.format(size,
+                                                                           durations['sequential'],
+                                                                           durations['processes'],
+                                                                           durations['threads'],
+                                                                           'True'))
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+
+def _analyze_with_cache(project_path, psc_cache):
+    # returns (result of PSC_Analyzer, number of parsed PSC files, duration)
+    metrics = psc2alm.Run_metrics()
+    psc_analyzer = psc2alm.PSC_Analyzer(project_path, metrics=metrics, bmo_version=psc2alm.BMO_VERSION_1)
+    start = time.perf_counter()
+    psc_analyzer.analyze(psc_cache=psc_cache)
+    secs = time.perf_counter() - start
+    result = (psc_analyzer.get_psc_mapping(), psc_analyzer.get_link_graph().as_dict())
+    return result, metrics.as_dict()['counters'].get('files_parsed', 0), secs
+
+
+def bench_cache(sizes):
+    # PSC_cache: cold run (all PSC files parsed), warm run (none parsed) and run after changes of 3 PSC files:
+    # -"touch": only modification time changed
+    # -"size": content with same facts, but other size
+    # -"facts": PSC file with other BMO instances
+    # then PSC_sharedcache of batch mode with a copy of the project (same content is parsed only once);
+    # every run has to give the same result as an uncached run
+    print('PSC_cache: parsed PSC files and duration of analyze()')
+    print('\t{:>8} {:>14} {:>14} {:>14} {:>14} {:>8}'.format('files', 'uncached [s]', 'cold [s]', 'warm [s]', 'changed [s]', 'parsed'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                project_path = os.path.join(tmpdir, 'project')
+                generate_project(project_path, size)
+                cache_fullpath = os.path.join(project_path, 'cfg', 'PSC_to_ALM_Mapper_cache.json')
+                reference, nof_parsed, uncached_s = _analyze_with_cache(project_path, None)
+                assert nof_parsed == size, 'uncached run parsed ' + str(nof_parsed) + ' of ' + str(size) + ' PSC files!'
+
+                psc_cache = psc2alm.PSC_cache(cache_fullpath)
+                result, nof_parsed, cold_s = _analyze_with_cache(project_path, psc_cache)
+                assert (nof_parsed, psc_cache.nof_hits, psc_cache.nof_misses) == (size, 0, size), 'cold PSC_cache: unexpected parse count!'
+                assert result == reference, 'cold PSC_cache returned different results than uncached run!'
+
+                psc_cache = psc2alm.PSC_cache(cache_fullpath)
+                result, nof_parsed, warm_s = _analyze_with_cache(project_path, psc_cache)
+                assert (nof_parsed, psc_cache.nof_hits, psc_cache.nof_misses) == (0, size, 0), 'warm PSC_cache: unexpected parse count!'
+                assert result == reference, 'warm PSC_cache returned different results than uncached run!'
+
+                scr_path = os.path.join(project_path, 'scr')
+                fullpaths = sorted(os.path.join(scr_path, filename) for filename in os.listdir(scr_path))
+                touch_fullpath, size_fullpath, facts_fullpath = fullpaths[1], fullpaths[2], fullpaths[3]
+                stat = os.stat(touch_fullpath)
+                os.utime(touch_fullpath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+                stat = os.stat(size_fullpath)
+                with open(size_fullpath, mode='a', encoding='cp1252') as f:
+                    f.write('TXT;Label;0;0;80;12;Arial;8;0;0\n')
+                # (same modification time: only the size shows the change)
+                os.utime(size_fullpath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                write_psc_file(facts_fullpath, ['MSR99:H999:Bmo' + str(x).zfill(2) for x in range(10)], [os.path.basename(fullpaths[0])])
+                reference, nof_parsed, uncached_changed_s = _analyze_with_cache(project_path, None)
+
+                psc_cache = psc2alm.PSC_cache(cache_fullpath)
+                result, nof_parsed, changed_s = _analyze_with_cache(project_path, psc_cache)
+                assert (nof_parsed, psc_cache.nof_hits, psc_cache.nof_misses) == (3, size - 3, 3), 'PSC_cache after changes: unexpected parse count!'
+                assert result == reference, 'PSC_cache after changes returned different results than uncached run!'
+
+                # batch mode: a copied project has same content, but other paths and modification times
+                # (the copy has the PSC files as before the changes: only the two PSC files with other content are parsed)
+                copy_path = os.path.join(tmpdir, 'copy')
+                generate_project(copy_path, size)
+                shared_cache = psc2alm.PSC_sharedcache()
+                # (unique PSC files are read only for parsing, not for a checksum)
+                for curr_path, expected_parsed in [(project_path, size), (project_path, 0), (copy_path, 2)]:
+                    result, nof_shared_parsed, secs = _analyze_with_cache(curr_path, shared_cache)
+                    assert nof_shared_parsed == expected_parsed, 'PSC_sharedcache: parsed ' + str(nof_shared_parsed) + ' PSC files instead of ' + str(expected_parsed) + '!'
+                    if curr_path == project_path:
+                        assert shared_cache.nof_checksums == 0, 'PSC_sharedcache: read ' + str(shared_cache.nof_checksums) + ' unique PSC files for a checksum!'
+                    assert result == _analyze_with_cache(curr_path, None)[0], 'PSC_sharedcache returned different results than uncached run!'
+
+                print('\t{:>8} {:>14.3f} {:>14.3f} {:>14.3f} {:>14.3f} {:>8}'.format(size, uncached_s, cold_s, warm_s, changed_s, nof_parsed))
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+
+class Fake_subscription(object):
+    """ stand-in for visitoolkit_connector.SubscriptionES """
+
+    def __init__(self, dms_client, path, event, query):
+        self._dms_client = dms_client
+        self.path = path
+        self.event = event
+        self.query = query
+        self._handlers_list = []
+
+    def __iadd__(self, handler):
+        self._handlers_list.append(handler)
+        return self
+
+    def fire(self, event):
+        for handler in self._handlers_list:
+            handler(event)
+
+    def unsubscribe(self):
+        self._dms_client._unsubscribe(self)
+
+
+
+class Fake_DMSClient(object):
+    """ in-process stand-in for visitoolkit_connector.DMSClient """
+    # answers dp_get(), dp_set() and dp_del() with the same response objects as visitoolkit_connector,
+    # "latency" simulates duration of one round-trip to DMS in seconds
+    # =>DMS events of subscriptions are fired by a background thread (as in visitoolkit_connector)
+
+    def __init__(self, dms_dict=None, alarms=(), latency=0.0):
+        # key: DMS-key // value: DMS-value
+        self._dms_dict = dict(dms_dict or {})
+        # DMS-keys with alarm data
+        self._alarms_set = set(alarms)
+        self._lock = threading.Lock()
+        self.latency = latency
+
+        # (as in visitoolkit_connector: set when WebSocket connection is established)
+        self.ready_to_send = threading.Event()
+        self.ready_to_send.set()
+        self.nof_roundtrips = 0
+
+        # DMS-keys answered with an error by dp_set() (error injection)
+        self.error_keys = set()
+        # all calls of dp_set(): (time of request, DMS-key)
+        self.writes_list = []
+
+        # sorted DMS-keys for queries of a subtree (None: rebuilt with next query)
+        self._sorted_keys = None
+
+        self._subscriptions_list = []
+        self._events_queue = None
+
+    def dp_get(self, path, timeout=connector.REQ_TIMEOUT, query=None, **kwargs):
+        """ read datapoint value(s) """
+        self._roundtrip()
+        with self._lock:
+            if query is None:
+                if path in self._dms_dict:
+                    return [self._get_response(path, self._dms_dict[path])]
+                else:
+                    return [self._get_response(path, None, code='not found')]
+
+            # (queries of a subtree are answered without scanning all DMS keys, as in DMS tree)
+            if self._sorted_keys is None or len(self._sorted_keys) != len(self._dms_dict):
+                self._sorted_keys = sorted(self._dms_dict)
+            responses = []
+            for dms_key in self._sorted_keys[bisect.bisect_left(self._sorted_keys, path):]:
+                if not dms_key.startswith(path):
+                    break
+                value = self._dms_dict[dms_key]
+                if self._matches(dms_key, value, path, query):
+                    responses.append(self._get_response(dms_key, value))
+            return responses
+
+    def _matches(self, dms_key, value, path, query):
+        if not dms_key.startswith(path):
+            return False
+        if query is None:
+            return True
+        if not re.match(query.get('regExPath', '.*'), dms_key):
+            return False
+        if query.get('hasAlarmData') and not dms_key in self._alarms_set:
+            return False
+        is_type = query.get('isType')
+        if is_type and is_type != self._get_type(value):
+            return False
+        return True
+
+    def dp_set(self, path, value, timeout=connector.REQ_TIMEOUT, create=False, **kwargs):
+        """ write datapoint value(s) """
+        with self._lock:
+            self.writes_list.append((time.perf_counter(), path))
+        self._roundtrip()
+        with self._lock:
+            if path in self.error_keys:
+                code = 'error'
+                message = 'injected error'
+            elif create or path in self._dms_dict:
+                if not path in self._dms_dict:
+                    self._fire_events(connector.ON_CREATE, connector.DMSEvent.CODE_CREATE, path, value)
+                    self._sorted_keys = None
+                elif self._dms_dict[path] != value:
+                    self._fire_events(connector.ON_CHANGE, connector.DMSEvent.CODE_CHANGE, path, value)
+                self._dms_dict[path] = value
+                code = 'ok'
+                message = None
+            else:
+                code = 'not found'
+                message = 'not found'
+            return [connector.RespSet(code=code,
+                                      path=path,
+                                      value=value,
+                                      type=self._get_type(value),
+                                      stamp=None,
+                                      message=message,
+                                      tag=None)]
+
+    def dp_del(self, path, recursive, timeout=connector.REQ_TIMEOUT, **kwargs):
+        """ delete datapoint(s) """
+        self._roundtrip()
+        with self._lock:
+            for dms_key in sorted(self._dms_dict):
+                if dms_key == path or (recursive and dms_key.startswith(path + ':')):
+                    self._fire_events(connector.ON_DELETE, connector.DMSEvent.CODE_DELETE, dms_key, self._dms_dict[dms_key])
+                    del self._dms_dict[dms_key]
+                    self._sorted_keys = None
+        return []
+
+    def get_dp_subscription(self, path, timeout=connector.REQ_TIMEOUT, event=connector.ON_CHANGE, query=None, **kwargs):
+        """ subscribe monitoring of datapoint(s) """
+        self._roundtrip()
+        with self._lock:
+            if self._events_queue is None:
+                self._events_queue = queue.Queue()
+                threading.Thread(target=self._events_loop, daemon=True).start()
+            sub = Fake_subscription(self, path, event, query)
+            self._subscriptions_list.append(sub)
+            return sub
+
+    def _unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subscriptions_list:
+                self._subscriptions_list.remove(sub)
+
+    def _fire_events(self, event, code, dms_key, value):
+        # (caller holds the lock)
+        for sub in self._subscriptions_list:
+            if sub.event & event and self._matches(dms_key, value, sub.path, sub.query):
+                self._events_queue.put((sub, connector.DMSEvent(code=code,
+                                                                path=dms_key,
+                                                                value=value,
+                                                                type=self._get_type(value),
+                                                                stamp=None,
+                                                                tag=None)))
+
+    def _events_loop(self):
+        while True:
+            sub, event = self._events_queue.get()
+            sub.fire(event)
+
+    def get_value(self, path):
+        with self._lock:
+            return self._dms_dict.get(path)
+
+    def export_into_file(self, fullpath):
+        # DMS exportfile of all datapoints (ALM datapoints get an "ALM" subtree as in ProMoS NT)
+        type_dict = {'bool': 'BIT', 'int': 'S32', 'double': 'FLT', 'string': 'STR', 'none': 'NONE'}
+        with self._lock:
+            with open(fullpath, mode='w', encoding='cp1252') as f:
+                for dms_key in sorted(self._dms_dict):
+                    value = self._dms_dict[dms_key]
+                    value_str = str(int(value)) if isinstance(value, bool) else str(value)
+                    f.write(';'.join([dms_key, type_dict[self._get_type(value)], value_str, 'RW']) + '\n')
+                    if dms_key in self._alarms_set:
+                        f.write(';'.join([dms_key + ':ALM:Text', 'STR', 'alarm ' + dms_key, 'RW']) + '\n')
+
+    def _roundtrip(self):
+        with self._lock:
+            self.nof_roundtrips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _get_type(self, value):
+        if isinstance(value, bool):
+            return 'bool'
+        elif isinstance(value, int):
+            return 'int'
+        elif isinstance(value, float):
+            return 'double'
+        elif isinstance(value, str):
+            return 'string'
+        else:
+            return 'none'
+
+    def _get_response(self, dms_key, value, code='ok'):
+        # (all fields are given, so RespGet() doesn't need to log missing fields)
+        return connector.RespGet(code=code,
+                                 path=dms_key,
+                                 value=value,
+                                 type=self._get_type(value),
+                                 hasChild=False,
+                                 stamp=None,
+                                 extInfos={},
+                                 message=None if code == 'ok' else code,
+                                 histData=[],
+                                 changelog=[],
+                                 tag=None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+
+def generate_project(project_path, nof_files, nof_alarms_per_instance=2, seed=0):
+    # synthetic ProMoS NT project: "scr" folder with PSC images and a Fake_DMSClient with matching datapoints
+    # proportions are roughly as in our plant projects:
+    # -every image shows 10 BMO instances of one plant
+    # -every 20th image is an overview page showing BMO instances of other images
+    # -every image links to 3 other images, every 50th image contains an alarm lamp
+    # -every BMO instance has 2 ALM datapoints, two thirds of them have already a "ALM:Screen" mapping
+    rnd = random.Random(seed)
+    scr_path = os.path.join(project_path, 'scr')
+    os.makedirs(scr_path, exist_ok=True)
+    os.makedirs(os.path.join(project_path, 'cfg'), exist_ok=True)
+
+    filenames = ['P' + str(x).zfill(5) + '.psc' for x in range(nof_files)]
+    all_instances = []
+    for idx, filename in enumerate(filenames):
+        if idx % 20 == 19:
+            bmo_instances = rnd.sample(all_instances, min(10, len(all_instances)))
+        else:
+            plant = 'MSR' + str(idx // 200).zfill(2) + ':H' + str(idx % 200).zfill(3)
+            bmo_instances = [plant + ':Bmo' + str(x).zfill(2) for x in range(10)]
+            all_instances.extend(bmo_instances)
+        write_psc_file(os.path.join(scr_path, filename),
+                       bmo_instances,
+                       [rnd.choice(filenames) for x in range(3)],
+                       is_general=(idx % 50 == 0),
+                       nof_other_records=5)
+
+    dms_dict = collections.OrderedDict()
+    alarms_list = []
+    dms_dict['System:Version:dms.exe'] = '1.7 (Fake_DMSClient)'
+    dms_dict['System:Project'] = project_path
+    dms_dict['BMO:MES01:OBJECT'] = 'BMO:MES01'
+    for bmo_inst in all_instances:
+        dms_dict[bmo_inst + ':OBJECT'] = 'BMO:Pump'
+        plc_str = bmo_inst.split(':')[0]
+        for x in range(nof_alarms_per_instance):
+            alm_dp = bmo_inst + ':Alm' + str(x).zfill(2)
+            dms_dict[alm_dp] = False
+            alarms_list.append(alm_dp)
+            if rnd.random() < 0.66:
+                dms_dict[alm_dp + ':ALM:Screen'] = rnd.choice(filenames)
+                dms_dict[alm_dp + ':ALM:Screen:GcName'] = plc_str
+                dms_dict[alm_dp + ':ALM:Screen:ReInit'] = plc_str
+    return Fake_DMSClient(dms_dict=dms_dict, alarms=alarms_list)
+
+
+@contextlib.contextmanager
+def _timed(timings_dict, name):
+    start = time.perf_counter()
+    yield
+    timings_dict[name] = round(time.perf_counter() - start, 6)
+
+
+def _check_async_errors(project_path, dms_ws):
+    # main() with asyncio client: when collecting fails, analyzing PSC files is finished and the thread pool is closed
+    closed_list = []
+
+    class Closing_asyncclient(psc2alm.DMS_asyncclient):
+        def close(self):
+            closed_list.append(self)
+            super().close()
+
+    async def failing_collect_async(self, dms_async, with_Screen=True):
+        raise IOError('injected error')
+
+    prev_asyncclient = psc2alm.DMS_asyncclient
+    prev_collect_async = psc2alm.ALM_datapoint.collect_async
+    prev_connector = psc2alm.connector
+    psc2alm.DMS_asyncclient = Closing_asyncclient
+    psc2alm.ALM_datapoint.collect_async = failing_collect_async
+    psc2alm.connector = Fake_connector({('async', 9020): dms_ws})
+    metrics = psc2alm.Run_metrics()
+    try:
+        psc2alm.main(psc2alm.Run_options(dms_server='async', only_dryrun=True, use_async=True, project_path=project_path), metrics=metrics)
+        raise AssertionError('main() ignored failing collect_async()!')
+    except IOError:
+        pass
+    finally:
+        psc2alm.DMS_asyncclient = prev_asyncclient
+        psc2alm.ALM_datapoint.collect_async = prev_collect_async
+        psc2alm.connector = prev_connector
+    assert closed_list, 'DMS_asyncclient was not closed after failing collect_async()!'
+    assert metrics.as_dict()['phases']['analyze']['calls'] == 1, 'main() returned before analyzing PSC files was finished!'
+
+
+def bench_suite(sizes, latency=0.0, write_window=1, json_fullpath=None, compare_fullpath=None):
+    # duration of every phase of psc2alm.py on synthetic projects with given number of PSC files
+    print('suite: phases of psc2alm.py on synthetic projects (DMS latency ' + str(latency) + 's, write window ' + str(write_window) + ')')
+    print('\t{:>8} {:>8} {:>10} {:>10} {:>18} {:>18} {:>14}'.format('files', 'alarms', 'analyze', 'collect', 'get_psc_filename', 'write_ALM_screen', 'collect_async'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    results_list = []
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as project_path:
+                dms_ws = generate_project(project_path, size)
+                dms_ws.latency = latency
+                # (same DMS content for collect_async())
+                async_ws = Fake_DMSClient(dms_ws._dms_dict, dms_ws._alarms_set, latency=latency)
+                psc2alm.bmo_version = psc2alm.BMO_VERSION_1 if dms_ws.get_value('BMO:MES01:OBJECT') else psc2alm.BMO_VERSION_2
+
+                timings_dict = collections.OrderedDict()
+                psc_analyzer = psc2alm.PSC_Analyzer(project_path=project_path)
+                with _timed(timings_dict, 'analyze'):
+                    psc_analyzer.analyze()
+
+                alm_dp = psc2alm.ALM_datapoint(dms_ws)
+                with _timed(timings_dict, 'collect'):
+                    alm_dp.collect()
+
+                nof_alarms = 0
+                with _timed(timings_dict, 'get_psc_filename'):
+                    for alm, bmo_instance in alm_dp.generator_ALM_BMO_instance():
+                        psc_analyzer.get_psc_filename(bmo_instance)
+                        nof_alarms += 1
+
+                nof_roundtrips = dms_ws.nof_roundtrips
+                with _timed(timings_dict, 'write_ALM_screen'):
+                    alm_dp.write_ALM_screen(psc_analyzer, max_inflight=write_window)
+                nof_writes = dms_ws.nof_roundtrips - nof_roundtrips
+
+                # asyncio mode: all DMS queries at the same time, it has to collect and write the same datapoints
+                async_dp = psc2alm.ALM_datapoint(async_ws)
+                dms_async = psc2alm.DMS_asyncclient(async_ws)
+                try:
+                    with _timed(timings_dict, 'collect_async'):
+                        asyncio.run(async_dp.collect_async(dms_async))
+                finally:
+                    dms_async.close()
+                assert async_dp._alm_dps_dict == alm_dp._alm_dps_dict, 'collect_async() found other ALM datapoints or BMO instances than collect()!'
+                nof_roundtrips = async_ws.nof_roundtrips
+                async_dp.write_ALM_screen(psc_analyzer, max_inflight=write_window)
+                assert async_ws.nof_roundtrips - nof_roundtrips == nof_writes, 'collect_async() led to another number of DMS writes than collect()!'
+                assert async_ws._dms_dict == dms_ws._dms_dict, 'collect_async() led to other screen-mappings in DMS than collect()!'
+                _check_async_errors(project_path, async_ws)
+
+                results_list.append(collections.OrderedDict([('nof_files', size),
+                                                             ('nof_alarms', nof_alarms),
+                                                             ('nof_writes', nof_writes),
+                                                             ('timings', timings_dict)]))
+                print('\t{:>8} {:>8} {:>10.3f} {:>10.3f} {:>18.3f} {:>18.3f} {:>14.3f}'.format(size, nof_alarms, *timings_dict.values()))
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+    report_dict = collections.OrderedDict([('timestamp', time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime())),
+                                           ('python', platform.python_version()),
+                                           ('platform', platform.platform()),
+                                           ('parameters', {'latency': latency, 'write_window': write_window}),
+                                           ('results', results_list)])
+    if json_fullpath:
+        with open(json_fullpath, mode='w', encoding='utf-8') as f:
+            json.dump(report_dict, f, indent=2)
+        print('\twrote results into "' + json_fullpath + '"')
+    if compare_fullpath:
+        compare_results(compare_fullpath, report_dict)
+    return report_dict
+
+
+def _get_writer_items(nof_items):
+    # items of DMS_writer as written by ALM_datapoint.write_ALM_screen(): "ALM:Screen" node and its subkeys
+    alm_dp = psc2alm.ALM_datapoint(dms_ws=None)
+    return [alm_dp._get_ALM_screen_values(alm_dp='MSR01:H' + str(x).zfill(5) + ':Bmo:Alm00', psc_filename='P00001.psc') for x in range(nof_items)]
+
+
+def bench_writer(nof_items=100, write_window=8, max_rate=200.0, latency=0.005):
+    # DMS_writer with a window of parallel requests:
+    # -"max_rate" is respected: n-th write starts at the earliest (n / max_rate) seconds after the first one
+    # -error in a subkey of one item: remaining subkeys of this item are skipped, no new items are started,
+    #  but all other items already in flight are written completely
+    print('DMS_writer: rate limit and error handling (write window ' + str(write_window) + ', DMS latency ' + str(latency) + 's)')
+    print('\t{:>10} {:>10} {:>10} {:>12} {:>12} {:>10}'.format('variant', 'items', 'writes', 'time [s]', 'writes/s', 'in flight'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.CRITICAL)
+    try:
+        for name, curr_rate in [('unlimited', 0), ('rate', max_rate)]:
+            dms_ws = Fake_DMSClient(latency=latency)
+            dms_writer = psc2alm.DMS_writer(dms_ws, max_inflight=write_window, max_rate=curr_rate)
+            start = time.perf_counter()
+            errors_dict = dms_writer.write(iter(_get_writer_items(nof_items)))
+            secs = time.perf_counter() - start
+            assert not errors_dict and len(dms_ws._dms_dict) == nof_items * 3, 'DMS_writer did not write all DMS keys!'
+            write_times = sorted(write_time for write_time, dms_key in dms_ws.writes_list)
+            if curr_rate:
+                # (small tolerance for timer resolution, a write can only start later than planned)
+                for idx, write_time in enumerate(write_times):
+                    assert write_time - write_times[0] >= idx / curr_rate - 0.001, 'DMS_writer exceeded rate limit of ' + str(curr_rate) + ' writes/s!'
+            rate = (len(write_times) - 1) / (write_times[-1] - write_times[0])
+            print('\t{:>10} {:>10} {:>10} {:>12.3f} {:>12.1f} {:>10}'.format(name, nof_items, dms_writer.nof_writes, secs, rate, '-'))
+
+        # error in second DMS key of an item in the middle
+        items = _get_writer_items(nof_items)
+        error_idx = nof_items // 4
+        error_key = items[error_idx][1][0]
+        dms_ws = Fake_DMSClient(latency=latency)
+        dms_ws.error_keys.add(error_key)
+        dms_writer = psc2alm.DMS_writer(dms_ws, max_inflight=write_window)
+        start = time.perf_counter()
+        errors_dict = dms_writer.write(iter(items))
+        secs = time.perf_counter() - start
+        assert list(errors_dict) == [error_key], 'DMS_writer returned other errors than the injected one: ' + repr(errors_dict)
+
+        written_set = set(dms_key for write_time, dms_key in dms_ws.writes_list)
+        started_list = [idx for idx, values_list in enumerate(items) if values_list[0][0] in written_set]
+        for idx in started_list:
+            nof_written = sum(1 for dms_key, value in items[idx] if dms_key in written_set)
+            if idx == error_idx:
+                assert nof_written == 2, 'DMS_writer wrote subkeys of an item after its error!'
+            else:
+                assert nof_written == 3, 'DMS_writer dropped writes of item ' + str(idx) + ', which was in flight when an error occurred!'
+        nof_inflight = sum(1 for idx in started_list if idx > error_idx)
+        assert nof_inflight < write_window + 1, 'DMS_writer started ' + str(nof_inflight) + ' new items after an error!'
+        print('\t{:>10} {:>10} {:>10} {:>12.3f} {:>12} {:>10}'.format('error', len(started_list), dms_writer.nof_writes, secs, '-', nof_inflight))
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+
+def bench_offline(sizes, latency=0.0):
+    # retrieving datapoints for mapping: DMS queries (live) compared with reading a DMS exportfile (offline)
+    print('offline: DMS queries compared with DMS exportfile (DMS latency ' + str(latency) + 's)')
+    print('\t{:>8} {:>12} {:>12} {:>12}'.format('files', 'export MB', 'live', 'offline'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as project_path:
+                dms_ws = generate_project(project_path, size)
+                dms_ws.latency = latency
+                export_fullpath = os.path.join(project_path, 'cfg', 'export.dms')
+                dms_ws.export_into_file(export_fullpath)
+
+                start = time.perf_counter()
+                psc2alm.ALM_datapoint(dms_ws).collect()
+                live_secs = time.perf_counter() - start
+
+                start = time.perf_counter()
+                dms_exportfile = psc2alm.DMS_exportfile(export_fullpath)
+                dms_exportfile.read()
+                psc2alm.ALM_datapoint(dms_ws=None).collect_offline(dms_exportfile)
+                offline_secs = time.perf_counter() - start
+                print('\t{:>8} {:>12.1f} {:>12.3f} {:>12.3f}'.format(size, os.path.getsize(export_fullpath) / (1024 * 1024), live_secs, offline_secs))
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+
+def _wait_for_value(dms_ws, dms_key, expected_value, is_equal=True, timeout=30.0):
+    # seconds until DMS key has (or has no longer) expected value, None on timeout
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if (dms_ws.get_value(dms_key) == expected_value) == is_equal:
+            return time.perf_counter() - start
+        time.sleep(0.001)
+    return None
+
+
+def _check_update_OBJECT(alm_dp, legacy_limit=5000):
+    # incremental updates after OBJECT events give same BMO instances as legacy matching of all ALM datapoints
+    if len(alm_dp._alm_dps_dict) > legacy_limit:
+        return
+    alm, bmo_instance = next(alm_dp.generator_ALM_BMO_instance())
+    # (new BMO instances: nested in DMS tree, not aligned to DMS path segments, with less than three segments)
+    for curr_instance, is_deleted in [(bmo_instance, True),
+                                      (bmo_instance, False),
+                                      (bmo_instance, False),
+                                      (alm[:-1], False),
+                                      (alm.split(':', 1)[1], False),
+                                      (alm.split(':', 1)[1], True),
+                                      (alm[:-1], True)]:
+        old_dict = dict(alm_dp._alm_dps_dict)
+        affected_list = alm_dp._update_OBJECT(curr_instance, is_deleted=is_deleted)
+        # (order of BMO instances in BMO_instance_index is the order of OBJECT datapoints returned by DMS)
+        bmo_instances = sorted(alm_dp._bmo_index._bmo_instances_dict, key=alm_dp._bmo_index._bmo_instances_dict.get)
+        assert alm_dp._alm_dps_dict == _legacy_matching(bmo_instances, alm_dp._alm_dps_dict), \
+            'ALM_datapoint._update_OBJECT() differs from legacy matching after OBJECT "' + curr_instance + '"!'
+        changed_set = {alm for alm in old_dict if old_dict[alm] != alm_dp._alm_dps_dict[alm]}
+        assert changed_set <= set(affected_list), 'ALM_datapoint._update_OBJECT() did not return all changed ALM datapoints!'
+        assert {bmo_inst: sorted(alm_dps) for bmo_inst, alm_dps in alm_dp._bmo_alm_dps_dict.items()} == \
+            {bmo_inst: sorted(alm for alm, curr_inst in alm_dp._alm_dps_dict.items() if curr_inst == bmo_inst) for bmo_inst in alm_dp._bmo_alm_dps_dict}
+    assert alm_dp._alm_dps_dict[alm] == bmo_instance
+
+
+def bench_watch(sizes, poll_interval=psc2alm.WATCH_POLL_INTERVAL):
+    # reaction time of watch mode: duration from a change until the new "ALM:Screen" is written into DMS
+    # -PSC change: best suited PSC file of a BMO instance gets removed
+    # -DMS change: someone overwrites an "ALM:Screen" datapoint
+    print('watch: reaction time of watch mode (poll interval ' + str(poll_interval) + 's)')
+    print('	{:>8} {:>12} {:>12} {:>12}'.format('files', 'full run', 'PSC change', 'DMS change'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as project_path:
+                dms_ws = generate_project(project_path, size)
+                psc2alm.bmo_version = psc2alm.BMO_VERSION_1
+                psc_analyzer = psc2alm.PSC_Analyzer(project_path=project_path)
+                alm_dp = psc2alm.ALM_datapoint(dms_ws)
+                watcher = psc2alm.ALM_screen_watcher(dms_ws, psc_analyzer, alm_dp, poll_interval=poll_interval)
+                start = time.perf_counter()
+                psc_analyzer.analyze()
+                alm_dp.collect()
+                alm_dp.write_ALM_screen(psc_analyzer)
+                full_secs = time.perf_counter() - start
+                _check_update_OBJECT(alm_dp)
+
+                watcher_thread = threading.Thread(target=watcher.run)
+                watcher_thread.start()
+                try:
+                    alm, bmo_instance = next(alm_dp.generator_ALM_BMO_instance())
+                    old_screen = dms_ws.get_value(alm + ':ALM:Screen')
+                    os.remove(psc_analyzer.get_psc_filename(bmo_instance))
+                    psc_secs = _wait_for_value(dms_ws, alm + ':ALM:Screen', old_screen, is_equal=False)
+
+                    # give watcher time for handling DMS events of its own writes
+                    time.sleep(0.1)
+                    new_screen = dms_ws.get_value(alm + ':ALM:Screen')
+                    dms_ws.dp_set(path=alm + ':ALM:Screen', value='other.psc')
+                    dms_secs = _wait_for_value(dms_ws, alm + ':ALM:Screen', new_screen)
+                finally:
+                    watcher.stop()
+                    watcher_thread.join()
+                print('	{:>8} {:>12.3f} {:>12.3f} {:>12.3f}'.format(size, full_secs, psc_secs or -1.0, dms_secs or -1.0))
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+
+def compare_results(baseline_fullpath, report_dict, threshold=1.2):
+    # compare with results of an earlier run, phases slower than "threshold" are marked as regression
+    with open(baseline_fullpath, mode='r', encoding='utf-8') as f:
+        baseline_dict = json.load(f)
+    baseline_results = {}
+    for result in baseline_dict['results']:
+        baseline_results[result['nof_files']] = result['timings']
+
+    print('comparison with "' + baseline_fullpath + '" (' + baseline_dict['timestamp'] + '): ratio current / baseline')
+    nof_regressions = 0
+    for result in report_dict['results']:
+        if not result['nof_files'] in baseline_results:
+            continue
+        for name, curr_secs in result['timings'].items():
+            baseline_secs = baseline_results[result['nof_files']].get(name)
+            if not baseline_secs:
+                continue
+            ratio = curr_secs / baseline_secs
+            marker = ''
+            if ratio > threshold:
+                marker = '  <==REGRESSION'
+                nof_regressions += 1
+            print('\t{:>8} {:<18} {:>8.2f}{}'.format(result['nof_files'], name, ratio, marker))
+    return nof_regressions
+
+
+class Fake_connector(object):
+    """ stand-in for module visitoolkit_connector.connector, DMSClient() returns the Fake_DMSClient of host and port """
+
+    def __init__(self, dms_clients_dict):
+        # key: (host, port) // value: Fake_DMSClient
+        self._dms_clients_dict = dms_clients_dict
+
+    def DMSClient(self, whois_str, user_str, dms_host_str, dms_port_int):
+        return self._dms_clients_dict[(dms_host_str, dms_port_int)]
+
+    def __getattr__(self, name):
+        return getattr(connector, name)
+
+
+def bench_batch(sizes, nof_targets=4, latency=0.0):
+    # batch mode: all targets one after another compared with "nof_targets" targets at the same time
+    # (all projects contain the same PSC files in different folders: one after another they are parsed only once,
+    #  concurrent targets parse a PSC file again when they need it before another target has parsed it)
+    # then logfiles of all targets: an error injected into DMS of first target has to be only in its logfile,
+    # also when it is logged in worker threads (write window, asyncio client, parsing threads)
+    print('batch: ' + str(nof_targets) + ' projects sequential and concurrent (DMS latency ' + str(latency) + 's)')
+    print('\t{:>8} {:>12} {:>12} {:>10} {:>16} {:>10}'.format('files', 'sequential', 'concurrent', 'speedup', 'parsed seq/conc', 'logfiles'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    prev_connector = psc2alm.connector
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                batch_fullpath = os.path.join(tmpdir, 'targets.txt')
+                with open(batch_fullpath, mode='w', encoding='utf-8') as f:
+                    for x in range(nof_targets):
+                        f.write('fake' + str(x) + ' 9020\n')
+
+                durations = {}
+                nof_parsed = {}
+                for name, curr_nof_targets in [('sequential', 1), ('concurrent', nof_targets)]:
+                    # (new projects for every run: first run has written all ALM datapoints into Fake_DMSClients)
+                    dms_clients_dict = {}
+                    for x in range(nof_targets):
+                        dms_ws = generate_project(os.path.join(tmpdir, name + str(x)), size)
+                        dms_ws.latency = latency
+                        dms_clients_dict[('fake' + str(x), 9020)] = dms_ws
+                    psc2alm.connector = Fake_connector(dms_clients_dict)
+
+                    metrics_fullpath = os.path.join(tmpdir, 'metrics.json')
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        status = psc2alm.run(psc2alm.Run_options(batch_file=batch_fullpath,
+                                                                 nof_targets=curr_nof_targets,
+                                                                 metrics_file=metrics_fullpath))
+                    durations[name] = time.perf_counter() - start
+                    assert status == 0, 'batch mode failed!'
+                    with open(metrics_fullpath, mode='r', encoding='utf-8') as f:
+                        nof_parsed[name] = sum(metrics_dict['counters'].get('files_parsed', 0) for metrics_dict in json.load(f).values())
+                _check_batch_logfiles(tmpdir, batch_fullpath, size, nof_targets, latency)
+                print('\t{:>8} {:>12.3f} {:>12.3f} {:>9.2f}x {:>16} {:>10}'.format(size,
+                                                                                   durations['sequential'],
+                                                                                   durations['concurrent'],
+                                                                                   durations['sequential'] / durations['concurrent'],
+                                                                                   str(nof_parsed['sequential']) + '/' + str(nof_parsed['concurrent']),
+                                                                                   'ok'))
+    finally:
+        psc2alm.connector = prev_connector
+        psc2alm.logger.setLevel(loglevel)
+
+
+class _Records_handler(logging.Handler):
+    """ keeps all log records (with batch target) in a list """
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(psc2alm.Batch_target_filter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _check_batch_logfiles(tmpdir, batch_fullpath, size, nof_targets, latency):
+    # batch run with logfiles and worker threads everywhere, DMS of first target returns an error for one write
+    dms_clients_dict = {}
+    for x in range(nof_targets):
+        dms_ws = generate_project(os.path.join(tmpdir, 'logs' + str(x)), size)
+        dms_ws.latency = latency
+        dms_clients_dict[('fake' + str(x), 9020)] = dms_ws
+    psc2alm.connector = Fake_connector(dms_clients_dict)
+    dms_ws = dms_clients_dict[('fake0', 9020)]
+    error_key = next(alm_dp + ':ALM:Screen' for alm_dp in sorted(dms_ws._alarms_set) if not alm_dp + ':ALM:Screen' in dms_ws._dms_dict)
+    dms_ws.error_keys.add(error_key)
+
+    # (all log records are needed, but console should stay quiet)
+    log_path = os.path.join(tmpdir, 'logs')
+    records_handler = _Records_handler()
+    loglevel = psc2alm.logger.level
+    console_level = psc2alm.ch.level
+    psc2alm.logger.setLevel(logging.DEBUG)
+    psc2alm.ch.setLevel(logging.CRITICAL + 1)
+    psc2alm.logger.addHandler(records_handler)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            status = psc2alm.main_batch(psc2alm.Run_options(batch_file=batch_fullpath,
+                                                            nof_targets=nof_targets,
+                                                            log_path=log_path,
+                                                            nof_workers=2,
+                                                            use_threads=True,
+                                                            use_async=True,
+                                                            write_window=4))
+    finally:
+        psc2alm.logger.removeHandler(records_handler)
+        psc2alm.ch.setLevel(console_level)
+        psc2alm.logger.setLevel(loglevel)
+    assert status == 1, 'batch mode did not report failed target!'
+
+    # only records of main_batch() itself belong to no target
+    for record in records_handler.records:
+        assert record.target != '-' or record.getMessage().startswith('main_batch():'), 'log record without batch target: ' + record.getMessage()
+    # (identical PSC files of other targets are taken from PSC_sharedcache: a target could have nothing to parse)
+    nof_parsed = 0
+    for x in range(nof_targets):
+        with open(os.path.join(log_path, 'fake' + str(x) + '_9020.log'), mode='r', encoding='utf-8') as f:
+            log_str = f.read()
+        with open(os.path.join(log_path, 'fake' + str(x) + '_9020_metrics.json'), mode='r', encoding='utf-8') as f:
+            files_parsed = json.load(f)['counters'].get('files_parsed', 0)
+        nof_parsed += files_parsed
+        assert ('_parse_psc_file():' in log_str) == (files_parsed > 0), 'records of parsing threads are missing in logfile of "fake' + str(x) + '"!'
+        is_error_logged = 'DMS_writer._write_item(): DMS returned error "injected error" for DMS key "' + error_key + '"' in log_str
+        assert is_error_logged == (x == 0), 'DMS error of "fake0" is ' + ('missing in' if x == 0 else 'also in') + ' logfile of "fake' + str(x) + '"!'
+    assert nof_parsed >= size, 'PSC files of batch run were not parsed!'
+
+
+def _traced_memory(func):
+    # returns (result of func(), bytes allocated by func() and still in use afterwards)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        result = func()
+        gc.collect()
+        return result, tracemalloc.get_traced_memory()[0] - start_bytes
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(sizes):
+    # memory held by PSC_Analyzer after analyze() (tables of PSC files, BMO instances and DMS key parts)
+    # (PSC_fileinfo keeps DMS key parts as two sorted arrays instead of a dictionary: 4000 files of
+    #  generate_overview_project() need 27.2 MB instead of 34.0 MB, dictionaries exist only while choosing PSC files)
+    print('PSC_Analyzer: memory after analyze()')
+    print('\t{:>8} {:>14} {:>12} {:>12} {:>14}'.format('files', 'BMO instances', 'total MB', 'bytes/file', 'bytes/instance'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as project_path:
+                generate_project(project_path, size)
+                psc_analyzer = psc2alm.PSC_Analyzer(project_path)
+
+                def analyze():
+                    psc_analyzer.analyze()
+                    # (cached DMS key parts are no part of PSC_Analyzer)
+                    psc2alm._get_dmskey_parts.cache_clear()
+                dummy, nof_bytes = _traced_memory(analyze)
+                nof_instances = len(psc_analyzer.get_psc_mapping())
+                print('\t{:>8} {:>14} {:>12.1f} {:>12.0f} {:>14.0f}'.format(size,
+                                                                             nof_instances,
+                                                                             nof_bytes / (1024 * 1024),
+                                                                             nof_bytes / size,
+                                                                             nof_bytes / nof_instances))
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+
+def bench_v2(sizes):
+    # BMOs version 2: scan with facts of all PSC files compared with fast path (only lowest PSC-filename per BMO instance)
+    print('PSC_Analyzer: BMOs version 2, full scan and fast path')
+    print('\t{:>8} {:>12} {:>12} {:>12} {:>12} {:>8}'.format('files', 'full [s]', 'fast [s]', 'full [MB]', 'fast [MB]', 'equal'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as project_path:
+                generate_project(project_path, size)
+                results_dict = {}
+                for name, keep_psc_facts in [('full', True), ('fast', False)]:
+                    psc_analyzer = psc2alm.PSC_Analyzer(project_path, bmo_version=psc2alm.BMO_VERSION_2, keep_psc_facts=keep_psc_facts)
+                    def analyze():
+                        start = time.perf_counter()
+                        psc_analyzer.analyze()
+                        mapping_dict = psc_analyzer.get_psc_mapping()
+                        psc2alm._get_dmskey_parts.cache_clear()
+                        return mapping_dict, time.perf_counter() - start
+                    (mapping_dict, secs), nof_bytes = _traced_memory(analyze)
+                    results_dict[name] = (mapping_dict, secs, nof_bytes)
+                    del psc_analyzer
+                assert results_dict['full'][0], 'no BMO instances found!'
+                assert results_dict['full'][0] == results_dict['fast'][0], 'fast path of BMOs version 2 chose other PSC files than full scan!'
+                print('\t{:>8} {:>12.3f} {:>12.3f} {:>12.1f} {:>12.1f} {:>8}'.format(size,
+                                                                                   results_dict['full'][1],
+                                                                                   results_dict['fast'][1],
+                                                                                   results_dict['full'][2] / (1024 * 1024),
+                                                                                   results_dict['fast'][2] / (1024 * 1024),
+                                                                                   'True'))
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+
+def _legacy_backupfile(alm_dp, project_path):
+    # copy of former ALM_datapoint.export_into_backupfile(): one write() per row from whole keyspace in memory
+    export_fullpath = os.path.join(project_path, 'cfg', 'PSC_to_ALM_Mapper_legacy_old_values.dms')
+    with open(export_fullpath, mode='w') as f:
+        for key, value in alm_dp._alm_screen_allkeys_dict.items():
+            f.write("".join([psc2alm._get_dms_row(key, value), "\n"]))
+    return export_fullpath
+
+
+def _check_backup_abort(dms_ws, psc_analyzer, project_path):
+    # errors while writing a backupfile leave no unfinished backupfile in "cfg" folder,
+    # ALM_datapoint.export_into_backupfile() writes same rows as former export
+    cfg_path = os.path.join(project_path, 'cfg')
+    before_set = set(os.listdir(cfg_path))
+
+    # BACKUP_MODE_FULL: connection to DMS lost while streaming "ALM:Screen" keys
+    alm_dp = psc2alm.ALM_datapoint(dms_ws, backup_file=psc2alm.DMS_backupfile(project_path, mode=psc2alm.BACKUP_MODE_FULL))
+    responses = dms_ws.dp_get(**alm_dp._get_Screen_request())
+
+    def broken_responses():
+        yield from responses[:len(responses) // 2]
+        raise IOError('injected error')
+    try:
+        alm_dp._process_Screen(broken_responses())
+        raise AssertionError('ALM_datapoint._process_Screen() ignored broken responses!')
+    except IOError:
+        pass
+    assert set(os.listdir(cfg_path)) == before_set, 'unfinished full backupfile was left in "cfg" folder!'
+
+    # BACKUP_MODE_CHANGES: error after some rows were written
+    alm_dp = psc2alm.ALM_datapoint(dms_ws, backup_file=psc2alm.DMS_backupfile(project_path, mode=psc2alm.BACKUP_MODE_CHANGES))
+    alm_dp.collect()
+    unwritten_screens_dict, dummy = alm_dp._get_changed_screens(psc_analyzer)
+    calls_list = []
+    get_screen_values = alm_dp._get_ALM_screen_values
+
+    def failing_get_screen_values(alm_dp, psc_filename):
+        calls_list.append(alm_dp)
+        if len(calls_list) == len(unwritten_screens_dict):
+            raise IOError('injected error')
+        return get_screen_values(alm_dp=alm_dp, psc_filename=psc_filename)
+    alm_dp._get_ALM_screen_values = failing_get_screen_values
+    try:
+        alm_dp._write_backup_changes(unwritten_screens_dict)
+        raise AssertionError('ALM_datapoint._write_backup_changes() ignored error!')
+    except IOError:
+        pass
+    assert set(os.listdir(cfg_path)) == before_set, 'unfinished changes backupfile was left in "cfg" folder!'
+
+    alm_dp = psc2alm.ALM_datapoint(dms_ws)
+    alm_dp.collect()
+    legacy_fullpath = _legacy_backupfile(alm_dp, project_path)
+    before_set = set(os.listdir(cfg_path))
+    alm_dp.export_into_backupfile(project_path)
+    new_list = list(set(os.listdir(cfg_path)) - before_set)
+    assert len(new_list) == 1, 'ALM_datapoint.export_into_backupfile() did not write one backupfile!'
+    with open(legacy_fullpath, encoding=psc2alm.DMS_EXPORTFILE_ENCODING) as f_legacy, \
+            open(os.path.join(cfg_path, new_list[0]), encoding=psc2alm.DMS_EXPORTFILE_ENCODING) as f_new:
+        assert f_legacy.read() == f_new.read(), 'ALM_datapoint.export_into_backupfile() differs from former export!'
+
+
+def bench_backup(sizes, changed_ratio=0.05):
+    # DMS backupfile of screen-mappings: former export compared with streamed (optionally gzip) and changes-only backupfiles
+    # (time: collecting "ALM:Screen" DMS keys and writing backupfile)
+    print('DMS backupfile: size and time (' + str(int(changed_ratio * 100)) + '% changed screen-mappings)')
+    print('\t{:>8} {:>10} {:>12} {:>12} {:>12}'.format('files', 'variant', 'rows', 'size [KB]', 'time [s]'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as project_path:
+                dms_ws = generate_project(project_path, size)
+                cfg_path = os.path.join(project_path, 'cfg')
+                os.makedirs(cfg_path, exist_ok=True)
+                psc_analyzer = psc2alm.PSC_Analyzer(project_path)
+                psc_analyzer.analyze()
+                # DMS with current screen-mappings, then some of them outdated
+                alm_dp = psc2alm.ALM_datapoint(dms_ws)
+                alm_dp.collect()
+                alm_dp.write_ALM_screen(psc_analyzer)
+                rnd = random.Random(size)
+                screen_keys = sorted(key for key in dms_ws._dms_dict if key.endswith(':ALM:Screen'))
+                for key in rnd.sample(screen_keys, int(len(screen_keys) * changed_ratio)):
+                    dms_ws.dp_set(key, 'outdated.psc')
+
+                for name, mode, compress in [('legacy', None, False),
+                                             ('full', psc2alm.BACKUP_MODE_FULL, False),
+                                             ('full+gzip', psc2alm.BACKUP_MODE_FULL, True),
+                                             ('changes', psc2alm.BACKUP_MODE_CHANGES, False)]:
+                    backup_file = psc2alm.DMS_backupfile(project_path, mode=mode, compress=compress) if mode else None
+                    before_set = set(os.listdir(cfg_path))
+                    start = time.perf_counter()
+                    alm_dp = psc2alm.ALM_datapoint(dms_ws, backup_file=backup_file)
+                    alm_dp.collect()
+                    if not mode:
+                        _legacy_backupfile(alm_dp, project_path)
+                        nof_rows = len(alm_dp._alm_screen_allkeys_dict)
+                    else:
+                        if mode == psc2alm.BACKUP_MODE_CHANGES:
+                            # (same as in ALM_datapoint.write_ALM_screen() before writing into DMS)
+                            unwritten_screens_dict, dummy = alm_dp._get_changed_screens(psc_analyzer)
+                            alm_dp._write_backup_changes(unwritten_screens_dict)
+                        nof_rows = backup_file.nof_rows
+                    secs = time.perf_counter() - start
+                    nof_bytes = sum(os.path.getsize(os.path.join(cfg_path, fname)) for fname in set(os.listdir(cfg_path)) - before_set)
+                    print('\t{:>8} {:>10} {:>12} {:>12.1f} {:>12.3f}'.format(size, name, nof_rows, nof_bytes / 1024, secs))
+                _check_backup_abort(dms_ws, psc_analyzer, project_path)
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+
+def bench_snapshot(sizes, latency=0.0, changed_ratio=0.01):
+    # routine run with ALM_snapshot (only changed screen-mappings are read from DMS) compared with a full run,
+    # after adding general PSC files which take over BMO instances of "changed_ratio" of all PSC files
+    # (routine run also with a window of parallel reads, and with fallback to reading all "ALM:Screen" keys)
+    print('snapshot: full run and routine run with snapshot (DMS latency ' + str(latency) + 's)')
+    print('\t{:>8} {:>12} {:>12} {:>12} {:>14} {:>14} {:>12} {:>8}'.format('files', 'full [s]', 'snapshot [s]', 'window [s]', 'keys full', 'keys snapshot', 'verified', 'equal'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    prev_connector = psc2alm.connector
+    verify_limit = psc2alm.SNAPSHOT_VERIFY_LIMIT
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as project_path:
+                full_ws = generate_project(project_path, size)
+                snapshot_ws = Fake_DMSClient(full_ws._dms_dict, full_ws._alarms_set)
+                window_ws = Fake_DMSClient(full_ws._dms_dict, full_ws._alarms_set)
+                fallback_ws = Fake_DMSClient(full_ws._dms_dict, full_ws._alarms_set)
+                psc2alm.connector = Fake_connector({('full', 9020): full_ws,
+                                                    ('snapshot', 9020): snapshot_ws,
+                                                    ('window', 9020): window_ws,
+                                                    ('fallback', 9020): fallback_ws})
+
+                def run(dms_server, snapshot_file, write_window=1):
+                    metrics = psc2alm.Run_metrics()
+                    start = time.perf_counter()
+                    options = psc2alm.Run_options(dms_server=dms_server,
+                                                  project_path=project_path,
+                                                  snapshot_file=snapshot_file,
+                                                  write_window=write_window)
+                    psc2alm.main(options, metrics=metrics)
+                    return time.perf_counter() - start, metrics.as_dict()['counters']
+
+                # first runs: screen-mappings in DMS are up to date, snapshot is created
+                run('full', None)
+                for dms_server in ('snapshot', 'window', 'fallback'):
+                    run(dms_server, '')
+
+                psc_analyzer = psc2alm.PSC_Analyzer(project_path)
+                psc_analyzer.analyze()
+                bmo_instances = sorted(psc_analyzer.get_psc_mapping())
+                scr_path = os.path.join(project_path, 'scr')
+                rnd = random.Random(size)
+                for x in range(max(1, int(size * changed_ratio))):
+                    write_psc_file(os.path.join(scr_path, 'G' + str(x).zfill(5) + '.psc'), rnd.sample(bmo_instances, 10), [], is_general=True)
+
+                for dms_ws in (full_ws, snapshot_ws, window_ws, fallback_ws):
+                    dms_ws.latency = latency
+                full_s, full_counters = run('full', None)
+                snapshot_s, snapshot_counters = run('snapshot', '')
+                window_s, window_counters = run('window', '', write_window=8)
+                psc2alm.SNAPSHOT_VERIFY_LIMIT = 0
+                try:
+                    fallback_s, fallback_counters = run('fallback', '')
+                finally:
+                    psc2alm.SNAPSHOT_VERIFY_LIMIT = verify_limit
+                assert full_ws._dms_dict == snapshot_ws._dms_dict, 'routine run with snapshot wrote other screen-mappings than full run!'
+                assert full_ws._dms_dict == window_ws._dms_dict, 'routine run with parallel reads wrote other screen-mappings than full run!'
+                assert window_counters.get('screens_verified') == snapshot_counters.get('screens_verified')
+                assert full_ws._dms_dict == fallback_ws._dms_dict, 'routine run with fallback wrote other screen-mappings than full run!'
+                assert 'screens_verified' not in fallback_counters and fallback_counters['screen_keys_read'] == full_counters['screen_keys_read'], \
+                    'routine run over SNAPSHOT_VERIFY_LIMIT did not read all "ALM:Screen" keys!'
+                print('\t{:>8} {:>12.3f} {:>12.3f} {:>12.3f} {:>14} {:>14} {:>12} {:>8}'.format(size,
+                                                                                                full_s,
+                                                                                                snapshot_s,
+                                                                                                window_s,
+                                                                                                full_counters.get('screen_keys_read', 0),
+                                                                                                snapshot_counters.get('screen_keys_read', 0),
+                                                                                                snapshot_counters.get('screens_verified', 0),
+                                                                                                'True'))
+    finally:
+        psc2alm.connector = prev_connector
+        psc2alm.logger.setLevel(loglevel)
+
+
+def generate_overview_project(project_path, nof_files, nof_overview_instances=50, seed=0):
+    # synthetic PSC images where BMO instances appear on many images (overview and alarm summary pages):
+    # every image shows 10 BMO instances of its plant and "nof_overview_instances" BMO instances of other plants
+    rnd = random.Random(seed)
+    scr_path = os.path.join(project_path, 'scr')
+    os.makedirs(scr_path, exist_ok=True)
+    plants = ['MSR' + str(idx // 200).zfill(2) + ':H' + str(idx % 200).zfill(3) for idx in range(nof_files)]
+    all_instances = [plant + ':Bmo' + str(x).zfill(2) for plant in plants for x in range(10)]
+    for idx, plant in enumerate(plants):
+        bmo_instances = [plant + ':Bmo' + str(x).zfill(2) for x in range(10)]
+        bmo_instances.extend(rnd.sample(all_instances, nof_overview_instances))
+        write_psc_file(os.path.join(scr_path, 'P' + str(idx).zfill(5) + '.psc'), bmo_instances, [], nof_other_records=0)
+
+
+def bench_keyscore(sizes, nof_overview_instances=50):
+    # keyscores of all BMO instances found in more than one PSC file:
+    # one DMS_keystats dictionary per PSC file (as parsed), compact arrays per PSC file (PSC_fileinfo)
+    # and columnar PSC_keystats_matrix (keyscores of all pairs in one batch call, including building the matrix),
+    # then choice of best suited PSC file for all of them: one by one (binary search in arrays) and as batch
+    print('keyscores of BMO instances in many PSC files (' + str(nof_overview_instances) + ' shared BMO instances per image)')
+    print('\t{:>8} {:>10} {:>12} {:>10} {:>10} {:>10} {:>12} {:>12} {:>8}'.format('files', 'instances', 'candidates', 'dict [s]', 'arrays [s]', 'matrix [s]', 'choice [s]', 'batch [s]', 'equal'))
+    if psc2alm.numpy is None:
+        print('\t(NumPy is not installed: PSC_keystats_matrix is not available)')
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as project_path:
+                generate_overview_project(project_path, size, nof_overview_instances=nof_overview_instances)
+                psc_analyzer = psc2alm.PSC_Analyzer(project_path, bmo_version=psc2alm.BMO_VERSION_1)
+                psc_analyzer.analyze()
+                fileinfos = psc_analyzer._psc_fileinfos
+                prefix_table = psc_analyzer._prefix_table
+                queries_list = [(bmo_instance, psc_ids) for bmo_instance, psc_ids in psc_analyzer._bmo_instances_dict.items() if not isinstance(psc_ids, int)]
+                nof_candidates = sum(len(psc_ids) for bmo_instance, psc_ids in queries_list)
+
+                # dictionaries as in PSC_fileresult of every PSC file
+                keystats_list = [psc2alm._parse_psc_file(fileinfo.fullpath).keystats for fileinfo in fileinfos]
+                start = time.perf_counter()
+                dict_results = [[keystats_list[psc_id].get_keyscore(bmo_instance) for psc_id in psc_ids] for bmo_instance, psc_ids in queries_list]
+                dict_s = time.perf_counter() - start
+
+                start = time.perf_counter()
+                arrays_results = []
+                for bmo_instance, psc_ids in queries_list:
+                    part_ids = prefix_table.get_ids(bmo_instance)
+                    arrays_results.append([fileinfos[psc_id].get_keyscore(part_ids) for psc_id in psc_ids])
+                arrays_s = time.perf_counter() - start
+
+                start = time.perf_counter()
+                choice_dict = {bmo_instance: psc_analyzer._choose_psc_filename(bmo_instance) for bmo_instance, psc_ids in queries_list}
+                choice_s = time.perf_counter() - start
+
+                assert arrays_results == dict_results, 'PSC_fileinfo.get_keyscore() differs from DMS_keystats.get_keyscore()!'
+                matrix_str = '-'
+                if psc2alm.numpy is not None:
+                    # (same work as in PSC_Analyzer._choose_psc_filenames_batch(): building matrix and keyscores of all pairs)
+                    start = time.perf_counter()
+                    ids_queries = [(prefix_table.get_ids(bmo_instance), psc_ids) for bmo_instance, psc_ids in queries_list]
+                    keystats_matrix = psc2alm.PSC_keystats_matrix(fileinfos, {psc_id for bmo_instance, psc_ids in queries_list for psc_id in psc_ids})
+                    keystats_matrix.get_pair_keyscores(ids_queries)
+                    matrix_str = '{:.3f}'.format(time.perf_counter() - start)
+                    assert keystats_matrix.get_keyscores_batch(ids_queries) == dict_results, 'PSC_keystats_matrix differs from DMS_keystats.get_keyscore()!'
+                    del keystats_matrix
+
+                    # (batch choice without NumPy: temporary dictionaries of counters instead of matrix)
+                    psc_analyzer._best_psc_dict.clear()
+                    prev_numpy = psc2alm.numpy
+                    psc2alm.numpy = None
+                    try:
+                        psc_analyzer._choose_psc_filenames_batch()
+                    finally:
+                        psc2alm.numpy = prev_numpy
+                    assert {bmo_instance: psc_analyzer._best_psc_dict[bmo_instance] for bmo_instance in choice_dict} == choice_dict, 'batch choice without NumPy differs from choice one by one!'
+
+                psc_analyzer._best_psc_dict.clear()
+                start = time.perf_counter()
+                psc_analyzer._choose_psc_filenames_batch()
+                batch_s = time.perf_counter() - start
+                assert {bmo_instance: psc_analyzer._best_psc_dict[bmo_instance] for bmo_instance in choice_dict} == choice_dict, 'batch choice differs from choice one by one!'
+                print('\t{:>8} {:>10} {:>12} {:>10.3f} {:>10.3f} {:>10} {:>12.3f} {:>12.3f} {:>8}'.format(size,
+                                                                                                    len(queries_list),
+                                                                                                    nof_candidates,
+                                                                                                    dict_s,
+                                                                                                    arrays_s,
+                                                                                                    matrix_str,
+                                                                                                    choice_s,
+                                                                                                    batch_s,
+                                                                                                    'True'))
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+
+def _check_link_scores(link_graph, link_ranking, scores_dict, start_images):
+    # plausibility of ratings by PSC_linkgraph
+    if link_ranking == psc2alm.LINK_RANKING_INDEGREE:
+        assert sum(scores_dict.values()) == len(link_graph.edges), 'indegrees do not match number of links!'
+    elif link_ranking == psc2alm.LINK_RANKING_PAGERANK:
+        assert abs(sum(scores_dict.values()) - 1.0) < 1.0e-6, 'sum of PageRanks is not 1.0!'
+    else:
+        # (scores are negative depths, every link is at most one step deeper than its source)
+        for filename in start_images:
+            assert scores_dict[filename] == 0, 'depth of start image "' + filename + '" is not 0!'
+        for source_node, target_node in link_graph.edges:
+            assert scores_dict[link_graph.filenames[target_node]] >= scores_dict[link_graph.filenames[source_node]] - 1, 'depth is not minimal number of links!'
+
+
+def bench_links(sizes, start_images=('P00000.psc',)):
+    # rating of links with PSC_linkgraph built from PSC files and loaded from JSON file (--link_graph_in):
+    # both have to give same ratings and same mapping, also checks JSON round trip and plausibility of ratings
+    print('links: rating of links with rebuilt and loaded PSC_linkgraph (start images ' + ', '.join(start_images) + ')')
+    print('\t{:>8} {:>8} {:>10} {:>12} {:>12} {:>8}'.format('files', 'links', 'ranking', 'rebuilt [s]', 'loaded [s]', 'equal'))
+    loglevel = psc2alm.logger.level
+    psc2alm.logger.setLevel(logging.WARNING)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as project_path:
+                generate_project(project_path, size)
+                psc_analyzer = psc2alm.PSC_Analyzer(project_path, bmo_version=psc2alm.BMO_VERSION_1)
+                psc_analyzer.analyze()
+                link_graph = psc_analyzer.get_link_graph()
+                json_fullpath = os.path.join(project_path, 'link_graph.json')
+                link_graph.write_json(json_fullpath)
+                loaded_graph = psc2alm.PSC_linkgraph.read_json(json_fullpath)
+                assert loaded_graph.as_dict() == link_graph.as_dict(), 'PSC_linkgraph changed in JSON file!'
+
+                # indegree in graph is the reference counter of every PSC file
+                counters_dict = {fileinfo.name: psc_analyzer._psc_link_counter_dict.get(fileinfo.link_key, 0) for fileinfo in psc_analyzer._psc_fileinfos}
+                assert link_graph.get_indegrees() == counters_dict, 'indegrees in PSC_linkgraph differ from reference counters!'
+
+                for link_ranking in psc2alm.LINK_RANKINGS:
+                    results = []
+                    durations = []
+                    for curr_graph in (None, loaded_graph):
+                        psc_analyzer = psc2alm.PSC_Analyzer(project_path,
+                                                            bmo_version=psc2alm.BMO_VERSION_1,
+                                                            link_ranking=link_ranking,
+                                                            start_images=list(start_images),
+                                                            link_graph=curr_graph)
+                        psc_analyzer.analyze()
+                        start = time.perf_counter()
+                        mapping = psc_analyzer.get_psc_mapping()
+                        durations.append(time.perf_counter() - start)
+                        scores_dict = psc_analyzer._get_link_scores() if curr_graph or link_ranking != psc2alm.LINK_RANKING_INDEGREE else counters_dict
+                        results.append((mapping, scores_dict))
+                    _check_link_scores(link_graph, link_ranking, results[0][1], start_images)
+                    assert results[0] == results[1], 'rating with loaded PSC_linkgraph differs (link ranking "' + link_ranking + '")!'
+                    print('\t{:>8} {:>8} {:>10} {:>12.3f} {:>12.3f} {:>8}'.format(size,
+                                                                                   len(link_graph.edges),
+                                                                                   link_ranking,
+                                                                                   durations[0],
+                                                                                   durations[1],
+                                                                                   'True'))
+    finally:
+        psc2alm.logger.setLevel(loglevel)
+
+
+BENCHMARKS = ['bmo_index', 'psc_parser', 'parallel', 'cache', 'suite', 'writer', 'watch', 'offline', 'memory', 'batch', 'discovery', 'v2', 'backup', 'snapshot', 'keyscore', 'links']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks for hot paths of "psc2alm.py"')
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK', help='benchmarks to run: ' + ', '.join(BENCHMARKS) + ' (default: all)')
+    parser.add_argument('--sizes', '-n', dest='sizes', nargs='+', type=int, default=[1000, 10000, 100000], help='number of synthetic BMO instances (default: 1000 10000 100000)')
+    parser.add_argument('--suite_sizes', dest='suite_sizes', nargs='+', type=int, default=[100, 1000, 10000], help='number of synthetic PSC files for benchmark suite (default: 100 1000 10000)')
+    parser.add_argument('--latency', dest='latency', type=float, default=0.0, help='simulated DMS round-trip in seconds for benchmark suite (default: 0.0)')
+    parser.add_argument('--write_window', dest='write_window', type=int, default=1, help='number of parallel write requests into DMS for benchmark suite (default: 1)')
+    parser.add_argument('--json', '-j', dest='json_fullpath', default=None, help='save results of benchmark suite as JSON file')
+    parser.add_argument('--compare', dest='compare_fullpath', default=None, help='compare results of benchmark suite with an earlier JSON file')
+    parser.add_argument('--poll_interval', dest='poll_interval', type=float, default=psc2alm.WATCH_POLL_INTERVAL, help='seconds between scans of PSC folder for benchmark watch (default: ' + str(psc2alm.WATCH_POLL_INTERVAL) + ')')
+    parser.add_argument('--workers', '-w', dest='nof_workers', type=int, default=4, help='number of parallel workers for benchmark parallel (default: 4)')
+    parser.add_argument('--targets', dest='nof_targets', type=int, default=4, help='number of projects for benchmark batch (default: 4)')
+    parser.add_argument('--sizes_mb', '-m', dest='sizes_mb', nargs='+', type=float, default=[1, 10, 50], help='size of synthetic PSC file in MB (default: 1 10 50)')
+    args = parser.parse_args()
+    if not args.benchmarks:
+        args.benchmarks = BENCHMARKS
+    for name in args.benchmarks:
+        if not name in BENCHMARKS:
+            parser.error('unknown benchmark "' + name + '"')
+
+    if 'bmo_index' in args.benchmarks:
+        bench_bmo_index(args.sizes)
+    if 'psc_parser' in args.benchmarks:
+        bench_psc_parser(args.sizes_mb)
+    if 'parallel' in args.benchmarks:
+        bench_parallel(args.suite_sizes, nof_workers=args.nof_workers)
+    if 'cache' in args.benchmarks:
+        bench_cache(args.suite_sizes)
+    if 'suite' in args.benchmarks:
+        bench_suite(args.suite_sizes,
+                    latency=args.latency,
+                    write_window=args.write_window,
+                    json_fullpath=args.json_fullpath,
+                    compare_fullpath=args.compare_fullpath)
+    if 'writer' in args.benchmarks:
+        bench_writer(write_window=args.write_window if args.write_window > 1 else 8, latency=args.latency or 0.005)
+    if 'watch' in args.benchmarks:
+        bench_watch(args.suite_sizes, poll_interval=args.poll_interval)
+    if 'offline' in args.benchmarks:
+        bench_offline(args.suite_sizes, latency=args.latency)
+    if 'memory' in args.benchmarks:
+        bench_memory(args.suite_sizes)
+    if 'batch' in args.benchmarks:
+        bench_batch(args.suite_sizes, nof_targets=args.nof_targets, latency=args.latency)
+    if 'discovery' in args.benchmarks:
+        bench_discovery(args.suite_sizes)
+    if 'v2' in args.benchmarks:
+        bench_v2(args.suite_sizes)
+    if 'backup' in args.benchmarks:
+        bench_backup(args.suite_sizes)
+    if 'snapshot' in args.benchmarks:
+        bench_snapshot(args.suite_sizes, latency=args.latency)
+    if 'keyscore' in args.benchmarks:
+        bench_keyscore(args.suite_sizes)
+    if 'links' in args.benchmarks:
+        bench_links(args.suite_sizes)
@@ -24,14 +24,36 @@ If not, see <http://www.gnu.org/licenses/>.
 
 
 
-from visitoolkit_connector import connector
 import logging
 import argparse
+import array
+import asyncio
+import bisect
 import os
 import re
+import sqlite3
 import collections
+import contextlib
+import functools
+import gzip
+import hashlib
+import itertools
+import json
+import concurrent.futures
+import multiprocessing
+import queue
+import sys
+import threading
 import time
 
+try:
+    # optional: keyscores of all BMO instances in one batch (see PSC_keystats_matrix),
+    # without NumPy the DMS_keystats of every PSC file are queried one by one
+    # (not in requirements.txt: install it with "requirements-optional.txt", see README.md)
+    import numpy
+except ImportError:
+    numpy = None
+
 # setup of logging
 # (based on tutorial https://docs.python.org/2/howto/logging.html )
 # create logger =>set level to DEBUG if you want to catch all log messages!
@@ -60,6 +82,232 @@ BMO_VERSION_1 = 1
 BMO_VERSION_2 = 2
 bmo_version = BMO_VERSION_1
 
+# version of PSC parsing in _parse_psc_file()
+# =>increase it when parsing results change, then all entries in PSC_cache get invalid
+PSC_PARSER_VERSION = 1
+
+# patterns for records in PSC files
+# help with regex: https://stackoverflow.com/questions/6018340/capturing-group-with-findall
+# =>we search only for one group, so we get a list of strings
+# and not a list of tuples containing matched groups
+_PSC_LIB_BMO_PATTERN = re.compile(r'LIB;[\w\s]+\.plb;\w+;([\w:]+);BMO:.+')                     # BMO instances
+# buttons: group 1 is PSC filename, group 2 is BMO instance when button has reinit, otherwise it's a link to PSC file
+# (same matches as the former separate patterns r'IBW;[\w\s]+\.*\w*;\d+;\d+;\d+;\d+;BMO[\w:]+;([\w:]+);'
+#  and r'IBW;([\w\s]+\.*\w*);\d+;\d+;\d+;\d+;;', but only one regex pass is needed)
+_PSC_IBW_PATTERN = re.compile(r'IBW;([\w\s]+\.*\w*);\d+;\d+;\d+;\d+;(?:;|BMO[\w:]+;([\w:]+);)')
+# PSC file contains general information (e.g. alarm lamp)
+_PSC_GENERAL_MARKERS = ('LIB;Alarm01.plb;Alarm01;', 'LIB;BATT01_LED.plb;BATT01;')
+# measures for rating PSC files by links between them (see PSC_linkgraph):
+# -number of links to a PSC file
+# -minimal number of links from a start image (fewer is better)
+# -PageRank of PSC file
+LINK_RANKING_INDEGREE = 'indegree'
+LINK_RANKING_DEPTH = 'depth'
+LINK_RANKING_PAGERANK = 'pagerank'
+LINK_RANKINGS = (LINK_RANKING_INDEGREE, LINK_RANKING_DEPTH, LINK_RANKING_PAGERANK)
+# number of characters read at once from PSC file
+_PSC_BLOCKSIZE = 256 * 1024
+# PSC files in "scr" folder (default include pattern of PSC_discovery)
+# =>shortcut for big projects (assumption: PSC-files starting with "_" or a digit aren't BMOs): --exclude "^[_\d].*\.PSC"
+_PSC_FILENAME_PATTERN = re.compile(r'.*\.PSC', re.IGNORECASE)
+# number of PSC files sent at once to a worker process
+_PSC_PARSE_CHUNKSIZE = 16
+
+# DMS exportfiles are written by ProMoS NT(R) with Windows codepage
+DMS_EXPORTFILE_ENCODING = 'cp1252'
+
+# DMS backupfiles of old screen-mappings (see DMS_backupfile)
+BACKUP_MODE_FULL = 'full'
+BACKUP_MODE_CHANGES = 'changes'
+BACKUP_MODES = (BACKUP_MODE_FULL, BACKUP_MODE_CHANGES)
+BACKUP_BUFFERSIZE = 1024 * 1024
+# group 1: timestamp, group 2: counter of backupfiles in same second
+_BACKUP_FILENAME_PATTERN = re.compile(r'^PSC_to_ALM_Mapper_(\d{4}-\d\d-\d\d_\d\d\.\d\d\.\d\d)(?:_(\d+))?_old_values\.dms(?:\.gz)?$')
+
+# snapshot of applied screen-mappings (see ALM_snapshot)
+# =>increment SNAPSHOT_VERSION when meaning of stored screen-mappings changes
+SNAPSHOT_VERSION = 1
+SNAPSHOT_RECONCILE_DAYS = 7.0
+# more changed screen-mappings than this: one request for all "ALM:Screen" keys is faster than one request per ALM datapoint
+SNAPSHOT_VERIFY_LIMIT = 500
+
+# seconds between two scans of PSC folder in watch mode
+WATCH_POLL_INTERVAL = 0.25
+
+# maximum number of DMS keys with cached parts for DMS_keystats
+DMSKEY_PARTS_CACHESIZE = 128 * 1024
+
+# seconds to wait for WebSocket connection to DMS (same as in DMSClient._send_message() of visitoolkit_connector)
+DMS_CONNECT_TIMEOUT = 60.0
+
+# DMS keys needed for detection of project and BMO version (see _get_system_info())
+_SYSTEM_INFO_DMSKEYS = ('System:Version:dms.exe', 'System:Project', 'BMO:MES01:OBJECT')
+
+# visitoolkit_connector (and its WebSocket stack) is imported only when a live DMS session is needed,
+# use _get_connector() for access
+connector = None
+
+
+
+def _get_connector():
+    global connector
+    if connector is None:
+        from visitoolkit_connector import connector as connector_module
+        connector = connector_module
+    return connector
+
+
+
+class Run_metrics(object):
+    """ wall time, CPU time and counters of all phases of one run """
+    # =>phases are identified by name, a phase entered more than once is accumulated
+    # (CPU time is measured for whole process: when phases are running in parallel threads they include each other,
+    #  CPU time of worker processes is not included)
+
+    def __init__(self):
+        # key: phase name // value: dictionary with "wall_s", "cpu_s" and "calls"
+        self._phases_dict = collections.OrderedDict()
+
+        # key: counter name // value: number
+        self._counters_dict = collections.OrderedDict()
+
+        self._lock = threading.Lock()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall_s = time.perf_counter() - start_wall
+            cpu_s = time.process_time() - start_cpu
+            with self._lock:
+                if not name in self._phases_dict:
+                    self._phases_dict[name] = {'wall_s': 0.0, 'cpu_s': 0.0, 'calls': 0}
+                self._phases_dict[name]['wall_s'] += wall_s
+                self._phases_dict[name]['cpu_s'] += cpu_s
+                self._phases_dict[name]['calls'] += 1
+
+    def add(self, name, value=1):
+        with self._lock:
+            self._counters_dict[name] = self._counters_dict.get(name, 0) + value
+
+    def as_dict(self):
+        with self._lock:
+            phases_dict = collections.OrderedDict()
+            for name, phase_dict in self._phases_dict.items():
+                phases_dict[name] = {'wall_s': round(phase_dict['wall_s'], 6),
+                                     'cpu_s': round(phase_dict['cpu_s'], 6),
+                                     'calls': phase_dict['calls']}
+            return collections.OrderedDict([('total', {'wall_s': round(time.perf_counter() - self._start_wall, 6),
+                                                       'cpu_s': round(time.process_time() - self._start_cpu, 6)}),
+                                            ('phases', phases_dict),
+                                            ('counters', collections.OrderedDict(self._counters_dict)),
+                                            ('peak_memory_bytes', _get_peak_memory())])
+
+    def log_summary(self):
+        metrics_dict = self.as_dict()
+        for name, phase_dict in metrics_dict['phases'].items():
+            logger.info('Run_metrics: phase "' + name + '": ' + str(round(phase_dict['wall_s'], 3)) + 's wall, ' + str(round(phase_dict['cpu_s'], 3)) + 's CPU')
+        for name, value in metrics_dict['counters'].items():
+            logger.info('Run_metrics: ' + name + ' = ' + str(value))
+        if metrics_dict['peak_memory_bytes']:
+            logger.info('Run_metrics: peak memory ' + str(round(metrics_dict['peak_memory_bytes'] / (1024 * 1024), 1)) + ' MB')
+
+    def write_json(self, fullpath):
+        with open(fullpath, mode='w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+        logger.info('Run_metrics.write_json(): wrote metrics into "' + fullpath + '"')
+
+
+
+def _get_peak_memory():
+    # peak memory usage (resident set size) of this process in bytes, None when unknown
+    try:
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # unit is kilobytes on Linux, bytes on macOS
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+    except ImportError:
+        pass
+
+    # Windows: no module "resource", asking Windows API
+    # help from https://docs.microsoft.com/en-us/windows/desktop/api/psapi/ns-psapi-_process_memory_counters
+    try:
+        import ctypes
+        import ctypes.wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', ctypes.wintypes.DWORD),
+                        ('PageFaultCount', ctypes.wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t),
+                        ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t),
+                        ('PeakPagefileUsage', ctypes.c_size_t)]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                     ctypes.byref(counters),
+                                                     counters.cb):
+            return counters.PeakWorkingSetSize
+    except (ImportError, AttributeError, OSError):
+        pass
+    return None
+
+
+
+class DMS_meteredclient(object):
+    """ counts round-trips of a DMSClient """
+    # forwards all other attributes to the wrapped DMSClient
+
+    def __init__(self, dms_ws, metrics):
+        self.wrapped_dms_ws = dms_ws
+        self._metrics = metrics
+
+    def dp_get(self, path, **kwargs):
+        """ read datapoint value(s) """
+        self._metrics.add('dms_roundtrips')
+        return self.wrapped_dms_ws.dp_get(path, **kwargs)
+
+    def dp_set(self, path, **kwargs):
+        """ write datapoint value(s) """
+        self._metrics.add('dms_roundtrips')
+        return self.wrapped_dms_ws.dp_set(path, **kwargs)
+
+    def get_dp_subscription(self, path, **kwargs):
+        """ subscribe monitoring of datapoint(s) """
+        self._metrics.add('dms_roundtrips')
+        return self.wrapped_dms_ws.get_dp_subscription(path, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped_dms_ws, name)
+
+
+
+@functools.lru_cache(maxsize=DMSKEY_PARTS_CACHESIZE)
+def _get_dmskey_parts(dmskey):
+    # all parts of a DMS key counted in DMS_keystats, built only once per DMS key
+    # (same BMO instances appear in many PSC files and are queried for many ALM datapoints)
+    # =>attention: the parts are joined without ":", and first part is included twice,
+    #   e.g. "MSR01:H01:Uwp" =>("MSR01", "MSR01", "MSR01H01"),
+    #   keep this unchanged, otherwise all keyscores would change!
+    all_parts = dmskey.split(':')
+    parts_list = []
+    for x in range(len(all_parts)):
+        if x == 0:
+            new_parts_str = all_parts[0]
+        else:
+            new_parts_str = ''.join(all_parts[0:x])
+        parts_list.append(new_parts_str)
+    return tuple(parts_list)
+
 
 
 class DMS_keystats(object):
@@ -91,219 +339,1824 @@ class DMS_keystats(object):
     def __init__(self):
         # query keyscore of nonexistant DMS keys wont raise KeyError
         # help from https://www.accelebrate.com/blog/using-defaultdict-python/
-        self._pathcounter_dict = collections.defaultdict(lambda: 0)
+        # (int() as default factory instead of a lambda keeps this object picklable for worker processes)
+        self._pathcounter_dict = collections.defaultdict(int)
 
     def update_statistic(self, bmo_inst):
         if bmo_inst:
-            all_parts = bmo_inst.split(':')
-            for x in range(len(all_parts)):
-                if x == 0:
-                    new_parts_str = all_parts[0]
-                else:
-                    new_parts_str = ''.join(all_parts[0:x])
-                self._pathcounter_dict[new_parts_str] += 1
+            pathcounter_dict = self._pathcounter_dict
+            for new_parts_str in _get_dmskey_parts(bmo_inst):
+                pathcounter_dict[new_parts_str] += 1
 
 
     def get_keyscore(self, dmskey):
         if dmskey:
-            all_parts = dmskey.split(':')
+            # (dict.get() instead of defaultdict access: querying does not insert nonexistant DMS keys)
+            pathcounter_get = self._pathcounter_dict.get
             keyscore = 0
-            for x in range(len(all_parts)):
-                if x == 0:
-                    new_parts_str = all_parts[0]
-                else:
-                    new_parts_str = ''.join(all_parts[0:x])
-
-                keyscore = keyscore + self._pathcounter_dict[new_parts_str]
+            for new_parts_str in _get_dmskey_parts(dmskey):
+                keyscore = keyscore + pathcounter_get(new_parts_str, 0)
             return keyscore
 
+    def as_dict(self):
+        return dict(self._pathcounter_dict)
+
+    def update_from_dict(self, pathcounter_dict):
+        # restore statistics exported by as_dict()
+        for new_parts_str, counter in pathcounter_dict.items():
+            self._pathcounter_dict[new_parts_str] += counter
+
+
+
+class PSC_fileresult(object):
+    """ all facts found in one PSC file """
+    def __init__(self, fullpath):
+        self.fullpath = fullpath
+
+        # found BMO instances (without duplicates, in order of appearance)
+        self.bmo_instances = []
+
+        # DMS path statistics of all found BMO instances
+        self.keystats = DMS_keystats()
+
+        # PSC filenames of links to other PSC files (without reinit-links)
+        self.link_targets = []
+
+        # flag if PSC file contains general information
+        self.is_general = False
+
+        # size of PSC file (not stored in PSC_cache)
+        self.nof_bytes = 0
+
+    def as_dict(self):
+        return {'bmo_instances': self.bmo_instances,
+                'keystats': self.keystats.as_dict(),
+                'link_targets': self.link_targets,
+                'is_general': self.is_general}
+
+    @classmethod
+    def from_dict(cls, fullpath, curr_dict):
+        psc_result = cls(fullpath)
+        psc_result.bmo_instances = curr_dict['bmo_instances']
+        psc_result.keystats.update_from_dict(curr_dict['keystats'])
+        psc_result.link_targets = curr_dict['link_targets']
+        psc_result.is_general = curr_dict['is_general']
+        return psc_result
+
+
+
+def _parse_psc_file(fullpath, only_bmo_instances=False):
+    # search all facts in one PSC file
+    # (module level function: it has to be picklable for worker processes in PSC_Analyzer.analyze())
+    # =>PSC records are line-oriented, so PSC file is streamed in blocks of whole lines
+    #   (memory usage does not depend on size of PSC file),
+    #   every block is scanned once for "LIB" records and once for "IBW" records
+    # =>with "only_bmo_instances" no DMS path statistics, links and general flag are collected (BMOs version 2)
+    logger.debug('_parse_psc_file(): analyzing PSC file "' + fullpath + '"')
+    psc_result = PSC_fileresult(fullpath)
+    # (BMO instances are ordered as in earlier versions: first all "LIB" records, then all buttons with reinit)
+    found_lib_instances = collections.OrderedDict()
+    found_ibw_instances = collections.OrderedDict()
+    update_statistic = psc_result.keystats.update_statistic
+
+    # correct encoding in Python 3: Hints from
+    # http://python-notes.curiousefficiency.org/en/latest/python3/text_file_processing.html
+    with open(fullpath, mode='r', encoding='cp1252') as f:
+        psc_result.nof_bytes = os.fstat(f.fileno()).st_size
+        remainder = ''
+        while True:
+            block = f.read(_PSC_BLOCKSIZE)
+            if block:
+                # incomplete last line is processed together with next block
+                psc_content = remainder + block
+                end_idx = psc_content.rfind('\n') + 1
+                remainder = psc_content[end_idx:]
+                psc_content = psc_content[:end_idx]
+            else:
+                # end of file
+                psc_content = remainder
 
+            if only_bmo_instances:
+                found_lib_instances.update(dict.fromkeys(_PSC_LIB_BMO_PATTERN.findall(psc_content)))
+                found_ibw_instances.update(dict.fromkeys(bmo_inst for target, bmo_inst in _PSC_IBW_PATTERN.findall(psc_content) if bmo_inst))
+            else:
+                for bmo_inst in _PSC_LIB_BMO_PATTERN.findall(psc_content):
+                    found_lib_instances[bmo_inst] = None
+                    # update DMS path statistics of current PSC file
+                    update_statistic(bmo_inst)
+
+                for target, bmo_inst in _PSC_IBW_PATTERN.findall(psc_content):
+                    if bmo_inst:
+                        # button with reinit
+                        found_ibw_instances[bmo_inst] = None
+                        update_statistic(bmo_inst)
+                    else:
+                        # collect references between PSCs
+                        psc_result.link_targets.append(target)
 
-class PSC_Analyzer(object):
-    """ searches in PSC files for all BMO instances """
-    def __init__(self, project_path):
-        self._psc_path = os.path.join(project_path, 'scr')
+                # collect flag if PSC file contains general information
+                if _PSC_GENERAL_MARKERS[0] in psc_content or _PSC_GENERAL_MARKERS[1] in psc_content:
+                    psc_result.is_general = True
+
+            if not block:
+                break
+
+    found_lib_instances.update(found_ibw_instances)
+    psc_result.bmo_instances = list(found_lib_instances)
+    logger.debug('_parse_psc_file(): found ' + str(len(psc_result.bmo_instances)) + ' BMO instances.')
+    return psc_result
+
+
+
+class PSC_discovery(object):
+    """ finds PSC files in a folder, optionally in all its subfolders """
+    # based on os.scandir(): type and (on Windows) stat of a file are taken from directory listing,
+    # PSC files are yielded while listing is still running, so parsing can start immediately
+    # =>patterns are searched in filename (not in path), ignoring case as on Windows
+
+    def __init__(self, include_patterns=None, exclude_patterns=None, recursive=False):
+        # PSC file must match one of "include_patterns" and none of "exclude_patterns"
+        # (subfolders matching one of "exclude_patterns" are skipped)
+        self._include_patterns = [PSC_discovery._compile(pattern) for pattern in include_patterns or [_PSC_FILENAME_PATTERN]]
+        self._exclude_patterns = [PSC_discovery._compile(pattern) for pattern in exclude_patterns or []]
+        self._recursive = recursive
+
+    @staticmethod
+    def _compile(pattern):
+        if isinstance(pattern, str):
+            return re.compile(pattern, re.IGNORECASE)
+        return pattern
+
+    def _is_excluded(self, name):
+        for pattern in self._exclude_patterns:
+            if pattern.search(name):
+                return True
+        return False
+
+    def scan(self, path):
+        # yields os.DirEntry of every PSC file (subfolders are traversed when they appear in listing)
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        if not self._is_excluded(entry.name):
+                            for pattern in self._include_patterns:
+                                if pattern.search(entry.name):
+                                    yield entry
+                                    break
+                    elif self._recursive and entry.is_dir(follow_symlinks=False) and not self._is_excluded(entry.name):
+                        for sub_entry in self.scan(entry.path):
+                            yield sub_entry
+                except FileNotFoundError:
+                    # removed during scan
+                    pass
+                except OSError as ex:
+                    # e.g. no permission for a subfolder or network share disconnected: other entries are still found
+                    logger.warning('PSC_discovery.scan(): skipping "' + entry.path + '": ' + repr(ex))
+
+
+
+def _parse_psc_files(fullpaths, only_bmo_instances=False):
+    # parsing a chunk of PSC files in a worker (fewer round-trips to worker processes)
+    return [_parse_psc_file(fullpath, only_bmo_instances) for fullpath in fullpaths]
+
+
+
+class PSC_cache(object):
+    """ persistent cache of parsing results of PSC files """
+    # JSON file, every PSC file is stored with its modification time and size:
+    # =>when both are unchanged then we reuse the stored PSC_fileresult instead of parsing the PSC file again
+    # =>whole cache gets invalid when PSC_PARSER_VERSION changes
+
+    def __init__(self, cache_fullpath):
+        self._cache_fullpath = cache_fullpath
+
+        # key: PSC-filename // value: dictionary with "mtime", "size" and PSC_fileresult.as_dict()
+        self._entries_dict = {}
+
+        # key: PSC-filename // value: os.stat_result of PSC files missing in cache
+        # (taken before parsing, so a PSC file changed while parsing gets parsed again in next run)
+        self._pending_stat_dict = {}
+
+        self.nof_hits = 0
+        self.nof_misses = 0
 
-        # key: BMO instance // value: list of filenames
-        self._bmo_instances_dict = {}
+        try:
+            with open(self._cache_fullpath, mode='r', encoding='utf-8') as f:
+                cache_dict = json.load(f)
+            if cache_dict.get('parser_version') == PSC_PARSER_VERSION:
+                self._entries_dict = cache_dict['files']
+                logger.info('PSC_cache(): loaded ' + str(len(self._entries_dict)) + ' PSC files from "' + self._cache_fullpath + '"')
+            else:
+                logger.info('PSC_cache(): ignoring "' + self._cache_fullpath + '", it was written by another parser version.')
+        except FileNotFoundError:
+            logger.info('PSC_cache(): cachefile "' + self._cache_fullpath + '" does not exist, all PSC files will be parsed.')
+        except (ValueError, KeyError, TypeError):
+            logger.warning('PSC_cache(): ignoring corrupted cachefile "' + self._cache_fullpath + '"')
+
+    def is_current(self, fullpath, stat=None):
+        # flag if cached PSC_fileresult of this PSC file is valid (False when PSC file is new or changed)
+        # (stat of directory listing can be given, see PSC_discovery)
+        stat = stat or os.stat(fullpath)
+        entry = self._entries_dict.get(fullpath)
+        if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            self.nof_hits += 1
+            return True
+        else:
+            self.nof_misses += 1
+            self._pending_stat_dict[fullpath] = stat
+            return False
+
+    def get(self, fullpath):
+        # returns cached PSC_fileresult object (call is_current() first)
+        return PSC_fileresult.from_dict(fullpath, self._entries_dict[fullpath]['result'])
+
+    def put(self, psc_result):
+        stat = self._pending_stat_dict.pop(psc_result.fullpath, None)
+        if not stat:
+            stat = os.stat(psc_result.fullpath)
+        self._entries_dict[psc_result.fullpath] = {'mtime': stat.st_mtime_ns,
+                                                   'size': stat.st_size,
+                                                   'result': psc_result.as_dict()}
+
+    def save(self, keep_fullpaths=None):
+        # write cachefile, optionally dropping all PSC files not in "keep_fullpaths" (e.g. deleted PSC files)
+        if keep_fullpaths is not None:
+            keep_set = set(keep_fullpaths)
+            for fullpath in list(self._entries_dict):
+                if not fullpath in keep_set:
+                    del self._entries_dict[fullpath]
+
+        # writing into temporary file first: an interrupted run should not leave a corrupted cachefile
+        tmp_fullpath = self._cache_fullpath + '.tmp'
+        with open(tmp_fullpath, mode='w', encoding='utf-8') as f:
+            json.dump({'parser_version': PSC_PARSER_VERSION,
+                       'files': self._entries_dict}, f)
+        os.replace(tmp_fullpath, self._cache_fullpath)
+        logger.debug('PSC_cache.save(): wrote ' + str(len(self._entries_dict)) + ' PSC files into "' + self._cache_fullpath + '"')
+
+
+
+class PSC_sharedcache(object):
+    """ in-memory cache of parsing results, shared by all projects in batch mode """
+    # same interface as PSC_cache, but safe for concurrent use by several PSC_Analyzer objects:
+    # =>a PSC file with unchanged modification time and size is reused without reading it
+    # =>a PSC file with same content as an already parsed PSC file (e.g. a library image copied into
+    #   many projects) is only read for its checksum, regex parsing is much more expensive
+    # =>only PSC files with same filename and size as an already parsed PSC file are read for a checksum
+    #   (most PSC files are unique, they are read only once by parsing, checksum of the parsed PSC file
+    #    is taken on first PSC file of same filename and size)
 
-        # key: PSC-filename // value: DMS_keystats object
-        self._psc_dms_keystats = {}
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # key: PSC-filename // value: (modification time, size, ID of result) of parsed or reused PSC file
+        self._stats_dict = {}
+
+        # ID of result is index: PSC_fileresult.as_dict(), and (PSC-filename, modification time, size) of parsed PSC file
+        self._results_list = []
+        self._sources_list = []
+
+        # key: (filename in lowercase, size) // value: list of IDs of results
+        self._groups_dict = {}
+
+        # key: checksum of PSC file content // value: ID of result
+        # (IDs of results with checksum already taken, or with changed PSC file, are in "_checksummed_set")
+        self._checksums_dict = {}
+        self._checksummed_set = set()
+
+        # key: PSC-filename // value: (modification time, size, key in "_groups_dict", checksum or None) of PSC files not parsed yet
+        self._pending_stat_dict = {}
+
+        self.nof_hits = 0
+        self.nof_misses = 0
+
+        # number of PSC files read only for their checksum
+        self.nof_checksums = 0
+
+    def _get_checksum(self, fullpath):
+        with self._lock:
+            self.nof_checksums += 1
+        curr_hash = hashlib.sha1()
+        with open(fullpath, mode='rb') as f:
+            while True:
+                block = f.read(_PSC_BLOCKSIZE)
+                if not block:
+                    break
+                curr_hash.update(block)
+        return curr_hash.hexdigest()
+
+    def _add_source_checksum(self, result_id):
+        # checksum of parsed PSC file of a result, taken once when another PSC file may have same content
+        # (reading PSC file without lock, a PSC file changed since parsing gets no checksum)
+        with self._lock:
+            if result_id in self._checksummed_set:
+                return
+            fullpath, mtime_ns, size = self._sources_list[result_id]
+        checksum = None
+        try:
+            stat = os.stat(fullpath)
+            if (stat.st_mtime_ns, stat.st_size) == (mtime_ns, size):
+                checksum = self._get_checksum(fullpath)
+                stat = os.stat(fullpath)
+                if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+                    checksum = None
+        except OSError:
+            pass
+        with self._lock:
+            self._checksummed_set.add(result_id)
+            if checksum:
+                self._checksums_dict.setdefault(checksum, result_id)
+
+    def is_current(self, fullpath, stat=None):
+        # flag if a cached PSC_fileresult is valid for this PSC file (False when it has to be parsed)
+        stat = stat or os.stat(fullpath)
+        group_key = (os.path.basename(fullpath).lower(), stat.st_size)
+        with self._lock:
+            entry = self._stats_dict.get(fullpath)
+            if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self.nof_hits += 1
+                return True
+            result_ids = list(self._groups_dict.get(group_key, []))
+
+        checksum = None
+        if result_ids:
+            # maybe a copy of an already parsed PSC file: comparing content
+            checksum = self._get_checksum(fullpath)
+            for result_id in result_ids:
+                self._add_source_checksum(result_id)
+        with self._lock:
+            result_id = self._checksums_dict.get(checksum) if checksum else None
+            if result_id is not None:
+                self._stats_dict[fullpath] = (stat.st_mtime_ns, stat.st_size, result_id)
+                self.nof_hits += 1
+                return True
+            else:
+                self._pending_stat_dict[fullpath] = (stat.st_mtime_ns, stat.st_size, group_key, checksum)
+                self.nof_misses += 1
+                return False
+
+    def get(self, fullpath):
+        # returns cached PSC_fileresult object (call is_current() first)
+        with self._lock:
+            result_dict = self._results_list[self._stats_dict[fullpath][2]]
+        return PSC_fileresult.from_dict(fullpath, result_dict)
+
+    def put(self, psc_result):
+        with self._lock:
+            entry = self._pending_stat_dict.pop(psc_result.fullpath, None)
+            if entry:
+                mtime_ns, size, group_key, checksum = entry
+                result_id = len(self._results_list)
+                self._results_list.append(psc_result.as_dict())
+                self._sources_list.append((psc_result.fullpath, mtime_ns, size))
+                self._groups_dict.setdefault(group_key, []).append(result_id)
+                if checksum:
+                    # (checksum was already taken in is_current())
+                    self._checksums_dict.setdefault(checksum, result_id)
+                    self._checksummed_set.add(result_id)
+                self._stats_dict[psc_result.fullpath] = (mtime_ns, size, result_id)
+
+    def save(self, keep_fullpaths=None):
+        # nothing to save: cache lives as long as batch run, and other projects may still need all entries
+        pass
+
+
+
+class DMS_prefix_table(object):
+    """ shared table of all DMS key parts counted in DMS_keystats """
+    # every distinct part gets an integer ID, then statistics of a PSC file are two small integer arrays
+    # (one copy of every part string for whole project instead of one copy per PSC file)
 
-        # key: PSC-filename // value: number of references to this PSC file
-        self._psc_ref_counter_dict = {}
+    def __init__(self):
+        # key: part of DMS key (see _get_dmskey_parts()) // value: ID
+        self._ids_dict = {}
 
-        # key: PSC-filename // value: flag if PSC file contains general information
-        self._psc_is_general_dict = {}
+    def add(self, part_str):
+        # returns ID of this part, a new part gets next free ID
+        try:
+            return self._ids_dict[part_str]
+        except KeyError:
+            part_id = len(self._ids_dict)
+            self._ids_dict[part_str] = part_id
+            return part_id
+
+    def get_ids(self, dmskey):
+        # IDs of all parts of a DMS key (-1 for parts not found in any PSC file)
+        ids_get = self._ids_dict.get
+        return tuple([ids_get(part_str, -1) for part_str in _get_dmskey_parts(dmskey)])
+
+    def __len__(self):
+        return len(self._ids_dict)
+
+
+
+class PSC_fileinfo(object):
+    """ compact facts of one PSC file, as stored in PSC_Analyzer """
+    # (__slots__: thousands of these objects exist, no per-object dictionary is needed)
+    __slots__ = ('fullpath', 'name', 'link_key', 'bmo_instances', 'link_targets', 'is_general', 'part_ids', 'part_counters')
+
+    def __init__(self, psc_result, prefix_table, name):
+        self.fullpath = psc_result.fullpath
+
+        # name relative to PSC folder (see PSC_Analyzer.get_psc_name()), and in lowercase as used for links
+        # =>taken once, they are needed for every rating of this PSC file
+        self.name = name
+        self.link_key = sys.intern(name.lower())
+
+        # (interned link targets: same PSC files are linked by many PSC files,
+        #  BMO instances are mostly unique in a project, they are stored only as tuple)
+        self.bmo_instances = tuple(psc_result.bmo_instances)
+        self.link_targets = tuple(sys.intern(target) for target in psc_result.link_targets)
+        self.is_general = psc_result.is_general
+
+        # DMS_keystats as two arrays sorted by ID of DMS key part: IDs and their counters
+        # =>choosing PSC files of all BMO instances uses temporary dictionaries (see get_counters_dict()),
+        #   binary search in the arrays is only used for single BMO instances, e.g. after update_files()
+        counters_list = sorted((prefix_table.add(part_str), counter) for part_str, counter in psc_result.keystats.as_dict().items())
+        self.part_ids = array.array('I', [part_id for part_id, counter in counters_list])
+        self.part_counters = array.array('I', [counter for part_id, counter in counters_list])
+
+    def get_keyscore(self, part_ids, counters_dict=None):
+        # same result as DMS_keystats.get_keyscore(), "part_ids" are from DMS_prefix_table.get_ids()
+        # ("counters_dict" from get_counters_dict() is faster when many keyscores of this PSC file are needed)
+        keyscore = 0
+        if counters_dict is not None:
+            counters_get = counters_dict.get
+            for part_id in part_ids:
+                keyscore = keyscore + counters_get(part_id, 0)
+        else:
+            nof_parts = len(self.part_ids)
+            for part_id in part_ids:
+                idx = bisect.bisect_left(self.part_ids, part_id) if part_id >= 0 else nof_parts
+                if idx < nof_parts and self.part_ids[idx] == part_id:
+                    keyscore = keyscore + self.part_counters[idx]
+        return keyscore
+
+    def get_counters_dict(self):
+        # DMS_keystats as dictionary {ID of DMS key part: counter}
+        return dict(zip(self.part_ids, self.part_counters))
+
+
+
+class PSC_keystats_matrix(object):
+    """ columnar DMS_keystats of many PSC files: counter of every DMS key part in every PSC file (needs NumPy) """
+    # sparse matrix (PSC file x DMS key part) in CSR style: parts of every PSC file are one contiguous row,
+    # one sorted array of keys "ID of PSC file * number of part IDs + ID of DMS key part" and one array of counters
+    # =>keyscores of all BMO instances in all their PSC files are one search, one gather and one sum over all pairs
+    #   (instead of one lookup per PSC file and DMS key part)
+    # =>built only for PSC files which are candidates of a BMO instance, with same results as PSC_fileinfo.get_keyscore()
+
+    def __init__(self, psc_fileinfos, psc_ids):
+        # all parts of these PSC files concatenated in order of PSC IDs
+        # (parts of every PSC file are in ascending order of their IDs, so the keys are already sorted)
+        part_ids = array.array('I')
+        part_counters = array.array('I')
+        lengths_list = []
+        psc_ids = sorted(psc_ids)
+        for psc_id in psc_ids:
+            fileinfo = psc_fileinfos[psc_id]
+            part_ids.extend(fileinfo.part_ids)
+            part_counters.extend(fileinfo.part_counters)
+            lengths_list.append(len(fileinfo.part_ids))
+
+        # stride of keys: highest part ID in these PSC files + 1 (other parts are never found)
+        parts = numpy.frombuffer(part_ids, dtype=numpy.uint32).astype(numpy.int64)
+        self._nof_parts = int(parts.max()) + 1 if len(parts) else 0
+        self._keys = numpy.repeat(numpy.array(psc_ids, dtype=numpy.int64) * self._nof_parts, lengths_list) + parts
+        self._counters = numpy.frombuffer(part_counters, dtype=numpy.uint32).astype(numpy.int64)
+
+    def get_keyscores(self, part_ids, psc_ids):
+        # keyscores of one BMO instance in all given PSC files, "part_ids" are from DMS_prefix_table.get_ids()
+        return self.get_keyscores_batch([(part_ids, psc_ids)])[0]
+
+    def get_keyscores_batch(self, queries):
+        # keyscores of many BMO instances: list of (part IDs, PSC IDs) =>list of lists of keyscores
+        keyscores = self.get_pair_keyscores(queries).tolist()
+        keyscores_list = []
+        start = 0
+        for part_ids, psc_ids in queries:
+            keyscores_list.append(keyscores[start:start + len(psc_ids)])
+            start += len(psc_ids)
+        return keyscores_list
+
+    def get_pair_keyscores(self, queries):
+        # keyscores of many BMO instances: list of (part IDs, PSC IDs) =>NumPy array with keyscores of all pairs (query, PSC ID)
+        if not queries:
+            return numpy.zeros(0, dtype=numpy.int64)
+
+        # parts and PSC IDs of all queries concatenated, every pair (query, PSC file) needs the parts of its query
+        # (parts not found in any PSC file are -1, parts missing in these PSC files are never found)
+        (parts, part_lengths), (pair_psc_ids, psc_lengths) = [(numpy.array(list(itertools.chain.from_iterable(column)), dtype=numpy.int64),
+                                                               numpy.array(list(map(len, column)), dtype=numpy.int64)) for column in zip(*queries)]
+        if not len(self._keys):
+            return numpy.zeros(len(pair_psc_ids), dtype=numpy.int64)
+        part_starts = numpy.cumsum(part_lengths) - part_lengths
+        pair_queries = numpy.repeat(numpy.arange(len(queries)), psc_lengths)
+        pair_lengths = part_lengths[pair_queries]
+        pair_starts = numpy.cumsum(pair_lengths) - pair_lengths
+
+        # keys of all parts of all pairs: index of every part in "parts" is start of its query + position in its pair
+        nof_needles = int(pair_lengths.sum())
+        part_idx = numpy.arange(nof_needles) + numpy.repeat(part_starts[pair_queries] - pair_starts, pair_lengths)
+        needle_parts = parts[part_idx]
+        needles = numpy.repeat(pair_psc_ids * self._nof_parts, pair_lengths) + needle_parts
+
+        # gather counters of existing keys and sum them per pair
+        # (a part contained twice in "part_ids" is counted twice, as in DMS_keystats.get_keyscore())
+        idx = numpy.minimum(numpy.searchsorted(self._keys, needles), len(self._keys) - 1)
+        is_found = (self._keys[idx] == needles) & (needle_parts >= 0) & (needle_parts < self._nof_parts)
+        counters = numpy.where(is_found, self._counters[idx], 0)
+        keyscores = numpy.zeros(len(pair_psc_ids), dtype=numpy.int64)
+        has_parts = pair_lengths > 0
+        if nof_needles:
+            keyscores[has_parts] = numpy.add.reduceat(counters, pair_starts[has_parts])
+        return keyscores
+
+
+
+class PSC_linkgraph(object):
+    """ directed graph of links between PSC files (IBW links without reinit) """
+    # nodes are names of PSC files (relative to PSC folder, see PSC_Analyzer.get_psc_name()), edges are links from one PSC file to another existing PSC file
+    # (multiple links between same PSC files are multiple edges, as in number of references)
+
+    def __init__(self, filenames, edges):
+        # list of filenames, index is number of node
+        self.filenames = list(filenames)
+
+        # list of (source node, target node)
+        self.edges = list(edges)
+
+    def get_indegrees(self):
+        # key: filename // value: number of links to this PSC file
+        counter_list = [0] * len(self.filenames)
+        for source_node, target_node in self.edges:
+            counter_list[target_node] += 1
+        return dict(zip(self.filenames, counter_list))
+
+    def get_depths(self, start_filenames=None):
+        # key: filename // value: minimal number of links from a start image to this PSC file (None when unreachable)
+        # (without start images every PSC file without links to it is a start image)
+        successors_list = [[] for x in range(len(self.filenames))]
+        has_link_list = [False] * len(self.filenames)
+        for source_node, target_node in self.edges:
+            successors_list[source_node].append(target_node)
+            has_link_list[target_node] = True
+
+        if start_filenames:
+            start_set = set(filename.lower() for filename in start_filenames)
+            current_nodes = [node for node, filename in enumerate(self.filenames) if filename.lower() in start_set]
+        else:
+            current_nodes = [node for node, has_link in enumerate(has_link_list) if not has_link]
+
+        # breadth-first search
+        depth_list = [None] * len(self.filenames)
+        for node in current_nodes:
+            depth_list[node] = 0
+        curr_depth = 0
+        while current_nodes:
+            curr_depth += 1
+            next_nodes = []
+            for node in current_nodes:
+                for target_node in successors_list[node]:
+                    if depth_list[target_node] is None:
+                        depth_list[target_node] = curr_depth
+                        next_nodes.append(target_node)
+            current_nodes = next_nodes
+        return dict(zip(self.filenames, depth_list))
+
+    def get_pageranks(self, damping=0.85, max_iterations=100, tolerance=1.0e-9):
+        # key: filename // value: PageRank of this PSC file (sum of all values is 1.0)
+        # idea from https://en.wikipedia.org/wiki/PageRank (power iteration, PSC files without links are distributing evenly)
+        nof_nodes = len(self.filenames)
+        if not nof_nodes:
+            return {}
+        outdegree_list = [0] * nof_nodes
+        for source_node, target_node in self.edges:
+            outdegree_list[source_node] += 1
+
+        rank_list = [1.0 / nof_nodes] * nof_nodes
+        for x in range(max_iterations):
+            dangling_sum = sum(rank for node, rank in enumerate(rank_list) if not outdegree_list[node])
+            base_rank = (1.0 - damping) / nof_nodes + damping * dangling_sum / nof_nodes
+            new_rank_list = [base_rank] * nof_nodes
+            for source_node, target_node in self.edges:
+                new_rank_list[target_node] += damping * rank_list[source_node] / outdegree_list[source_node]
+            delta = sum(abs(new_rank - rank) for new_rank, rank in zip(new_rank_list, rank_list))
+            rank_list = new_rank_list
+            if delta < tolerance:
+                break
+        return dict(zip(self.filenames, rank_list))
+
+    def as_dict(self):
+        return {'filenames': self.filenames,
+                'edges': self.edges}
+
+    @classmethod
+    def from_dict(cls, curr_dict):
+        return cls(filenames=curr_dict['filenames'],
+                   edges=[tuple(edge) for edge in curr_dict['edges']])
+
+    def write_json(self, fullpath):
+        with open(fullpath, mode='w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f)
+        logger.info('PSC_linkgraph.write_json(): wrote ' + str(len(self.filenames)) + ' PSC files and ' + str(len(self.edges)) + ' links into "' + fullpath + '"')
+
+    @classmethod
+    def read_json(cls, fullpath):
+        with open(fullpath, mode='r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
 
-    def analyze(self):
-        logger.info('PSC_Analyzer.analyze(): searching LIB and IBW attributes in all PSC files...')
-        nof_files = 0
-        for fullpath in self._filelist_generator(self._psc_path):
-            nof_files += 1
-            logger.debug('PSC_Analyzer.analyze(): analyzing PSC file "' + fullpath + '"')
-            # correct encoding in Python 3: Hints from
-            # http://python-notes.curiousefficiency.org/en/latest/python3/text_file_processing.html
-            with open(fullpath, mode='r', encoding='cp1252') as f:
-                psc_content = f.read()
-
-                if not fullpath in self._psc_dms_keystats:
-                    self._psc_dms_keystats[fullpath] = DMS_keystats()
-
-                # help with regex: https://stackoverflow.com/questions/6018340/capturing-group-with-findall
-                # =>we search only for one group, so we get a list of strings
-                # and not a list of tuples containing matched groups
-                patterns = [re.compile(r'LIB;[\w\s]+\.plb;\w+;([\w:]+);BMO:.+'),                    # BMO instances
-                            re.compile(r'IBW;[\w\s]+\.*\w*;\d+;\d+;\d+;\d+;BMO[\w:]+;([\w:]+);')]   # button with reinit
-                for pattern in patterns:
-                    for bmo_inst in pattern.findall(psc_content):
-                        #logger.debug('PSC_Analyzer.analyze(): found BMO instance "' + bmo_inst + '")')
-
-                        # add current PSC file as possible target for ALM "Screen" of this BMO instance
-                        if not bmo_inst in self._bmo_instances_dict:
-                            self._bmo_instances_dict[bmo_inst] = []
-                        if not fullpath in self._bmo_instances_dict[bmo_inst]:
-                            self._bmo_instances_dict[bmo_inst].append(fullpath)
-
-                        # update DMS path statistics of current PSC file
-                        self._psc_dms_keystats[fullpath].update_statistic(bmo_inst)
-
-                logger.debug('PSC_Analyzer.analyze(): found ' + str(len(self._bmo_instances_dict[bmo_inst])) + ' BMO instances.')
-
-                # collect references between PSCs
-                # without reinit-links
-                for target in re.compile(r'IBW;([\w\s]+\.*\w*);\d+;\d+;\d+;\d+;;').findall(psc_content):
-                    target_fullpath = os.path.join(self._psc_path, target)
-                    if os.path.isfile(target_fullpath):
-                        # increase reference counter on available PSC files
-                        if not target_fullpath in self._psc_ref_counter_dict:
-                            self._psc_ref_counter_dict[target_fullpath] = 0
-                        self._psc_ref_counter_dict[target_fullpath] += 1
 
-                # collect flag if PSC file contains general information
-                if 'LIB;Alarm01.plb;Alarm01;' in psc_content or 'LIB;BATT01_LED.plb;BATT01;' in psc_content:
-                    self._psc_is_general_dict[fullpath] = True
 
+class PSC_Analyzer(object):
+    """ searches in PSC files for all BMO instances """
+    def __init__(self, project_path, metrics=None, bmo_version=None, link_ranking=LINK_RANKING_INDEGREE, start_images=None, psc_discovery=None, keep_psc_facts=True, link_graph=None):
+        self._psc_path = os.path.join(project_path, 'scr')
+        self._metrics = metrics or Run_metrics()
+        self._discovery = psc_discovery or PSC_discovery()
+
+        # measure for rating links to a PSC file (one of LINK_RANKINGS),
+        # start images are used by LINK_RANKING_DEPTH (default: all PSC files without links to them)
+        self._link_ranking = link_ranking
+        self._start_images = start_images
+
+        # PSC_linkgraph for rating of links instead of links found in analyze() (e.g. loaded by --link_graph_in)
+        # =>it is not changed by update_files(), PSC files missing in it get worst rating
+        self._link_graph = link_graph
+
+        # BMO version of this project (None: module setting "bmo_version" is used)
+        # =>batch mode maps projects with different BMO versions at the same time
+        self._bmo_version = bmo_version
+
+        # flag if facts of every PSC file are kept (needed by update_files() and get_link_graph())
+        # =>without them a project with BMOs version 2 keeps only lowest PSC-filename of every BMO instance,
+        #   updated while scanning (see _is_v2_fastpath())
+        self._keep_psc_facts = keep_psc_facts
+
+        # table of all PSC files: ID of a PSC file is its index
+        # (value: PSC_fileinfo object, or None when PSC file was removed in watch mode)
+        # =>IDs are ascending in order of filelist, a new PSC file in watch mode gets the next ID,
+        #   a changed PSC file keeps its ID (on equal rating the PSC file with higher ID wins)
+        self._psc_fileinfos = []
+
+        # key: PSC-filename // value: ID of PSC file
+        self._psc_ids_dict = {}
+
+        # listing of PSC folder for resolving link targets, taken once in analyze()
+        # key: name relative to PSC folder in lowercase (ProMoS NT runs on Windows: links are case-insensitive) // value: ID of PSC file
+        self._psc_names_dict = {}
+
+        # key: BMO instance // value: ID of PSC file, or list of IDs of PSC files (ascending)
+        # (most BMO instances are found in only one PSC file, a single ID needs no list object)
+        self._bmo_instances_dict = {}
+
+        # key: link target as in "_psc_names_dict" (see _get_link_key()) // value: number of links to this PSC file
+        # (missing link targets are counted too, but they are never looked up)
+        self._psc_link_counter_dict = {}
 
-        logger.info('PSC_Analyzer.analyze(): found total ' + str(len(self._bmo_instances_dict)) + ' BMO instances in ' + str(nof_files) + ' PSC files.')
-        logger.info('PSC_Analyzer.analyze(): found total ' + str(len(self._psc_ref_counter_dict)) + ' valid links between PSC files.')
+        # key: name of PSC file // value: rating of links by PSC_linkgraph (cache for LINK_RANKING_DEPTH and LINK_RANKING_PAGERANK,
+        # and for LINK_RANKING_INDEGREE with given PSC_linkgraph), rating of PSC files missing in it
+        self._link_scores_dict = None
+        self._link_score_default = 0
 
+        # IDs of all parts of DMS keys used in DMS_keystats of the PSC files
+        self._prefix_table = DMS_prefix_table()
 
-    def _filelist_generator(self, path):
-        for entry in os.listdir(path):
-            fullpath = os.path.join(path, entry)
+        # key: BMO instance // value: best suited PSC-filename (cache of get_psc_filename())
+        # =>valid for BMO version in "_best_psc_version"
+        self._best_psc_dict = {}
+        self._best_psc_version = None
+
+    def analyze(self, nof_workers=1, use_threads=False, psc_cache=None):
+        logger.info('PSC_Analyzer.analyze(): searching LIB and IBW attributes in all PSC files...')
+        self._best_psc_dict.clear()
+        self._link_scores_dict = None
+        # (without PSC cache only BMO instances are needed in fast path, cached results have to be complete)
+        only_bmo_instances = self._is_v2_fastpath() and not psc_cache
+        if self._is_v2_fastpath():
+            logger.info('PSC_Analyzer.analyze(): BMOs version 2, searching only lowest PSC-filename of every BMO instance...')
+            self._best_psc_version = BMO_VERSION_2
+
+        # PSC files are parsed while listing of PSC folder is still running,
+        # results of unchanged PSC files are taken from cache, only new or changed files get parsed
+        # =>parallel scan: chunks of PSC files are sent to workers as soon as they are found
+        #   (processes are used for CPU-bound regex parsing, threads are sufficient for slow network shares)
+        filelist = []
+        nof_parsed = 0
+        nof_bytes = 0
+        executor = None
+        chunksize = 1 if use_threads else _PSC_PARSE_CHUNKSIZE
+
+        # parsing jobs in order of filelist: (flag if parsed, future or list of PSC_fileresult objects)
+        pending_jobs = collections.deque()
+        # PSC-filenames not yet sent to workers
+        chunk_list = []
+
+        # (log records of worker threads belong to batch target of calling thread)
+        target_name = _get_batch_target()
+        def _submit_chunk(chunk_list):
+            return executor.submit(_call_in_batch_target, target_name, _parse_psc_files, chunk_list, only_bmo_instances)
+
+        try:
+            for entry in self._discovery.scan(self._psc_path):
+                fullpath = entry.path
+                filelist.append(fullpath)
+                if psc_cache and psc_cache.is_current(fullpath, stat=entry.stat()):
+                    if chunk_list:
+                        pending_jobs.append((True, _submit_chunk(chunk_list)))
+                        chunk_list = []
+                    pending_jobs.append((False, [psc_cache.get(fullpath)]))
+                elif nof_workers > 1:
+                    if not executor:
+                        logger.info('PSC_Analyzer.analyze(): parsing PSC files with ' + str(nof_workers) + (' threads...' if use_threads else ' processes...'))
+                        if use_threads:
+                            executor = concurrent.futures.ThreadPoolExecutor(max_workers=nof_workers)
+                        else:
+                            executor = concurrent.futures.ProcessPoolExecutor(max_workers=nof_workers)
+                    chunk_list.append(fullpath)
+                    if len(chunk_list) >= chunksize:
+                        pending_jobs.append((True, _submit_chunk(chunk_list)))
+                        chunk_list = []
+                    nof_parsed += 1
+                else:
+                    pending_jobs.append((True, [_parse_psc_file(fullpath, only_bmo_instances)]))
+                    nof_parsed += 1
+                nof_bytes += self._merge_jobs(pending_jobs, psc_cache, wait=False)
+
+            if chunk_list:
+                pending_jobs.append((True, _submit_chunk(chunk_list)))
+            nof_bytes += self._merge_jobs(pending_jobs, psc_cache, wait=True)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        self._metrics.add('files_parsed', nof_parsed)
+        self._metrics.add('files_cached', len(filelist) - nof_parsed)
+        self._metrics.add('bytes_read', nof_bytes)
+
+        if psc_cache:
+            # PSC files not found in this run are dropped from cache
+            psc_cache.save(keep_fullpaths=filelist)
+            # (counted here: PSC_sharedcache is used by several PSC_Analyzer objects)
+            logger.info('PSC_Analyzer.analyze(): PSC cache has ' + str(len(filelist) - nof_parsed) + ' hits and ' + str(nof_parsed) + ' misses.')
+
+        logger.info('PSC_Analyzer.analyze(): found total ' + str(len(self._get_bmo_instances())) + ' BMO instances in ' + str(len(filelist)) + ' PSC files.')
+        if not self._is_v2_fastpath():
+            nof_links = sum(counter for link_key, counter in self._psc_link_counter_dict.items() if link_key in self._psc_names_dict)
+            logger.info('PSC_Analyzer.analyze(): found total ' + str(nof_links) + ' valid links between PSC files.')
+
+
+    def _merge_jobs(self, pending_jobs, psc_cache, wait):
+        # merges results of parsing jobs in order of filelist, so result is the same as in a sequential run
+        # (without "wait" only until first unfinished job, every PSC_fileresult is dropped after merging)
+        # returns number of bytes read by merged jobs
+        nof_bytes = 0
+        merge_func = self._merge_v2_result if self._is_v2_fastpath() else self._merge_psc_result
+        while pending_jobs:
+            is_parsed, job = pending_jobs[0]
+            if isinstance(job, concurrent.futures.Future):
+                if not (wait or job.done()):
+                    break
+                job = job.result()
+            pending_jobs.popleft()
+            for psc_result in job:
+                if is_parsed:
+                    nof_bytes += psc_result.nof_bytes
+                    if psc_cache:
+                        psc_cache.put(psc_result)
+                merge_func(psc_result)
+        return nof_bytes
+
+
+    def _is_v2_fastpath(self):
+        # flag if only lowest PSC-filename of every BMO instance is searched
+        # (BMOs version 2 needs no DMS path statistics, links and general flags, see _sorting_keyfunction_v2())
+        return self._bmo_version == BMO_VERSION_2 and not self._keep_psc_facts
+
+    def _merge_v2_result(self, psc_result):
+        # running minimum of PSC-filenames per BMO instance, same result as _choose_psc_filename() with BMOs version 2
+        best_psc_get = self._best_psc_dict.get
+        for bmo_inst in psc_result.bmo_instances:
+            best_psc_filename = best_psc_get(bmo_inst)
+            if best_psc_filename is None or psc_result.fullpath < best_psc_filename:
+                self._best_psc_dict[bmo_inst] = psc_result.fullpath
+
+    def _get_bmo_instances(self):
+        # all found BMO instances (keys of a dictionary)
+        if self._is_v2_fastpath():
+            return self._best_psc_dict
+        return self._bmo_instances_dict
+
+
+    def _merge_psc_result(self, psc_result):
+        # merge facts of one PSC file into statistics of whole project
+        fileinfo = PSC_fileinfo(psc_result, self._prefix_table, self.get_psc_name(psc_result.fullpath))
+        psc_id = self._psc_ids_dict.get(fileinfo.fullpath)
+        if psc_id is None:
+            psc_id = len(self._psc_fileinfos)
+            self._psc_fileinfos.append(fileinfo)
+            self._psc_ids_dict[fileinfo.fullpath] = psc_id
+            self._psc_names_dict[fileinfo.link_key] = psc_id
+        else:
+            # changed PSC file in watch mode
+            self._psc_fileinfos[psc_id] = fileinfo
+
+        for bmo_inst in fileinfo.bmo_instances:
+            # add current PSC file as possible target for ALM "Screen" of this BMO instance
+            # (BMO instances of a PSC file are without duplicates, so no search in list is needed)
+            psc_ids = self._bmo_instances_dict.get(bmo_inst)
+            if psc_ids is None:
+                self._bmo_instances_dict[bmo_inst] = psc_id
+            elif isinstance(psc_ids, int):
+                self._bmo_instances_dict[bmo_inst] = sorted([psc_ids, psc_id])
+            elif psc_ids[-1] < psc_id:
+                psc_ids.append(psc_id)
+            else:
+                bisect.insort(psc_ids, psc_id)
+
+        # collect references between PSCs
+        # (reference counter of a PSC file is number of links with its name)
+        for target in fileinfo.link_targets:
+            link_key = self._get_link_key(fileinfo, target)
+            self._psc_link_counter_dict[link_key] = self._psc_link_counter_dict.get(link_key, 0) + 1
+
+
+    def _remove_psc_fileinfo(self, psc_id):
+        # reverse of _merge_psc_result(): removes facts of one PSC file from statistics of whole project
+        fileinfo = self._psc_fileinfos[psc_id]
+        self._psc_fileinfos[psc_id] = None
+        for bmo_inst in fileinfo.bmo_instances:
+            psc_ids = self._bmo_instances_dict[bmo_inst]
+            if isinstance(psc_ids, int):
+                del self._bmo_instances_dict[bmo_inst]
+            else:
+                psc_ids.remove(psc_id)
+                if len(psc_ids) == 1:
+                    self._bmo_instances_dict[bmo_inst] = psc_ids[0]
+
+        for target in fileinfo.link_targets:
+            link_key = self._get_link_key(fileinfo, target)
+            self._psc_link_counter_dict[link_key] -= 1
+            if not self._psc_link_counter_dict[link_key]:
+                del self._psc_link_counter_dict[link_key]
+
+
+    def _get_link_key(self, fileinfo, target):
+        # key of a link target of PSC file "fileinfo" in "_psc_link_counter_dict" and "_psc_names_dict":
+        # name of linked PSC file relative to PSC folder in lowercase (a string shared by all PSC files with this link)
+        # =>ProMoS NT runs on Windows: link targets are relative to folder of linking PSC file, maybe with backslashes
+        #   (link targets outside of PSC folder are never found in filelist)
+        if os.sep in fileinfo.name or '\\' in target or '/' in target:
+            folder = os.path.dirname(fileinfo.fullpath)
+            target = self.get_psc_name(os.path.normpath(os.path.join(folder, target.replace('\\', os.sep))))
+        return sys.intern(target.lower())
+
+    def get_psc_name(self, fullpath):
+        # name of a PSC file as written into "ALM:Screen" and used in links and PSC_linkgraph:
+        # filename when PSC file is in PSC folder, otherwise path relative to PSC folder (subfolders with "--recursive"),
+        # so PSC files with same filename in different subfolders are not mixed up (empty string for no PSC file)
+        if not fullpath:
+            return ''
+        head, tail = os.path.split(fullpath)
+        if head == self._psc_path:
+            return tail
+        try:
+            return os.path.relpath(fullpath, self._psc_path)
+        except ValueError:
+            # e.g. other drive on Windows
+            return fullpath
+
+
+    def update_files(self, fullpaths):
+        # incremental update after PSC files were added, changed or removed
+        # returns set of BMO instances whose best suited PSC file has to be chosen again:
+        # -BMO instances on these PSC files (before and after the change)
+        # -BMO instances on PSC files with changed reference counter (link targets of these PSC files)
+        if not self._keep_psc_facts:
+            raise Exception('PSC_Analyzer.update_files(): facts of PSC files were not kept, updates are impossible!')
+        affected_set = set()
+        for fullpath in fullpaths:
+            psc_id = self._psc_ids_dict.get(fullpath)
+            if psc_id is not None:
+                fileinfo = self._psc_fileinfos[psc_id]
+                affected_set.update(fileinfo.bmo_instances)
+                affected_set.update(self._get_link_target_instances(fileinfo))
+                self._remove_psc_fileinfo(psc_id)
+
+            new_result = None
             if os.path.isfile(fullpath):
-                # FIXME: should we use this shortcut: ignoring BMOs (assumption: PSC-files starting with "_" or a digit aren't BMOs)
-                #pattern = r'^[_\d].*\.PSC'
-                pattern = r'.*\.PSC'
-                m = re.search(pattern, entry, re.IGNORECASE)
-                if m:
-                    yield fullpath
-            # FIXME: should we recursively tracerse subdirectories? Perhaps this would work:
-                # elif os.path.isdir(fullpath):
-                #      for curr_entry in self._filelist_generator(fullpath):
-                #           yield curr_entry
+                try:
+                    new_result = _parse_psc_file(fullpath)
+                except OSError as ex:
+                    # e.g. PSC file was removed in the meantime
+                    logger.warning('PSC_Analyzer.update_files(): ignoring PSC file "' + fullpath + '": ' + repr(ex))
+
+            if new_result:
+                self._merge_psc_result(new_result)
+                fileinfo = self._psc_fileinfos[self._psc_ids_dict[fullpath]]
+                affected_set.update(fileinfo.bmo_instances)
+                affected_set.update(self._get_link_target_instances(fileinfo))
+            elif psc_id is not None:
+                del self._psc_ids_dict[fullpath]
+                link_key = self.get_psc_name(fullpath).lower()
+                if self._psc_names_dict.get(link_key) == psc_id:
+                    del self._psc_names_dict[link_key]
+
+        if self._link_ranking != LINK_RANKING_INDEGREE and not self._link_graph:
+            # depth and PageRank of any PSC file may change with every link
+            self._link_scores_dict = None
+            affected_set.update(self._bmo_instances_dict)
+
+        for bmo_inst in affected_set:
+            self._best_psc_dict.pop(bmo_inst, None)
+        self._metrics.add('files_parsed', len(fullpaths))
+        logger.info('PSC_Analyzer.update_files(): ' + str(len(fullpaths)) + ' changed PSC files affect ' + str(len(affected_set)) + ' BMO instances.')
+        return affected_set
+
+
+    def _get_link_target_instances(self, fileinfo):
+        # BMO instances on all PSC files linked by this PSC file
+        for target in fileinfo.link_targets:
+            psc_id = self._psc_names_dict.get(self._get_link_key(fileinfo, target))
+            if psc_id is not None:
+                for bmo_inst in self._psc_fileinfos[psc_id].bmo_instances:
+                    yield bmo_inst
 
 
     def get_psc_filename(self, bmo_instance):
+        # best suited PSC file is chosen only once per BMO instance
+        # (many ALM datapoints belong to the same BMO instance)
+        curr_version = self.get_bmo_version()
+        if self._best_psc_version != curr_version:
+            self._best_psc_dict.clear()
+            self._best_psc_version = curr_version
+        try:
+            return self._best_psc_dict[bmo_instance]
+        except KeyError:
+            if not self._best_psc_dict and curr_version == BMO_VERSION_1:
+                # first query after analyze(): choosing PSC files of all BMO instances at once
+                self._choose_psc_filenames_batch()
+                if bmo_instance in self._best_psc_dict:
+                    return self._best_psc_dict[bmo_instance]
+            psc_filename = self._choose_psc_filename(bmo_instance)
+            self._best_psc_dict[bmo_instance] = psc_filename
+            return psc_filename
+
+    def get_psc_mapping(self):
+        # returns best suited PSC file of all BMO instances
+        # key: BMO instance // value: PSC-filename
+        mapping_dict = {}
+        for bmo_instance in list(self._get_bmo_instances()):
+            mapping_dict[bmo_instance] = self.get_psc_filename(bmo_instance)
+        return mapping_dict
+
+    def get_psc_filenames(self, bmo_instance):
+        # all PSC files containing this BMO instance (in order of filelist)
+        psc_ids = self._bmo_instances_dict.get(bmo_instance, [])
+        if isinstance(psc_ids, int):
+            psc_ids = [psc_ids]
+        return [self._psc_fileinfos[psc_id].fullpath for psc_id in psc_ids]
+
+    def _choose_psc_filenames_batch(self):
+        # BMOs version 1: best suited PSC file of all BMO instances into "_best_psc_dict",
+        # BMO instances with more than one PSC file are rated all at once (same result as _choose_psc_filename()):
+        # =>keyscores in one PSC_keystats_matrix batch, then sorting all pairs (BMO instance, PSC file) by rating
+        # =>without NumPy: one by one, with counters of all candidate PSC files as dictionaries
+        # (matrix and dictionaries are dropped afterwards: single BMO instances after update_files() are chosen one by one)
+        bmo_instances_list = []
+        candidates_set = set()
+        for bmo_instance, psc_ids in self._bmo_instances_dict.items():
+            if isinstance(psc_ids, int):
+                self._best_psc_dict[bmo_instance] = self._psc_fileinfos[psc_ids].fullpath
+            else:
+                bmo_instances_list.append(bmo_instance)
+                candidates_set.update(psc_ids)
+        if not bmo_instances_list:
+            return
+
+        if numpy is None:
+            with self._metrics.phase('keyscores'):
+                counters_dicts = {psc_id: self._psc_fileinfos[psc_id].get_counters_dict() for psc_id in candidates_set}
+                for bmo_instance in bmo_instances_list:
+                    self._best_psc_dict[bmo_instance] = self._choose_psc_filename(bmo_instance, counters_dicts)
+            return
+
+        with self._metrics.phase('keyscores'):
+            queries_list = [(self._prefix_table.get_ids(bmo_instance), self._bmo_instances_dict[bmo_instance]) for bmo_instance in bmo_instances_list]
+            keystats_matrix = PSC_keystats_matrix(self._psc_fileinfos, candidates_set)
+            pair_keyscores = keystats_matrix.get_pair_keyscores(queries_list)
+            del keystats_matrix
+
+            # priorities 1) and 3) of _sorting_keyfunction_v1() for every PSC file
+            # (link ratings are integers or PageRank floats: float64 keeps their order)
+            generals = numpy.zeros(len(self._psc_fileinfos), dtype=bool)
+            link_ratings = numpy.zeros(len(self._psc_fileinfos), dtype=numpy.float64)
+            for psc_id in candidates_set:
+                fileinfo = self._psc_fileinfos[psc_id]
+                generals[psc_id] = fileinfo.is_general
+                link_ratings[psc_id] = self._get_link_rating(fileinfo)
+
+            # sorting pairs by BMO instance, then by rating, then by position
+            # =>last pair of every BMO instance is its best PSC file (on equal rating the later PSC-file wins)
+            psc_lengths = [len(psc_ids) for part_ids, psc_ids in queries_list]
+            pair_psc_ids = numpy.array([psc_id for part_ids, psc_ids in queries_list for psc_id in psc_ids], dtype=numpy.int64)
+            order = numpy.lexsort((numpy.arange(len(pair_psc_ids)),
+                                   link_ratings[pair_psc_ids],
+                                   pair_keyscores,
+                                   generals[pair_psc_ids],
+                                   numpy.repeat(numpy.arange(len(queries_list)), psc_lengths)))
+            best_ids = pair_psc_ids[order[numpy.cumsum(psc_lengths) - 1]].tolist()
+
+        for bmo_instance, best_id in zip(bmo_instances_list, best_ids):
+            self._best_psc_dict[bmo_instance] = self._psc_fileinfos[best_id].fullpath
+
+    def _choose_psc_filename(self, bmo_instance, counters_dicts=None):
+        # ("counters_dicts": key: PSC ID // value: PSC_fileinfo.get_counters_dict(), see _choose_psc_filenames_batch())
         try:
-            psc_list = self._bmo_instances_dict[bmo_instance]
-            if len(psc_list) == 1:
+            psc_ids = self._bmo_instances_dict[bmo_instance]
+            if isinstance(psc_ids, int):
                 # simple case: only one PSC file contains this BMO instance
-                return psc_list[0]
+                best_id = psc_ids
+            elif self.get_bmo_version() == BMO_VERSION_1:
+                # getting "best suited" PSC-file: PSC image with highest rating
+                # (same result as sorting and taking the last element: on equal rating the later PSC-file wins)
+                part_ids = self._prefix_table.get_ids(bmo_instance)
+                best_id = None
+                best_key = None
+                for psc_id in psc_ids:
+                    curr_key = self._sorting_keyfunction_v1(psc_id, part_ids, counters_dicts)
+                    if best_key is None or curr_key >= best_key:
+                        best_id = psc_id
+                        best_key = curr_key
             else:
-                # sorting PSC-files, getting "best suited" one
-
-                def _sorting_keyfunction_v1(fullpath):
-                    # called by sorting in "get_psc_filename()"
-                    # help from https://wiki.python.org/moin/HowTo/Sorting#Key_Functions
-                    # and idea from https://stackoverflow.com/questions/5212870/sorting-a-python-list-by-two-criteria
-
-                    # sort priority:
-                    # 1) PSC contains general information (e.g. alarm lamp)
-                    # 2) keyscore algorithm in DMS_keystats (similarity of DMS keys of BMO instances on given PSC-file)
-                    # 3) number of references to a PSC file (assumption: important PSC-files are more referenced)
-                    general = self._psc_is_general_dict.get(fullpath, False)
-                    keyscore = self._psc_dms_keystats[fullpath].get_keyscore(dmskey=bmo_instance)
-                    ref_counter = self._psc_ref_counter_dict.get(fullpath, 0)
-                    return (general, keyscore, ref_counter)
-
-                def _sorting_keyfunction_v2(fullpath):
-                    # called by sorting in "get_psc_filename()"
-                    # help from https://wiki.python.org/moin/HowTo/Sorting#Key_Functions
-                    # and idea from https://stackoverflow.com/questions/5212870/sorting-a-python-list-by-two-criteria
-
-                    # sort priority:
-                    # new BMOs: sorting PSC files by filename
-                    return fullpath
-
-                # choose PSC image with highest rating (best match is at the end)
-                if bmo_version == BMO_VERSION_1:
-                    psc_list = sorted(psc_list, key=_sorting_keyfunction_v1)
-                else:
-                    psc_list = sorted(psc_list, key=_sorting_keyfunction_v2, reverse=True)
-                return psc_list[-1]
+                # new BMOs: PSC-file with lowest filename
+                best_id = min(psc_ids, key=self._sorting_keyfunction_v2)
+            return self._psc_fileinfos[best_id].fullpath
 
-        except KeyError as ex:
-            logger.exception('PSC_Analyzer.get_psc_filename(): ignoring BMO instance "' + bmo_instance + '", it was not found on any PSC file!')
+        except KeyError:
+            # (expected e.g. after its PSC file was removed in watch mode: no stack trace)
+            logger.warning('PSC_Analyzer.get_psc_filename(): ignoring BMO instance "' + bmo_instance + '", it was not found on any PSC file!')
             return ""
 
+    def _sorting_keyfunction_v1(self, psc_id, part_ids, counters_dicts=None):
+        # called by "_choose_psc_filename()"
+        # help from https://wiki.python.org/moin/HowTo/Sorting#Key_Functions
+        # and idea from https://stackoverflow.com/questions/5212870/sorting-a-python-list-by-two-criteria
+
+        # sort priority:
+        # 1) PSC contains general information (e.g. alarm lamp)
+        # 2) keyscore algorithm in DMS_keystats (similarity of DMS keys of BMO instances on given PSC-file)
+        # 3) links to a PSC file (assumption: important PSC-files are more referenced),
+        #    by default number of references, optionally rating in PSC_linkgraph
+        fileinfo = self._psc_fileinfos[psc_id]
+        general = fileinfo.is_general
+        keyscore = fileinfo.get_keyscore(part_ids, counters_dicts[psc_id] if counters_dicts else None)
+        ref_counter = self._get_link_rating(fileinfo)
+        return (general, keyscore, ref_counter)
+
+    def _get_link_rating(self, fileinfo):
+        # rating of links to a PSC file: by default number of references, optionally rating in PSC_linkgraph
+        if self._link_ranking == LINK_RANKING_INDEGREE and not self._link_graph:
+            return self._psc_link_counter_dict.get(fileinfo.link_key, 0)
+        else:
+            return self._get_link_scores().get(fileinfo.name, self._link_score_default)
+
+    def _get_link_scores(self):
+        # rating of every PSC file by PSC_linkgraph (higher is better), built once after analyze() and every update
+        # (a given PSC_linkgraph is used as it is)
+        if self._link_scores_dict is None:
+            link_graph = self._link_graph or self.get_link_graph()
+            if self._link_ranking == LINK_RANKING_DEPTH:
+                # fewer links from a start image are better, unreachable PSC files are worst
+                self._link_score_default = -len(link_graph.filenames)
+                self._link_scores_dict = {}
+                for filename, depth in link_graph.get_depths(self._start_images).items():
+                    self._link_scores_dict[filename] = -depth if depth is not None else self._link_score_default
+            elif self._link_ranking == LINK_RANKING_PAGERANK:
+                self._link_score_default = 0.0
+                self._link_scores_dict = link_graph.get_pageranks()
+            else:
+                self._link_score_default = 0
+                self._link_scores_dict = link_graph.get_indegrees()
+        return self._link_scores_dict
+
+    def get_link_graph(self):
+        # PSC_linkgraph of all PSC files found in analyze() (also when another PSC_linkgraph is used for rating)
+        # (link targets are resolved with cached listing of PSC folder, without any further file access)
+        filenames = []
+        nodes_dict = {}
+        for psc_id, fileinfo in enumerate(self._psc_fileinfos):
+            if fileinfo:
+                nodes_dict[psc_id] = len(filenames)
+                filenames.append(fileinfo.name)
+        edges = []
+        for psc_id, fileinfo in enumerate(self._psc_fileinfos):
+            if fileinfo:
+                for target in fileinfo.link_targets:
+                    target_id = self._psc_names_dict.get(self._get_link_key(fileinfo, target))
+                    if target_id is not None:
+                        edges.append((nodes_dict[psc_id], nodes_dict[target_id]))
+        return PSC_linkgraph(filenames, edges)
+
+    def _sorting_keyfunction_v2(self, psc_id):
+        # called by "_choose_psc_filename()"
+
+        # sort priority:
+        # new BMOs: sorting PSC files by filename
+        return self._psc_fileinfos[psc_id].fullpath
+
     def get_PSC_path(self):
         return self._psc_path
 
+    def get_discovery(self):
+        return self._discovery
+
+    def get_bmo_version(self):
+        return self._bmo_version or bmo_version
+
+
+class BMO_instance_index(object):
+    """ resolves ALM datapoints to their owning BMO instance """
+    # matching rule is the same as the former substring test "bmo_instance in alm_dp" against every OBJECT:
+    # with more than one match the BMO instance added last wins (in collect() this is the OBJECT returned last by DMS)
+    # example with BMO instances "MSR01:H01", "MSR01:H01:Uwp" and "MSR01:H1" (added in this order):
+    # "MSR01:H01:Uwp:Stoer"     =>"MSR01:H01:Uwp"
+    # "MSR01:H01:Fuehler:Stoer" =>"MSR01:H01"
+    # "MSR01:H10:Uwp:Stoer"     =>"MSR01:H1"
+    # "MSR02:H01:Uwp:Stoer"     =>None
+    #
+    # every BMO instance is stored under its last ANCHOR_LEN characters (shorter BMO instances under all characters),
+    # lookup() slices these anchors out of the ALM datapoint and compares only against BMO instances with same anchor
+    # =>costs are O(length of ALM datapoint) per ALM datapoint instead of comparing against every BMO instance
+    ANCHOR_LEN = 8
+
+    def __init__(self):
+        # key: BMO instance // value: sequence number (order of add())
+        self._bmo_instances_dict = {}
+        self._next_seqnum = 0
+
+        # key: anchor // value: list of BMO instances
+        self._anchors_dict = {}
+
+        # key: length of anchor // value: number of BMO instances using this anchor length
+        self._anchor_lengths_dict = {}
+
+    def add(self, bmo_instance):
+        # (adding an already known BMO instance keeps its place in order, e.g. after value change of OBJECT)
+        if bmo_instance and not bmo_instance in self._bmo_instances_dict:
+            self._bmo_instances_dict[bmo_instance] = self._next_seqnum
+            self._next_seqnum += 1
+
+            anchor = bmo_instance[-self.ANCHOR_LEN:]
+            if not anchor in self._anchors_dict:
+                self._anchors_dict[anchor] = []
+            self._anchors_dict[anchor].append(bmo_instance)
+            self._anchor_lengths_dict[len(anchor)] = self._anchor_lengths_dict.get(len(anchor), 0) + 1
+
+    def discard(self, bmo_instance):
+        if bmo_instance in self._bmo_instances_dict:
+            del self._bmo_instances_dict[bmo_instance]
+
+            anchor = bmo_instance[-self.ANCHOR_LEN:]
+            self._anchors_dict[anchor].remove(bmo_instance)
+            if not self._anchors_dict[anchor]:
+                del self._anchors_dict[anchor]
+            self._anchor_lengths_dict[len(anchor)] -= 1
+            if not self._anchor_lengths_dict[len(anchor)]:
+                del self._anchor_lengths_dict[len(anchor)]
+
+    def lookup(self, alm_dp):
+        best_instance = None
+        best_seqnum = -1
+        for anchor_len in self._anchor_lengths_dict:
+            for end_pos in range(anchor_len, len(alm_dp) + 1):
+                for bmo_instance in self._anchors_dict.get(alm_dp[end_pos - anchor_len:end_pos], ()):
+                    seqnum = self._bmo_instances_dict[bmo_instance]
+                    # (anchor found at this position, but the whole BMO instance has to be checked)
+                    if seqnum > best_seqnum and bmo_instance in alm_dp:
+                        best_instance = bmo_instance
+                        best_seqnum = seqnum
+        return best_instance
+
+    def __contains__(self, bmo_instance):
+        return bmo_instance in self._bmo_instances_dict
+
+    def __len__(self):
+        return len(self._bmo_instances_dict)
+
+
+
+class DMS_writer(object):
+    """ writes many DMS datapoints with a window of parallel requests """
+    # every item is a list of (DMS-key, value) written one after another (e.g. a DMS node and its subkeys),
+    # up to "max_inflight" items are written in parallel, so DMS round-trips overlap
+    # =>"max_rate" limits total number of writes per second (0 means no limit), a busy DMS should not be flooded
+    #
+    # (sending more than one command in one request is not supported by visitoolkit_connector,
+    #  it could not assign the responses to the right command)
+
+    def __init__(self, dms_ws, max_inflight=1, max_rate=0):
+        self._dms_ws = dms_ws
+        self._max_inflight = max(1, max_inflight)
+        self._min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+
+        # earliest time of next write (used for rate limit)
+        self._next_write_time = 0.0
+        self._rate_lock = threading.Lock()
+
+        # key: DMS-key // value: error message
+        self._errors_dict = collections.OrderedDict()
+        self._errors_lock = threading.Lock()
+
+        self.nof_writes = 0
+
+        if self._max_inflight > 1:
+            _make_sending_threadsafe(dms_ws)
+
+    def write(self, items):
+        # returns dictionary with errors (empty when everything was written)
+        # =>after first error no new items are started, running ones are finished
+        start = time.perf_counter()
+        if self._max_inflight == 1:
+            for values_list in items:
+                self._write_item(values_list)
+                if self._errors_dict:
+                    break
+        else:
+            # semaphore limits number of items in flight, so generator "items" is consumed lazily
+            # (log records of worker threads belong to batch target of calling thread)
+            inflight_sema = threading.BoundedSemaphore(self._max_inflight)
+            target_name = _get_batch_target()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self._max_inflight) as executor:
+                for values_list in items:
+                    inflight_sema.acquire()
+                    if self._errors_dict:
+                        inflight_sema.release()
+                        break
+                    future = executor.submit(_call_in_batch_target, target_name, self._write_item, values_list)
+                    future.add_done_callback(lambda f: inflight_sema.release())
+
+        duration = time.perf_counter() - start
+        rate_str = str(round(self.nof_writes / duration, 1)) if duration > 0 else '-'
+        logger.info('DMS_writer.write(): wrote ' + str(self.nof_writes) + ' DMS keys in ' + str(round(duration, 3)) + ' seconds (' + rate_str + ' writes/s).')
+        return self._errors_dict
+
+    def _write_item(self, values_list):
+        for dms_key, curr_value in values_list:
+            self._wait_for_rate_limit()
+            try:
+                response = self._dms_ws.dp_set(path=dms_key,
+                                               value=curr_value,
+                                               create=True)
+                message = response[0].message
+            except Exception as ex:
+                # e.g. no response within timeout
+                message = repr(ex)
+            with self._errors_lock:
+                self.nof_writes += 1
+                if message:
+                    logger.error('DMS_writer._write_item(): DMS returned error "' + message + '" for DMS key "' + dms_key + '"')
+                    self._errors_dict[dms_key] = message
+            if message:
+                # skip remaining subkeys of this item
+                return
+
+    def _wait_for_rate_limit(self):
+        if self._min_interval:
+            with self._rate_lock:
+                now = time.perf_counter()
+                write_time = max(now, self._next_write_time)
+                self._next_write_time = write_time + self._min_interval
+            if write_time > now:
+                time.sleep(write_time - now)
+
+
+
+def _make_sending_threadsafe(dms_ws):
+    # visitoolkit_connector sends WebSocket frames without locking,
+    # parallel requests from different threads could mix up partially sent frames
+    # =>serializing only the sending, waiting for responses is still done in parallel
+    # FIXME: this should be fixed in DMSClient._send_message() of visitoolkit_connector
+    dms_ws = getattr(dms_ws, 'wrapped_dms_ws', dms_ws)
+    send_message = getattr(dms_ws, '_send_message', None)
+    if send_message and not getattr(send_message, 'is_threadsafe', False):
+        send_lock = threading.Lock()
+
+        def _locked_send_message(msg):
+            with send_lock:
+                send_message(msg)
+        _locked_send_message.is_threadsafe = True
+        dms_ws._send_message = _locked_send_message
+
+
+
+class DMS_asyncclient(object):
+    """ asyncio wrapper around the blocking visitoolkit_connector.DMSClient """
+    # every request is executed by a thread of a small pool,
+    # so independent requests are waiting at the same time for their responses
+    # (DMSClient assigns responses by message tag, it can handle parallel requests)
+
+    def __init__(self, dms_ws, max_parallel=4):
+        self._dms_ws = dms_ws
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_parallel)
+        _make_sending_threadsafe(dms_ws)
+
+    async def dp_get(self, path, **kwargs):
+        """ read datapoint value(s) """
+        return await self._run_in_executor(functools.partial(self._dms_ws.dp_get, path, **kwargs))
+
+    async def dp_set(self, path, **kwargs):
+        """ write datapoint value(s) """
+        return await self._run_in_executor(functools.partial(self._dms_ws.dp_set, path, **kwargs))
+
+    async def _run_in_executor(self, func):
+        # (log records of pool threads belong to batch target of event loop thread)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(_call_in_batch_target, _get_batch_target(), func))
+
+    def close(self):
+        self._executor.shutdown()
+
+
+
+def _get_dms_row(dms_key, value):
+    # format of DMS importfiles: <DMS-key>;<DMS-datatype>;<DMS-value>;<DMS-rights>
+    # =>our case: datatype and rights are fixed values
+    return ";".join([dms_key, "STR", value, "RW"])
+
+
+
+class DMS_backupfile(object):
+    """ DMS importfiles with old screen-mappings in "cfg" folder of project, with retention of older backupfiles """
+    # rows are streamed into a buffered file (optionally gzip compressed), it gets its final name when closed
+    # -BACKUP_MODE_FULL: all "ALM:Screen" DMS keys, as received from DMS
+    # -BACKUP_MODE_CHANGES: only old values of DMS keys which are about to be overwritten (much smaller, one file per write)
+    # =>file is created with first row: no empty backupfiles
+    # =>abort() removes an unfinished backupfile (e.g. connection to DMS was lost while streaming)
+
+    def __init__(self, project_path, mode=BACKUP_MODE_FULL, compress=False, keep_last=None, keep_days=None):
+        self._cfg_path = os.path.join(project_path, 'cfg')
+        self.mode = mode
+        self._compress = compress
+
+        # retention: newest "keep_last" backupfiles and all backupfiles of last "keep_days" days are kept
+        # (None for both: all backupfiles are kept)
+        self._keep_last = keep_last
+        self._keep_days = keep_days
+
+        self._file = None
+        self._tmp_fullpath = None
+        self.nof_rows = 0
+
+    def write_row(self, dms_key, value):
+        if not self._file:
+            # (unique name: targets in batch mode could share a project)
+            self._tmp_fullpath = os.path.join(self._cfg_path, 'PSC_to_ALM_Mapper_old_values_' + str(os.getpid()) + '_' + str(threading.get_ident()) + '.tmp')
+            if self._compress:
+                self._file = gzip.open(self._tmp_fullpath, mode='wt', encoding=DMS_EXPORTFILE_ENCODING)
+            else:
+                self._file = open(self._tmp_fullpath, mode='w', encoding=DMS_EXPORTFILE_ENCODING, buffering=BACKUP_BUFFERSIZE)
+            self.nof_rows = 0
+        self._file.write(_get_dms_row(dms_key, value) + '\n')
+        self.nof_rows += 1
+
+    def close(self):
+        # backupfile gets its final name, then older backupfiles are removed by retention
+        if self._file:
+            self._file.close()
+            self._file = None
+            timestamp_str = time.strftime("%Y-%m-%d_%H.%M.%S", time.localtime())
+            suffix_str = '_old_values.dms' + ('.gz' if self._compress else '')
+            export_fullpath = os.path.join(self._cfg_path, 'PSC_to_ALM_Mapper_' + timestamp_str + suffix_str)
+            counter = 0
+            while os.path.exists(export_fullpath):
+                # more than one backupfile in same second (e.g. in watch mode)
+                counter += 1
+                export_fullpath = os.path.join(self._cfg_path, 'PSC_to_ALM_Mapper_' + timestamp_str + '_' + str(counter) + suffix_str)
+            os.replace(self._tmp_fullpath, export_fullpath)
+            logger.info('DMS_backupfile.close(): wrote ' + str(self.nof_rows) + ' DMS datapoints into "' + export_fullpath + '"')
+            self._apply_retention()
+
+    def abort(self):
+        # temporary file of an unfinished backupfile is removed, older backupfiles are kept
+        if self._file:
+            self._file.close()
+            self._file = None
+            try:
+                os.remove(self._tmp_fullpath)
+                logger.warning('DMS_backupfile.abort(): removed unfinished backupfile with ' + str(self.nof_rows) + ' DMS datapoints')
+            except OSError as ex:
+                logger.warning('DMS_backupfile.abort(): could not remove "' + self._tmp_fullpath + '": ' + repr(ex))
+
+    def _apply_retention(self):
+        if self._keep_last is None and self._keep_days is None:
+            return
+        # all backupfiles, newest first
+        backups_list = []
+        for filename in os.listdir(self._cfg_path):
+            m = _BACKUP_FILENAME_PATTERN.match(filename)
+            if m:
+                timestamp = time.mktime(time.strptime(m.group(1), "%Y-%m-%d_%H.%M.%S"))
+                backups_list.append((timestamp, int(m.group(2) or 0), filename))
+        backups_list.sort(reverse=True)
+
+        min_timestamp = time.time() - self._keep_days * 86400 if self._keep_days is not None else None
+        for idx, (timestamp, counter, filename) in enumerate(backups_list):
+            is_recent = self._keep_last is not None and idx < self._keep_last
+            is_young = min_timestamp is not None and timestamp >= min_timestamp
+            if not (is_recent or is_young):
+                try:
+                    os.remove(os.path.join(self._cfg_path, filename))
+                    logger.info('DMS_backupfile._apply_retention(): removed old backupfile "' + filename + '"')
+                except OSError as ex:
+                    logger.warning('DMS_backupfile._apply_retention(): could not remove "' + filename + '": ' + repr(ex))
+
+
+
+class ALM_snapshot(object):
+    """ last applied screen-mappings of one DMS, persisted in a SQLite database """
+    # routine runs compare the wanted screen-mapping with this snapshot instead of reading all "ALM:Screen" keys,
+    # only ALM datapoints with a different or missing entry are read from DMS (see ALM_datapoint.verify_Screen())
+    # =>changes in DMS by somebody else are only found by a full reconciliation,
+    #   it is done when snapshot is older than "reconcile_days", belongs to another DMS or was written by another version
+
+    def __init__(self, snapshot_fullpath, dms_target):
+        self._snapshot_fullpath = snapshot_fullpath
+        self._dms_target = dms_target
+
+        # key: ALM datapoint // value: (PSC filename, PLC)
+        self._mapping_dict = {}
+        # timestamp of last full reconciliation (None: snapshot can't be used)
+        self._reconciled_time = None
+
+        try:
+            with contextlib.closing(sqlite3.connect(self._snapshot_fullpath)) as conn:
+                meta_dict = dict(conn.execute('SELECT key, value FROM meta'))
+                if meta_dict.get('version') != str(SNAPSHOT_VERSION):
+                    logger.info('ALM_snapshot(): ignoring "' + self._snapshot_fullpath + '", it was written by another version.')
+                elif meta_dict.get('dms_target') != self._dms_target:
+                    logger.info('ALM_snapshot(): ignoring "' + self._snapshot_fullpath + '", it belongs to DMS "' + str(meta_dict.get('dms_target')) + '".')
+                else:
+                    self._mapping_dict = {alm_dp: (screen, plc) for alm_dp, screen, plc in conn.execute('SELECT alm_dp, screen, plc FROM mapping')}
+                    self._reconciled_time = float(meta_dict['reconciled'])
+                    logger.info('ALM_snapshot(): loaded ' + str(len(self._mapping_dict)) + ' screen-mappings from "' + self._snapshot_fullpath + '"')
+        except (sqlite3.Error, KeyError, ValueError) as ex:
+            # (a missing file is an empty database without tables)
+            logger.info('ALM_snapshot(): no usable snapshot in "' + self._snapshot_fullpath + '" (' + repr(ex) + '), all screen-mappings will be read from DMS.')
+
+    def get_mapping(self):
+        return self._mapping_dict
+
+    def is_reconcile_due(self, reconcile_days):
+        # flag if all "ALM:Screen" keys have to be read from DMS
+        if self._reconciled_time is None:
+            return True
+        return time.time() - self._reconciled_time >= reconcile_days * 86400
+
+    def save(self, mapping_dict, alm_dps=None, is_reconciled=False):
+        # stores applied screen-mappings:
+        # -"alm_dps" is None: "mapping_dict" replaces whole snapshot
+        # -otherwise only ALM datapoints in "alm_dps" are replaced (incremental update in watch mode)
+        # "is_reconciled": all "ALM:Screen" keys were read from DMS in this run
+        try:
+            with contextlib.closing(sqlite3.connect(self._snapshot_fullpath)) as conn:
+                # (one transaction: an interrupted run should not leave a half written snapshot)
+                with conn:
+                    conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+                    conn.execute('CREATE TABLE IF NOT EXISTS mapping (alm_dp TEXT PRIMARY KEY, screen TEXT NOT NULL, plc TEXT NOT NULL) WITHOUT ROWID')
+                    if alm_dps is None:
+                        conn.execute('DELETE FROM mapping')
+                        self._mapping_dict = {}
+                    else:
+                        conn.executemany('DELETE FROM mapping WHERE alm_dp = ?', ((alm_dp,) for alm_dp in alm_dps))
+                        for alm_dp in alm_dps:
+                            self._mapping_dict.pop(alm_dp, None)
+                    conn.executemany('INSERT OR REPLACE INTO mapping (alm_dp, screen, plc) VALUES (?, ?, ?)',
+                                     ((alm_dp, screen, plc) for alm_dp, (screen, plc) in mapping_dict.items()))
+                    self._mapping_dict.update(mapping_dict)
+                    if is_reconciled:
+                        self._reconciled_time = time.time()
+                    conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                                     [('version', str(SNAPSHOT_VERSION)),
+                                      ('dms_target', self._dms_target),
+                                      ('reconciled', str(self._reconciled_time or 0.0))])
+        except sqlite3.Error as ex:
+            # next run will do a full reconciliation
+            logger.warning('ALM_snapshot.save(): could not write "' + self._snapshot_fullpath + '": ' + repr(ex))
+            return
+        logger.debug('ALM_snapshot.save(): wrote ' + str(len(mapping_dict)) + ' screen-mappings into "' + self._snapshot_fullpath + '"')
+
+
+
+# one datapoint of a DMS exportfile (same attributes as visitoolkit_connector.RespGet used in ALM_datapoint)
+DMS_record = collections.namedtuple('DMS_record', ['path', 'value'])
+
+
+
+class DMS_exportfile(object):
+    """ datapoints of a DMS exportfile, used instead of DMS queries in offline mode """
+    # format of DMS exportfiles: <DMS-key>;<DMS-datatype>;<DMS-value>;<DMS-rights>
+    # =>file is streamed line by line, only datapoints needed by ALM_datapoint are kept in memory
+    # =>same selection as the DMS queries in ALM_datapoint._get_*_request(),
+    #   but an exportfile has no "hasAlarmData" flag: ALM datapoints are recognized by their "ALM" subtree
+
+    _OBJECT_PATTERN = re.compile(r'^(?!BMO).+:OBJECT$')
+    _SCREEN_PATTERN = re.compile(r'^(?!BMO).*:ALM:Screen(:[\w]+)?')
+
+    def __init__(self, fullpath, encoding=DMS_EXPORTFILE_ENCODING):
+        self._fullpath = fullpath
+        self._encoding = encoding
+
+        # lists of DMS_record objects (in order of exportfile)
+        self.alm_records = []
+        self.screen_records = []
+        self.object_records = []
+
+        # key: DMS-key in _SYSTEM_INFO_DMSKEYS // value: DMS-value
+        self._system_info_dict = {}
+
+    def read(self):
+        logger.info('DMS_exportfile.read(): reading DMS datapoints from "' + self._fullpath + '"...')
+        # key: ALM datapoint // value: None (set with order of exportfile)
+        alm_dps_dict = collections.OrderedDict()
+        nof_lines = 0
+        with open(self._fullpath, mode='r', encoding=self._encoding, errors='replace') as f:
+            for line in f:
+                nof_lines += 1
+                fields = line.rstrip('\r\n').split(';')
+                if len(fields) < 4:
+                    # empty line or comment
+                    continue
+                # DMS-value could contain semicolons
+                dms_key = fields[0]
+                dms_type = fields[1]
+                value = ';'.join(fields[2:-1])
+
+                if dms_key in _SYSTEM_INFO_DMSKEYS:
+                    self._system_info_dict[dms_key] = value
+                if dms_key.startswith('BMO'):
+                    continue
+
+                if dms_key.endswith(':OBJECT') and self._OBJECT_PATTERN.match(dms_key):
+                    self.object_records.append(DMS_record(dms_key, value))
+
+                idx = dms_key.find(':ALM:')
+                if idx > 0:
+                    alm_dps_dict[dms_key[:idx]] = None
+                    if dms_type == 'STR' and self._SCREEN_PATTERN.match(dms_key):
+                        self.screen_records.append(DMS_record(dms_key, value))
+                elif dms_key.endswith(':ALM'):
+                    alm_dps_dict[dms_key[:-len(':ALM')]] = None
+
+        self.alm_records = [DMS_record(alm_dp, None) for alm_dp in alm_dps_dict]
+        logger.info('DMS_exportfile.read(): found ' + str(len(self.alm_records)) + ' ALM datapoints, '
+                    + str(len(self.screen_records)) + ' "ALM:Screen" datapoints and '
+                    + str(len(self.object_records)) + ' OBJECT datapoints in ' + str(nof_lines) + ' lines.')
+
+    def get_value(self, dms_key):
+        # value of DMS keys in _SYSTEM_INFO_DMSKEYS (None when missing in exportfile)
+        return self._system_info_dict.get(dms_key)
+
+
 
 class ALM_datapoint(object):
-    def __init__(self, dms_ws):
+    def __init__(self, dms_ws, metrics=None, backup_file=None, snapshot=None):
         self._dms_ws = dms_ws
+        self._metrics = metrics or Run_metrics()
+
+        # DMS_backupfile for old screen-mappings (None: no backup)
+        self._backup_file = backup_file
+
+        # ALM_snapshot of applied screen-mappings (None: all "ALM:Screen" keys are read in every run)
+        self._snapshot = snapshot
+        # flag if all "ALM:Screen" keys were read from DMS (otherwise see verify_Screen())
+        self._is_Screen_complete = False
 
         # key: ALM datapoint // value: BMO instance
         self._alm_dps_dict = {}
 
+        # all OBJECT datapoints and reverse mapping of "_alm_dps_dict" (needed for incremental updates in watch mode)
+        # key: BMO instance // value: list of ALM datapoints
+        self._bmo_index = BMO_instance_index()
+        self._bmo_alm_dps_dict = {}
+        # ALM datapoints by DMS path segment (see _get_ALM_candidates())
+        self._alm_segments_dict = None
+
         # current active mappings
         # key: ALM datapoint with PSC-mapping // value: DMS-value of "ALM:Screen"
         self._alm_screen_dict = {}
 
-        # caching all keys for backupfile (with same sorting as received from DMS)
+        # all "ALM:Screen" keys and subkeys (needed for consistency checks and old values in backupfile and diff)
         # key: "ALM:Screen" datapoint or subkey // value: DMS-value
-        self._alm_screen_allkeys_dict = collections.OrderedDict()
+        self._alm_screen_allkeys_dict = {}
 
-    def collect(self):
+    def collect(self, with_Screen=True):
+        # (without "ALM:Screen" keys: call verify_Screen() after analyzing PSC files)
         self._collect_ALM()
-        self._collect_Screen()
+        if with_Screen:
+            self._collect_Screen()
 
         # retrieve all OBJECT datapoints and match against ALM datapoints
-        responses = self._dms_ws.dp_get(path='',
-                                        query=connector.Query(regExPath="^(?!BMO).+:OBJECT$",
-                                                        maxDepth=-1))
+        with self._metrics.phase('OBJECT_matching'):
+            self._match_OBJECT(self._dms_ws.dp_get(**self._get_OBJECT_request()))
+
+
+    async def collect_async(self, dms_async, with_Screen=True):
+        # same as collect(), but all DMS queries are sent at the same time
+        # (they don't depend on each other), responses are processed as soon as they arrive
+        logger.info('ALM_datapoint.collect_async(): retrieving ALM, "ALM:Screen" and OBJECT datapoints from DMS...')
+
+        async def _fetch(name, request_kwargs):
+            return name, await dms_async.dp_get(**request_kwargs)
+
+        fetches_list = [_fetch('ALM', self._get_ALM_request()),
+                        _fetch('OBJECT', self._get_OBJECT_request())]
+        if with_Screen:
+            fetches_list.append(_fetch('Screen', self._get_Screen_request()))
+        object_responses = []
+        for next_done in asyncio.as_completed(fetches_list):
+            name, responses = await next_done
+            # =>in this mode the phases contain only processing of responses, DMS requests are overlapping
+            if name == 'ALM':
+                with self._metrics.phase('_collect_ALM'):
+                    self._process_ALM(responses)
+            elif name == 'Screen':
+                with self._metrics.phase('_collect_Screen'):
+                    self._process_Screen(responses)
+                self._is_Screen_complete = True
+            else:
+                object_responses = responses
+
+        # matching needs all ALM datapoints
+        with self._metrics.phase('OBJECT_matching'):
+            self._match_OBJECT(object_responses)
+
+
+    def collect_offline(self, dms_exportfile):
+        # same as collect(), but datapoints are taken from a DMS_exportfile object
+        with self._metrics.phase('_collect_ALM'):
+            self._process_ALM(dms_exportfile.alm_records)
+        with self._metrics.phase('_collect_Screen'):
+            self._process_Screen(dms_exportfile.screen_records)
+        self._is_Screen_complete = True
+        with self._metrics.phase('OBJECT_matching'):
+            self._match_OBJECT(dms_exportfile.object_records)
+
+
+    def _get_OBJECT_request(self):
+        # keyword arguments of dp_get() for retrieving all OBJECT datapoints
+        return {'path': '',
+                'query': _get_connector().Query(regExPath="^(?!BMO).+:OBJECT$",
+                                         maxDepth=-1)}
+
+
+    def _match_OBJECT(self, responses):
         # logger.debug('FOO: responses[0]=' + repr(responses[0]))
+        self._bmo_index = BMO_instance_index()
         for respget in responses:
-            bmo_instance = respget.path.split(':OBJECT')[0]
-            if bmo_instance:
-                for alm in self._alm_dps_dict:
-                    # assumption: every ALM datapoint contains part of exactly one BMO instance
-                    # FIXME: "Meta-VLOs" as used in BACnet VLOs are currently not tested and could lead to unexpected results...
-                    if bmo_instance in alm:
-                        self._alm_dps_dict[alm] = bmo_instance
+            self._bmo_index.add(respget.path.split(':OBJECT')[0])
+        logger.info('ALM_datapoint._match_OBJECT(): found ' + str(len(self._bmo_index)) + ' OBJECT datapoints.')
+
+        self._bmo_alm_dps_dict = {}
+        self._alm_segments_dict = None
+        for alm in self._alm_dps_dict:
+            # assumption: every ALM datapoint belongs to exactly one BMO instance
+            # FIXME: "Meta-VLOs" as used in BACnet VLOs are currently not tested and could lead to unexpected results...
+            self._set_BMO_instance(alm, self._bmo_index.lookup(alm))
+
+
+    def _set_BMO_instance(self, alm_dp, bmo_instance):
+        old_instance = self._alm_dps_dict.get(alm_dp)
+        if old_instance:
+            self._bmo_alm_dps_dict[old_instance].remove(alm_dp)
+            if not self._bmo_alm_dps_dict[old_instance]:
+                del self._bmo_alm_dps_dict[old_instance]
+        self._alm_dps_dict[alm_dp] = bmo_instance
+        if bmo_instance:
+            if not bmo_instance in self._bmo_alm_dps_dict:
+                self._bmo_alm_dps_dict[bmo_instance] = []
+            self._bmo_alm_dps_dict[bmo_instance].append(alm_dp)
+
+
+    def get_ALM_datapoints(self, bmo_instances):
+        # all ALM datapoints belonging to these BMO instances
+        alm_dps_list = []
+        for bmo_instance in bmo_instances:
+            alm_dps_list.extend(self._bmo_alm_dps_dict.get(bmo_instance, []))
+        return alm_dps_list
+
+
+    def update_from_event(self, event):
+        # incremental update after DMS event of an ":OBJECT" or "ALM:Screen" datapoint
+        # returns list of affected ALM datapoints
+        dms_event_cls = _get_connector().DMSEvent
+        if event.code == dms_event_cls.CODE_RENAME:
+            changes_list = [(event.path, None), (event.newPath, event.value)]
+        elif event.code == dms_event_cls.CODE_DELETE:
+            changes_list = [(event.path, None)]
+        else:
+            changes_list = [(event.path, event.value)]
+
+        alm_dps_list = []
+        for dms_key, value in changes_list:
+            if not dms_key or dms_key.startswith(('System', 'GE')):
+                continue
+            if dms_key.endswith(':OBJECT'):
+                alm_dps_list.extend(self._update_OBJECT(bmo_instance=dms_key.split(':OBJECT')[0],
+                                                        is_deleted=value is None))
+            elif ':ALM:Screen' in dms_key:
+                alm_dps_list.extend(self._update_Screen(dms_key=dms_key, value=value))
+        return alm_dps_list
+
+
+    def _update_OBJECT(self, bmo_instance, is_deleted):
+        # new or deleted OBJECT datapoint: only ALM datapoints containing this BMO instance could belong to another one
+        # -deleted OBJECT: ALM datapoints of this BMO instance (see _bmo_alm_dps_dict)
+        # -new OBJECT: it wins in all ALM datapoints containing it (see BMO_instance_index), they are searched
+        #  only in ALM datapoints with same DMS path segment (see _get_ALM_candidates())
+        if is_deleted:
+            self._bmo_index.discard(bmo_instance)
+            alm_dps_list = list(self._bmo_alm_dps_dict.get(bmo_instance, []))
+        elif bmo_instance in self._bmo_index:
+            # known OBJECT (e.g. changed value): BMO instances of all ALM datapoints stay the same
+            return []
+        else:
+            self._bmo_index.add(bmo_instance)
+            alm_dps_list = [alm for alm in self._get_ALM_candidates(bmo_instance) if bmo_instance in alm]
+        for alm in alm_dps_list:
+            self._set_BMO_instance(alm, self._bmo_index.lookup(alm))
+        return alm_dps_list
+
+
+    def _get_ALM_candidates(self, bmo_instance):
+        # ALM datapoints which could contain this BMO instance:
+        # inner DMS path segments of a BMO instance are whole segments of all ALM datapoints containing it
+        # (e.g. "MSR01:H01:Uwp" in "MSR01:H01:Uwp:Stoer" and "XMSR01:H01:Uwp2:Stoer", but not in "MSR01:H010:Uwp:Stoer")
+        # =>BMO instances with less than three segments are searched in all ALM datapoints
+        segments = bmo_instance.split(':')
+        if len(segments) < 3:
+            return self._alm_dps_dict
+        if self._alm_segments_dict is None:
+            # built with first new OBJECT (only needed in watch mode)
+            # key: DMS path segment // value: list of ALM datapoints containing it
+            self._alm_segments_dict = {}
+            for alm in self._alm_dps_dict:
+                for segment in set(alm.split(':')):
+                    if not segment in self._alm_segments_dict:
+                        self._alm_segments_dict[segment] = []
+                    self._alm_segments_dict[segment].append(alm)
+        return min((self._alm_segments_dict.get(segment, []) for segment in segments[1:-1]), key=len)
+
+
+    def _update_Screen(self, dms_key, value):
+        # changed "ALM:Screen" datapoint or subkey ("value" is None when it was deleted)
+        alm_dp = dms_key.split(':ALM:Screen')[0]
+        if value is None:
+            self._alm_screen_allkeys_dict.pop(dms_key, None)
+        else:
+            self._alm_screen_allkeys_dict[dms_key] = value
+        if dms_key.endswith(':ALM:Screen'):
+            if value:
+                self._alm_screen_dict[alm_dp] = value
+            else:
+                self._alm_screen_dict.pop(alm_dp, None)
+        if alm_dp in self._alm_dps_dict:
+            return [alm_dp]
+        else:
+            return []
 
 
 
     def _collect_ALM(self):
         # retrieve all ALM datapoints
         logger.info('ALM_datapoint._collect_ALM(): retrieving all ALM datapoints from DMS...')
-        responses = self._dms_ws.dp_get(path='',
-                                   query=connector.Query(hasAlarmData=True,
-                                                   regExPath="^(?!BMO).*",
-                                                   maxDepth=-1))
+        with self._metrics.phase('_collect_ALM'):
+            self._process_ALM(self._dms_ws.dp_get(**self._get_ALM_request()))
+
+
+    def _get_ALM_request(self):
+        # keyword arguments of dp_get() for retrieving all ALM datapoints
+        return {'path': '',
+                'query': _get_connector().Query(hasAlarmData=True,
+                                         regExPath="^(?!BMO).*",
+                                         maxDepth=-1)}
+
+
+    def _process_ALM(self, responses):
         exclusion = ('System', 'GE')
         for respget in responses:
             #logger.debug('FOO: type(respget)=' + repr(type(respget)) + ', respget=' + repr(respget))
             if not respget.path.startswith(exclusion):
                 self._alm_dps_dict[respget.path] = None
-        logger.info('ALM_datapoint._collect_ALM(): found ' + str(len(self._alm_dps_dict)) + ' ALM datapoints.')
+        logger.info('ALM_datapoint._process_ALM(): found ' + str(len(self._alm_dps_dict)) + ' ALM datapoints.')
 
 
-    def generator_ALM_BMO_instance(self):
-        for alm in self._alm_dps_dict:
+    def generator_ALM_BMO_instance(self, alm_dps=None):
+        # all ALM datapoints (or only "alm_dps") with their BMO instance
+        if alm_dps is None:
+            alm_dps = self._alm_dps_dict
+        for alm in alm_dps:
             bmo_instance = self._alm_dps_dict[alm]
             if bmo_instance:
                 yield alm, bmo_instance
@@ -311,11 +2164,72 @@ class ALM_datapoint(object):
                 logger.warning('ALM_datapoint.dp_generator(): ignoring ALM datapoint "' + alm + '", it does not belong to an OBJECT!')
 
 
-    def write_ALM_screen(self, psc_analyzer, only_dryrun=False):
+    def write_ALM_screen(self, psc_analyzer, only_dryrun=False, max_inflight=1, max_rate=0, alm_dps=None):
         # writes screen-mapping of ALM datapoints into DMS
+        # (incremental update in watch mode: only ALM datapoints in "alm_dps" are checked)
+        with self._metrics.phase('mapping'):
+            unwritten_screens_dict, total_alm = self._get_changed_screens(psc_analyzer, alm_dps)
+
+        if alm_dps is None:
+            logger.info('ALM_datapoint.write_ALM_screen(): number of ALM datapoints in BMO instances: ' + str(total_alm))
+            logger.info('ALM_datapoint.write_ALM_screen(): number of current ALM screen mappings: ' + str(len(self._alm_screen_dict)))
+        elif not unwritten_screens_dict:
+            # e.g. DMS events of our own writes
+            return
+        logger.info('ALM_datapoint.write_ALM_screen(): number of changed ALM screen mappings: ' + str(len(unwritten_screens_dict)))
+
+        if only_dryrun:
+            logger.info('ALM_datapoint.write_ALM_screen(): only dryrun. =>no change in DMS...')
+        else:
+            if len(unwritten_screens_dict):
+                logger.info('ALM_datapoint.write_ALM_screen(): =>write changed screen-mappings into DMS...')
+                if self._backup_file and self._backup_file.mode == BACKUP_MODE_CHANGES:
+                    self._write_backup_changes(unwritten_screens_dict)
+                dms_writer = DMS_writer(self._dms_ws, max_inflight=max_inflight, max_rate=max_rate)
+                # iteration over dictionary: https://stackoverflow.com/questions/26660654/how-do-i-print-the-key-value-pairs-of-a-dictionary-in-python
+                with self._metrics.phase('writes'):
+                    errors_dict = dms_writer.write(self._get_ALM_screen_values(alm_dp=alm, psc_filename=screen)
+                                                   for alm, screen in unwritten_screens_dict.items())
+                self._metrics.add('dms_writes', dms_writer.nof_writes)
+                if errors_dict:
+                    raise Exception('DMS returned errors for ' + str(len(errors_dict)) + ' DMS keys, first error: "' + next(iter(errors_dict.values())) + '"')
+
+                # keeping current mappings up to date (needed for next incremental update)
+                for alm, screen in unwritten_screens_dict.items():
+                    for dms_key, curr_value in self._get_ALM_screen_values(alm_dp=alm, psc_filename=screen):
+                        self._update_Screen(dms_key=dms_key, value=curr_value)
+                logger.info('ALM_datapoint.write_ALM_screen(): done. :-)')
+            else:
+                logger.info('ALM_datapoint.write_ALM_screen(): =>nothing to do...')
+
+            if self._snapshot:
+                # DMS contains now the wanted screen-mappings
+                with self._metrics.phase('snapshot'):
+                    self._snapshot.save(self.get_screen_mapping(psc_analyzer, alm_dps),
+                                        alm_dps=alm_dps,
+                                        is_reconciled=alm_dps is None and self._is_Screen_complete)
+
+
+    def get_screen_mapping(self, psc_analyzer, alm_dps=None):
+        # wanted screen-mapping of all ALM datapoints (or only "alm_dps") belonging to a BMO instance
+        # key: ALM datapoint // value: (PSC filename, PLC) as written by _get_ALM_screen_values()
+        # (ALM datapoints without BMO instance are silently skipped, generator_ALM_BMO_instance() already warned about them)
+        if alm_dps is None:
+            alm_dps = self._alm_dps_dict
+        mapping_dict = {}
+        for alm_dp in alm_dps:
+            bmo_instance = self._alm_dps_dict.get(alm_dp)
+            if bmo_instance:
+                mapping_dict[alm_dp] = (psc_analyzer.get_psc_name(psc_analyzer.get_psc_filename(bmo_instance)), alm_dp.split(':')[0])
+        return mapping_dict
+
+
+    def _get_changed_screens(self, psc_analyzer, alm_dps=None):
+        # returns dictionary of ALM datapoints with changed screen-mapping (value: new PSC filename)
+        # and number of ALM datapoints belonging to a BMO instance
         unwritten_screens_dict = {}
         total_alm = 0
-        for alm_dp, bmo_instance in self.generator_ALM_BMO_instance():
+        for alm_dp, bmo_instance in self.generator_ALM_BMO_instance(alm_dps):
             total_alm += 1
             # dictionary access with default value: http://www.tutorialspoint.com/python/dictionary_get.htm
             # empty string means no PSC file referenced...
@@ -325,9 +2239,9 @@ class ALM_datapoint(object):
             curr_screen = self._alm_screen_dict.get(alm_dp, "")
 
             # get PSC filename from PSC fullpath
-            # FIXME: assumption: we don't use subdirectories... should we care? how does GE search for a PSC file?
+            # (PSC files in subfolders of PSC folder are written with their relative path)
             psc_fullpath = psc_analyzer.get_psc_filename(bmo_instance)
-            new_screen = os.path.basename(psc_fullpath)
+            new_screen = psc_analyzer.get_psc_name(psc_fullpath)
             if curr_screen != new_screen:
                 unwritten_screens_dict[alm_dp] = new_screen
 
@@ -342,55 +2256,142 @@ class ALM_datapoint(object):
                     # force rewrite of whole "Screen" DMS node
                     unwritten_screens_dict[alm_dp] = new_screen
 
+        return unwritten_screens_dict, total_alm
 
 
-        logger.info('ALM_datapoint.write_ALM_screen(): number of ALM datapoints in BMO instances: ' + str(total_alm))
-        logger.info('ALM_datapoint.write_ALM_screen(): number of current ALM screen mappings: ' + str(len(self._alm_screen_dict)))
-        logger.info('ALM_datapoint.write_ALM_screen(): number of changed ALM screen mappings: ' + str(len(unwritten_screens_dict)))
+    def export_changes(self, psc_analyzer, output_fullpath=None, output_format='diff'):
+        # offline mode: changed screen-mappings are written into a file instead of DMS (or printed to console)
+        # -"diff": changed DMS keys, old values with prefix "-" and new values with prefix "+"
+        # -"dms": DMS importfile with all DMS keys of changed screen-mappings
+        with self._metrics.phase('mapping'):
+            unwritten_screens_dict, total_alm = self._get_changed_screens(psc_analyzer)
+        logger.info('ALM_datapoint.export_changes(): number of ALM datapoints in BMO instances: ' + str(total_alm))
+        logger.info('ALM_datapoint.export_changes(): number of current ALM screen mappings: ' + str(len(self._alm_screen_dict)))
+        logger.info('ALM_datapoint.export_changes(): number of changed ALM screen mappings: ' + str(len(unwritten_screens_dict)))
 
-        if only_dryrun:
-            logger.info('ALM_datapoint.write_ALM_screen(): only dryrun. =>no change in DMS...')
+        rows_list = []
+        for alm, screen in unwritten_screens_dict.items():
+            for dms_key, new_value in self._get_ALM_screen_values(alm_dp=alm, psc_filename=screen):
+                if output_format == 'dms':
+                    rows_list.append(_get_dms_row(dms_key, new_value))
+                else:
+                    old_value = self._alm_screen_allkeys_dict.get(dms_key)
+                    if old_value != new_value:
+                        if old_value is not None:
+                            rows_list.append('-' + _get_dms_row(dms_key, old_value))
+                        rows_list.append('+' + _get_dms_row(dms_key, new_value))
+
+        if output_fullpath:
+            # (same encoding as DMS exportfiles and DMS_backupfile)
+            with open(output_fullpath, mode='w', encoding=DMS_EXPORTFILE_ENCODING) as f:
+                for row in rows_list:
+                    f.write("".join([row, "\n"]))
+            logger.info('ALM_datapoint.export_changes(): wrote ' + str(len(rows_list)) + ' rows into "' + output_fullpath + '"')
         else:
-            if len(unwritten_screens_dict):
-                logger.info('ALM_datapoint.write_ALM_screen(): =>write changed screen-mappings into DMS...')
-                # iteration over dictionary: https://stackoverflow.com/questions/26660654/how-do-i-print-the-key-value-pairs-of-a-dictionary-in-python
-                for alm, screen in unwritten_screens_dict.items():
-                    self._write_ALM_screen(alm_dp=alm, psc_filename=screen)
-                logger.info('ALM_datapoint.write_ALM_screen(): done. :-)')
-            else:
-                logger.info('ALM_datapoint.write_ALM_screen(): =>nothing to do...')
+            for row in rows_list:
+                logger.info('ALM_datapoint.export_changes(): ' + row)
 
 
-    def _write_ALM_screen(self, alm_dp, psc_filename):
-        # write ALM screen mapping
+    def _get_ALM_screen_values(self, alm_dp, psc_filename):
+        # all DMS keys of ALM screen mapping with their values (in order of writing)
         # warning: new datapoints generated by PET v1.7 (additionally to datapoint "ALM:Screen")
         #   "ALM:Screen:GcName"
         #   "ALM:Screen:ReInit"
         # =>current observation: it contains always rootlevel nodes of DMS tree (name of PLC) of the ALM datapoint
         # =>FIXME: it's meaning is not known, perhaps a future feature, or used for layer-filtering in GE?!?
         plc_str = alm_dp.split(':')[0]
+        values_list = []
         for subkey_str, curr_value in [("ALM:Screen", psc_filename),
                                        ("ALM:Screen:GcName", plc_str),
                                        ("ALM:Screen:ReInit", plc_str)]:
-            # write ALM screen mapping subkey
             dms_key = ":".join([alm_dp, subkey_str])
-            response = self._dms_ws.dp_set(path=dms_key,
-                                           value=curr_value,
-                                           create=True)
-            if response[0].message:
-                logger.error('ALM_datapoint._write_ALM_screen(): DMS returned error "' + response[
-                    0].message + '" for DMS key "' + dms_key + '"')
-                raise Exception(response[0].message)
+            values_list.append((dms_key, curr_value))
+        return values_list
 
 
     def _collect_Screen(self):
         # retrieve all "ALM:Screen" datapoints
-        responses = self._dms_ws.dp_get(path='',
-                                        query=connector.Query(regExPath="^(?!BMO).*:ALM:Screen(:[\w]+)?",
-                                                        isType="string",
-                                                        maxDepth=-1))
+        with self._metrics.phase('_collect_Screen'):
+            self._process_Screen(self._dms_ws.dp_get(**self._get_Screen_request()))
+        self._is_Screen_complete = True
+
+
+    def verify_Screen(self, psc_analyzer, max_inflight=1):
+        # instead of _collect_Screen(): only "ALM:Screen" keys of ALM datapoints
+        # with a wanted screen-mapping different from ALM_snapshot are read from DMS
+        # =>all other ALM datapoints are assumed to have their snapshot values in DMS
+        # =>up to "max_inflight" ALM datapoints are read in parallel (same window as in DMS_writer)
+        with self._metrics.phase('_verify_Screen'):
+            snapshot_dict = self._snapshot.get_mapping()
+            unchanged_list = []
+            alm_dps_list = []
+            for alm_dp, screen_plc in self.get_screen_mapping(psc_analyzer).items():
+                if snapshot_dict.get(alm_dp) == screen_plc:
+                    unchanged_list.append((alm_dp, screen_plc[0]))
+                else:
+                    alm_dps_list.append(alm_dp)
+
+            if len(alm_dps_list) > SNAPSHOT_VERIFY_LIMIT:
+                logger.info('ALM_datapoint.verify_Screen(): ' + str(len(alm_dps_list)) + ' ALM datapoints with changed screen-mapping, reading all "ALM:Screen" keys from DMS instead...')
+                self._collect_Screen()
+                return
+
+            for alm_dp, psc_filename in unchanged_list:
+                for dms_key, value in self._get_ALM_screen_values(alm_dp=alm_dp, psc_filename=psc_filename):
+                    self._alm_screen_allkeys_dict[dms_key] = value
+                self._alm_screen_dict[alm_dp] = psc_filename
+            logger.info('ALM_datapoint.verify_Screen(): reading "ALM:Screen" keys of ' + str(len(alm_dps_list)) + ' ALM datapoints with changed screen-mapping from DMS...')
+            self._metrics.add('screens_verified', len(alm_dps_list))
+
+            requests_list = [self._get_Screen_request(alm_dp + ':ALM:Screen') for alm_dp in alm_dps_list]
+            max_inflight = min(max(1, max_inflight), len(requests_list))
+            if max_inflight > 1:
+                # (responses are processed in order of ALM datapoints, log records of pool threads belong to batch target of calling thread)
+                _make_sending_threadsafe(self._dms_ws)
+                target_name = _get_batch_target()
+                with concurrent.futures.ThreadPoolExecutor(max_workers=max_inflight) as executor:
+                    responses_iter = executor.map(lambda request: _call_in_batch_target(target_name, self._dms_ws.dp_get, **request),
+                                                  requests_list)
+                    responses_list = list(responses_iter)
+            else:
+                responses_list = [self._dms_ws.dp_get(**request) for request in requests_list]
+            # (missing keys: DMS answers with an error code)
+            self._process_Screen(respget for responses in responses_list for respget in responses
+                                 if respget.code == 'ok')
+
+
+    def _get_Screen_request(self, path=''):
+        # keyword arguments of dp_get() for retrieving all "ALM:Screen" datapoints (or all of one ALM datapoint)
+        return {'path': path,
+                'query': _get_connector().Query(regExPath="^(?!BMO).*:ALM:Screen(:[\w]+)?",
+                                         isType="string",
+                                         maxDepth=-1)}
+
+
+    def _process_Screen(self, responses):
+        # full backup is streamed while processing DMS responses
+        backup_file = self._backup_file if self._backup_file and self._backup_file.mode == BACKUP_MODE_FULL else None
+        try:
+            nof_keys = self._process_Screen_responses(responses, backup_file)
+        except BaseException:
+            # (also on KeyboardInterrupt: no unfinished backupfile is left in "cfg" folder)
+            if backup_file:
+                backup_file.abort()
+            raise
+        self._metrics.add('screen_keys_read', nof_keys)
+        if backup_file:
+            with self._metrics.phase('backup'):
+                backup_file.close()
+
+        logger.info('ALM_datapoint._process_Screen(): found ' + str(len(self._alm_screen_dict)) + ' ALM datapoints with "Screen" mapping.')
+
+
+    def _process_Screen_responses(self, responses, backup_file):
+        # returns number of DMS keys in responses
         exclusion = ('System', 'GE')
+        nof_keys = 0
         for respget in responses:
+            nof_keys += 1
             # logger.debug('FOO: type(respget)=' + repr(type(respget)) + ', respget=' + repr(respget))
             if not respget.path.startswith(exclusion):
                 alm_dp = respget.path.split(':ALM:Screen')[0]
@@ -401,76 +2402,654 @@ class ALM_datapoint(object):
 
                     # save found DMS keys for backupfile
                     self._alm_screen_allkeys_dict[respget.path] = respget.value
+                    if backup_file:
+                        backup_file.write_row(respget.path, respget.value)
                 elif respget.path.endswith(':ALM:Screen:GcName') or respget.path.endswith(':ALM:Screen:ReInit'):
                     # PET v1.7 subkey
                     # save found DMS keys for backupfile
                     self._alm_screen_allkeys_dict[respget.path] = respget.value
+                    if backup_file:
+                        backup_file.write_row(respget.path, respget.value)
                 else:
-                    logger.warning('ALM_datapoint._collect_Screen(): found unexpected DMS key "' + respget.path + '"... Perhaps new feature in ProMoS NT(R)?')
-
-        logger.info('ALM_datapoint._collect_Screen(): found ' + str(len(self._alm_screen_dict)) + ' ALM datapoints with "Screen" mapping.')
+                    logger.warning('ALM_datapoint._process_Screen_responses(): found unexpected DMS key "' + respget.path + '"... Perhaps new feature in ProMoS NT(R)?')
+        return nof_keys
 
 
-    def export_into_backupfile(self, project_path):
-        # format of DMS importfiles: <DMS-key>;<DMS-datatype>;<DMS-value>;<DMS-rights>
-        # =>our case: datatype and rights are fixed values
+    def _write_backup_changes(self, unwritten_screens_dict):
+        # old values of all DMS keys which are about to be overwritten (new DMS keys have no old value)
+        with self._metrics.phase('backup'):
+            try:
+                for alm, screen in unwritten_screens_dict.items():
+                    for dms_key, new_value in self._get_ALM_screen_values(alm_dp=alm, psc_filename=screen):
+                        old_value = self._alm_screen_allkeys_dict.get(dms_key)
+                        if old_value is not None and old_value != new_value:
+                            self._backup_file.write_row(dms_key, old_value)
+            except BaseException:
+                self._backup_file.abort()
+                raise
+            self._backup_file.close()
 
-        export_fname = 'PSC_to_ALM_Mapper_' + time.strftime("%Y-%m-%d_%H.%M.%S", time.localtime()) + '_old_values.dms'
-        export_fullpath = os.path.join(project_path, 'cfg', export_fname)
-        with open(export_fullpath , mode='w') as f:
-            for key, value in self._alm_screen_allkeys_dict.items():
-                row = ";".join([key, "STR", value, "RW"])
-                f.write("".join([row, "\n"]))
-        logger.info('ALM_datapoint.export_into_backupfile(): wrote ' + str(len(self._alm_screen_allkeys_dict)) + ' DMS datapoints into "' + export_fullpath + '"')
 
+    def export_into_backupfile(self, project_path):
+        # all "ALM:Screen" DMS keys read from DMS into a DMS importfile in "cfg" folder of project
+        # (same as streamed backupfile of BACKUP_MODE_FULL, e.g. for callers collecting without backupfile)
+        backup_file = DMS_backupfile(project_path=project_path, mode=BACKUP_MODE_FULL)
+        try:
+            for dms_key, value in self._alm_screen_allkeys_dict.items():
+                backup_file.write_row(dms_key, value)
+        except BaseException:
+            backup_file.abort()
+            raise
+        backup_file.close()
+
+
+
+class PSC_dirwatcher(object):
+    """ detects new, changed and removed PSC files by polling the PSC folder """
+    # modification time and size of all PSC files are compared with the previous scan,
+    # a change is reported when the PSC file was unchanged during one more poll interval
+    # (GE could be still writing this PSC file)
+
+    def __init__(self, psc_path, psc_discovery=None):
+        self._psc_path = psc_path
+        self._discovery = psc_discovery or PSC_discovery()
+
+        # key: PSC-filename // value: (modification time, size) of last reported state
+        self._known_dict = self._scan()
+
+        # key: PSC-filename // value: (modification time, size) or None for removed PSC file, not yet reported
+        self._pending_dict = {}
+
+    def _scan(self):
+        stat_dict = {}
+        for entry in self._discovery.scan(self._psc_path):
+            try:
+                stat = entry.stat()
+                stat_dict[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                # PSC file was removed during scan
+                pass
+        return stat_dict
+
+    def poll(self):
+        # returns sorted list of PSC-filenames which were added, changed or removed since last report
+        curr_dict = self._scan()
+        changed_list = []
+        for fullpath in set(self._known_dict) | set(curr_dict) | set(self._pending_dict):
+            curr_stat = curr_dict.get(fullpath)
+            if curr_stat == self._known_dict.get(fullpath):
+                # unchanged (or changed back)
+                self._pending_dict.pop(fullpath, None)
+            elif fullpath in self._pending_dict and self._pending_dict[fullpath] == curr_stat:
+                # change is complete
+                del self._pending_dict[fullpath]
+                if curr_stat:
+                    self._known_dict[fullpath] = curr_stat
+                else:
+                    del self._known_dict[fullpath]
+                changed_list.append(fullpath)
+            else:
+                self._pending_dict[fullpath] = curr_stat
+        return sorted(changed_list)
 
 
-def main(dms_server, dms_port, only_dryrun, write_backupfile):
-    with connector.DMSClient(whois_str='visitoolkit',
-                                        user_str='psc2alm',
-                                        dms_host_str=dms_server,
-                                        dms_port_int=dms_port) as dms_ws:
-        logger.info('main(): established WebSocket connection to DMS version ' + dms_ws.dp_get(path='System:Version:dms.exe')[0].value)
 
-        project_str = dms_ws.dp_get(path='System:Project')[0].value
-        logger.info('main(): working in project "' + project_str + '"...')
+class ALM_screen_watcher(object):
+    """ keeps screen-mapping of ALM datapoints up to date after changes in PSC files or DMS """
+    # state of PSC_Analyzer and ALM_datapoint stays in memory,
+    # every change leads to a new choice of PSC file only for affected BMO instances and ALM datapoints:
+    # -PSC folder is polled by PSC_dirwatcher
+    # -DMS sends events of ":OBJECT" and "ALM:Screen" datapoints,
+    #  they are queued by visitoolkit_connector's event thread and handled in our thread
+    #  (DMS events wake us up immediately, PSC changes are detected within two poll intervals)
 
-        global bmo_version
-        if dms_ws.dp_get(path='BMO:MES01:OBJECT')[0].value:
-            bmo_version = BMO_VERSION_1
-            logger.info('main(): detected BMOs version 1 => using some heuristics for PSC-to-ALM-mapping...')
+    def __init__(self, dms_ws, psc_analyzer, alm_dp, poll_interval=WATCH_POLL_INTERVAL, metrics=None):
+        self._dms_ws = dms_ws
+        self._psc_analyzer = psc_analyzer
+        self._alm_dp = alm_dp
+        self._poll_interval = poll_interval
+        self._metrics = metrics or Run_metrics()
+
+        # =>start watching before first full run, then no change gets lost
+        self._dirwatcher = PSC_dirwatcher(psc_analyzer.get_PSC_path(), psc_discovery=psc_analyzer.get_discovery())
+        self._event_queue = queue.Queue()
+        self._stop_event = threading.Event()
+
+        # references are needed, DMS subscriptions get unsubscribed when their object is deleted
+        self._subscriptions_list = []
+        dms = _get_connector()
+        for request_kwargs in [alm_dp._get_OBJECT_request(), alm_dp._get_Screen_request()]:
+            sub = self._dms_ws.get_dp_subscription(event=dms.ON_CHANGE | dms.ON_CREATE | dms.ON_RENAME | dms.ON_DELETE,
+                                                   **request_kwargs)
+            sub += self._on_dms_event
+            self._subscriptions_list.append(sub)
+
+    def _on_dms_event(self, event):
+        # called by event thread of visitoolkit_connector
+        self._event_queue.put(event)
+
+    def run(self, only_dryrun=False, max_inflight=1, max_rate=0):
+        # handles changes until stop() is called or user presses Ctrl+C
+        logger.info('ALM_screen_watcher.run(): watching PSC files and DMS for changes... (stop with Ctrl+C)')
+        next_poll = time.perf_counter()
+        try:
+            while not self._stop_event.is_set():
+                # waiting for next DMS event or next scan of PSC folder, then taking all queued events at once
+                events_list = []
+                try:
+                    events_list.append(self._event_queue.get(timeout=max(0.0, next_poll - time.perf_counter())))
+                    while True:
+                        events_list.append(self._event_queue.get_nowait())
+                except queue.Empty:
+                    pass
+
+                changed_list = []
+                if time.perf_counter() >= next_poll:
+                    changed_list = self._dirwatcher.poll()
+                    next_poll = time.perf_counter() + self._poll_interval
+
+                if changed_list or events_list:
+                    self.process(changed_list, events_list, only_dryrun=only_dryrun, max_inflight=max_inflight, max_rate=max_rate)
+        except KeyboardInterrupt:
+            logger.info('ALM_screen_watcher.run(): stopped by user.')
+        finally:
+            for sub in self._subscriptions_list:
+                try:
+                    sub.unsubscribe()
+                except Exception as ex:
+                    logger.warning('ALM_screen_watcher.run(): unsubscribing failed: ' + repr(ex))
+            self._subscriptions_list = []
+
+    def stop(self):
+        self._stop_event.set()
+
+    def process(self, changed_fullpaths, dms_events, only_dryrun=False, max_inflight=1, max_rate=0):
+        # remaps all ALM datapoints affected by these changes
+        start = time.perf_counter()
+        with self._metrics.phase('watch_update'):
+            alm_dps_list = []
+            if changed_fullpaths:
+                bmo_instances = self._psc_analyzer.update_files(changed_fullpaths)
+                alm_dps_list.extend(self._alm_dp.get_ALM_datapoints(bmo_instances))
+            for event in dms_events:
+                alm_dps_list.extend(self._alm_dp.update_from_event(event))
+        self._metrics.add('watch_events', len(changed_fullpaths) + len(dms_events))
+
+        # ALM datapoints without duplicates, in order of appearance
+        alm_dps = list(collections.OrderedDict.fromkeys(alm_dps_list))
+        if alm_dps:
+            try:
+                self._alm_dp.write_ALM_screen(self._psc_analyzer, only_dryrun, max_inflight=max_inflight, max_rate=max_rate, alm_dps=alm_dps)
+            except Exception:
+                # errors in DMS should not stop watching
+                logger.exception('ALM_screen_watcher.process(): writing into DMS failed!')
+        logger.debug('ALM_screen_watcher.process(): handled ' + str(len(changed_fullpaths)) + ' PSC files and ' + str(len(dms_events)) + ' DMS events in ' + str(round(time.perf_counter() - start, 3)) + ' seconds.')
+
+
+
+def _get_system_info(dms_ws, dms_async=None):
+    # returns DMS version, project path and value of "BMO:MES01:OBJECT" (used for detection of BMO version)
+    # =>with "dms_async" all requests are sent at the same time
+    if dms_async:
+        async def _get_all():
+            return await asyncio.gather(*[dms_async.dp_get(path=dms_key) for dms_key in _SYSTEM_INFO_DMSKEYS])
+        responses_list = asyncio.run(_get_all())
+    else:
+        responses_list = [dms_ws.dp_get(path=dms_key) for dms_key in _SYSTEM_INFO_DMSKEYS]
+    return [responses[0].value for responses in responses_list]
+
+
+def _set_bmo_version(bmo_object_str):
+    # value of "BMO:MES01:OBJECT" exists only in projects with BMOs version 1
+    # (returns detected version, it's given to PSC_Analyzer too: module setting is shared by all targets in batch mode)
+    global bmo_version
+    if bmo_object_str:
+        bmo_version = BMO_VERSION_1
+        logger.info('main(): detected BMOs version 1 => using some heuristics for PSC-to-ALM-mapping...')
+    else:
+        bmo_version = BMO_VERSION_2
+        logger.info('main(): detected BMOs version 2 => using PSC filename convention for PSC-to-ALM-mapping...')
+    return bmo_version
+
+
+class Run_options(object):
+    """ options of one run: main(), main_offline(), main_batch() and watch mode """
+    # one object instead of a long list of keyword arguments, so every mode gets the same options
+    # (defaults are the same as on command line, unknown options raise TypeError)
+    _DEFAULTS = collections.OrderedDict([
+        # DMS server and actions
+        ('dms_server', '127.0.0.1'),
+        ('dms_port', 9020),
+        ('project_path', None),
+        ('only_dryrun', False),
+        ('write_window', 1),
+        ('write_rate', 0),
+        ('use_async', False),
+        ('metrics_file', None),
+        # backupfile and snapshot
+        ('write_backupfile', False),
+        ('backup_mode', BACKUP_MODE_FULL),
+        ('backup_compress', False),
+        ('backup_keep', None),
+        ('backup_days', None),
+        ('snapshot_file', None),
+        ('reconcile', False),
+        ('reconcile_days', SNAPSHOT_RECONCILE_DAYS),
+        # PSC files
+        ('nof_workers', 1),
+        ('use_threads', False),
+        ('cache_file', None),
+        ('psc_discovery', None),
+        ('link_ranking', LINK_RANKING_INDEGREE),
+        ('start_images', None),
+        ('link_graph_file', None),
+        ('link_graph_in_file', None),
+        # watch mode
+        ('watch', False),
+        ('poll_interval', WATCH_POLL_INTERVAL),
+        # offline mode
+        ('export_file', None),
+        ('output_file', None),
+        ('output_format', 'diff'),
+        ('encoding', DMS_EXPORTFILE_ENCODING),
+        # batch mode
+        ('batch_file', None),
+        ('nof_targets', 4),
+        ('log_path', None),
+    ])
+
+    def __init__(self, **kwargs):
+        for name in kwargs:
+            if not name in self._DEFAULTS:
+                raise TypeError('Run_options(): unknown option "' + name + '"')
+        for name, default in self._DEFAULTS.items():
+            setattr(self, name, kwargs.get(name, default))
+
+    @classmethod
+    def from_args(cls, args, **kwargs):
+        # options from argparse.Namespace (other attributes of command line are ignored), "kwargs" take precedence
+        options_dict = {name: value for name, value in vars(args).items() if name in cls._DEFAULTS}
+        options_dict.update(kwargs)
+        return cls(**options_dict)
+
+    def replace(self, **kwargs):
+        # copy with some changed options (e.g. DMS server of a batch target)
+        options_dict = self.as_dict()
+        options_dict.update(kwargs)
+        return Run_options(**options_dict)
+
+    def as_dict(self):
+        return collections.OrderedDict((name, getattr(self, name)) for name in self._DEFAULTS)
+
+
+
+def _get_psc_cache(cache_file, project_path):
+    # PSC_cache object or None when cache is not used
+    if cache_file is None:
+        return None
+    if not cache_file:
+        # default location of cachefile is next to DMS backupfiles
+        cache_file = os.path.join(project_path, 'cfg', 'PSC_to_ALM_Mapper_cache.json')
+    return PSC_cache(cache_fullpath=cache_file)
+
+
+def _get_snapshot(snapshot_file, project_path, dms_server, dms_port):
+    # ALM_snapshot object or None when snapshot is not used
+    if snapshot_file is None:
+        return None
+    if not snapshot_file:
+        # default location is next to DMS backupfiles, one snapshot per DMS (e.g. redundant DMS servers of same project)
+        snapshot_file = os.path.join(project_path, 'cfg', 'PSC_to_ALM_Mapper_snapshot_' + re.sub(r'\W', '_', dms_server + '_' + str(dms_port)) + '.sqlite')
+    return ALM_snapshot(snapshot_fullpath=snapshot_file, dms_target=dms_server + ':' + str(dms_port))
+
+
+def main(options, metrics=None, psc_cache=None):
+    # mapping of one DMS server with Run_options "options" (watch mode: keeps running)
+    # (batch mode gives its own Run_metrics object and a PSC_sharedcache to every target)
+    metrics = metrics or Run_metrics()
+    with contextlib.ExitStack() as exit_stack:
+        with metrics.phase('connect'):
+            dms_client = exit_stack.enter_context(_get_connector().DMSClient(whois_str='visitoolkit',
+                                                                             user_str='psc2alm',
+                                                                             dms_host_str=options.dms_server,
+                                                                             dms_port_int=options.dms_port))
+            # DMSClient establishes WebSocket connection in a background thread,
+            # connect time lasts until it's ready for sending (otherwise it would be counted in first DMS request)
+            if not dms_client.ready_to_send.wait(timeout=DMS_CONNECT_TIMEOUT):
+                raise IOError('main(): no WebSocket connection to DMS "' + options.dms_server + ':' + str(options.dms_port) + '" within ' + str(DMS_CONNECT_TIMEOUT) + ' seconds!')
+        # counting all requests to DMS
+        dms_ws = DMS_meteredclient(dms_client, metrics)
+        dms_async = None
+        if options.use_async:
+            dms_async = DMS_asyncclient(dms_ws)
+            # (thread pool is closed after collecting, on errors by ExitStack)
+            exit_stack.callback(dms_async.close)
+
+        with metrics.phase('bmo_detection'):
+            version_str, project_str, bmo_object_str = _get_system_info(dms_ws, dms_async)
+            logger.info('main(): established WebSocket connection to DMS version ' + version_str)
+            project_path = options.project_path or project_str
+            logger.info('main(): working in project "' + project_path + '"...')
+            curr_bmo_version = _set_bmo_version(bmo_object_str)
+
+        psc_cache = psc_cache or _get_psc_cache(options.cache_file, project_path)
+        # (facts of all PSC files are needed only for watch mode and link graph)
+        psc_analyzer = PSC_Analyzer(project_path=project_path,
+                                    metrics=metrics,
+                                    bmo_version=curr_bmo_version,
+                                    link_ranking=options.link_ranking,
+                                    start_images=options.start_images,
+                                    psc_discovery=options.psc_discovery,
+                                    keep_psc_facts=options.watch or bool(options.link_graph_file),
+                                    link_graph=PSC_linkgraph.read_json(options.link_graph_in_file) if options.link_graph_in_file else None)
+        backup_file = None
+        if options.write_backupfile:
+            backup_file = DMS_backupfile(project_path=project_path,
+                                         mode=options.backup_mode,
+                                         compress=options.backup_compress,
+                                         keep_last=options.backup_keep,
+                                         keep_days=options.backup_days)
+        alm_snapshot = _get_snapshot(options.snapshot_file, project_path, options.dms_server, options.dms_port)
+        # routine run: only "ALM:Screen" keys of changed screen-mappings are read from DMS,
+        # full reconciliation reads all of them (a full backup needs them anyway)
+        only_verify = bool(alm_snapshot) and not (options.reconcile or
+                                                  alm_snapshot.is_reconcile_due(options.reconcile_days) or
+                                                  (options.write_backupfile and options.backup_mode == BACKUP_MODE_FULL))
+        if alm_snapshot and not only_verify:
+            logger.info('main(): full reconciliation of all screen-mappings in DMS...')
+        alm_dp = ALM_datapoint(dms_ws, metrics=metrics, backup_file=backup_file, snapshot=alm_snapshot)
+        alm_watcher = None
+        if options.watch:
+            alm_watcher = ALM_screen_watcher(dms_ws, psc_analyzer, alm_dp, poll_interval=options.poll_interval, metrics=metrics)
+        target_name = _get_batch_target()
+        def analyze_func():
+            # (in async mode this runs in another thread, its logs should belong to same batch target)
+            with _batch_target(target_name), metrics.phase('analyze'):
+                psc_analyzer.analyze(nof_workers=options.nof_workers, use_threads=options.use_threads, psc_cache=psc_cache)
+        if dms_async:
+            # analyzing PSC files while waiting for DMS responses
+            async def _analyze_and_collect():
+                analyze_future = asyncio.get_running_loop().run_in_executor(None, analyze_func)
+                try:
+                    await alm_dp.collect_async(dms_async, with_Screen=not only_verify)
+                finally:
+                    # (analyzing thread has to be finished before leaving, also when collecting failed)
+                    await analyze_future
+            asyncio.run(_analyze_and_collect())
+            dms_async.close()
         else:
-            bmo_version = BMO_VERSION_2
-            logger.info('main(): detected BMOs version 2 => using PSC filename convention for PSC-to-ALM-mapping...')
+            analyze_func()
+            alm_dp.collect(with_Screen=not only_verify)
+        if only_verify:
+            alm_dp.verify_Screen(psc_analyzer, max_inflight=options.write_window)
+        if options.link_graph_file:
+            psc_analyzer.get_link_graph().write_json(options.link_graph_file)
 
-        psc_analyzer = PSC_Analyzer(project_path=project_str)
-        psc_analyzer.analyze()
+        alm_dp.write_ALM_screen(psc_analyzer, options.only_dryrun, max_inflight=options.write_window, max_rate=options.write_rate)
 
-        alm_dp = ALM_datapoint(dms_ws)
-        alm_dp.collect()
-        if write_backupfile:
-            alm_dp.export_into_backupfile(project_path=project_str)
-
-        alm_dp.write_ALM_screen(psc_analyzer, only_dryrun)
+        if alm_watcher:
+            alm_watcher.run(options.only_dryrun, max_inflight=options.write_window, max_rate=options.write_rate)
 
+        metrics.log_summary()
+        if options.metrics_file:
+            metrics.write_json(options.metrics_file)
         logger.info('Quitting "PSC_to_ALM_Mapper"...')
 
     return 0        # success
 
 
+def main_offline(options):
+    # same mapping as main(), but DMS datapoints are taken from a DMS exportfile
+    # =>no connection to DMS, result is a diff or a DMS importfile
+    # (Run_options with "export_file")
+    metrics = Run_metrics()
+    dms_exportfile = DMS_exportfile(options.export_file, encoding=options.encoding)
+    with metrics.phase('read_exportfile'):
+        dms_exportfile.read()
+
+    with metrics.phase('bmo_detection'):
+        version_str, project_str, bmo_object_str = [dms_exportfile.get_value(dms_key) for dms_key in _SYSTEM_INFO_DMSKEYS]
+        project_path = options.project_path or project_str
+        if not project_path:
+            raise Exception('DMS exportfile "' + options.export_file + '" contains no "System:Project", please give project folder as argument!')
+        logger.info('main_offline(): working in project "' + project_path + '"...')
+        curr_bmo_version = _set_bmo_version(bmo_object_str)
+
+    psc_analyzer = PSC_Analyzer(project_path=project_path,
+                                metrics=metrics,
+                                bmo_version=curr_bmo_version,
+                                link_ranking=options.link_ranking,
+                                start_images=options.start_images,
+                                psc_discovery=options.psc_discovery,
+                                keep_psc_facts=bool(options.link_graph_file),
+                                link_graph=PSC_linkgraph.read_json(options.link_graph_in_file) if options.link_graph_in_file else None)
+    with metrics.phase('analyze'):
+        psc_analyzer.analyze(nof_workers=options.nof_workers, use_threads=options.use_threads, psc_cache=_get_psc_cache(options.cache_file, project_path))
+    if options.link_graph_file:
+        psc_analyzer.get_link_graph().write_json(options.link_graph_file)
+
+    alm_dp = ALM_datapoint(dms_ws=None, metrics=metrics)
+    alm_dp.collect_offline(dms_exportfile)
+    alm_dp.export_changes(psc_analyzer, output_fullpath=options.output_file, output_format=options.output_format)
+
+    metrics.log_summary()
+    if options.metrics_file:
+        metrics.write_json(options.metrics_file)
+    logger.info('Quitting "PSC_to_ALM_Mapper"...')
+    return 0        # success
+
+
+def run(options):
+    # one entry point for all modes: batch mode, offline mode or one DMS server (optionally in watch mode)
+    if options.batch_file:
+        return main_batch(options)
+    elif options.export_file:
+        return main_offline(options)
+    else:
+        return main(options)
+
+
+# name of batch target handled by current thread (see _batch_target())
+_batch_local = threading.local()
+
+# one target in batch mode: DMS server with optional project folder (default: "System:Project" in DMS)
+Batch_target = collections.namedtuple('Batch_target', ['dms_server', 'dms_port', 'project_path'])
+
+
+def _get_batch_target():
+    return getattr(_batch_local, 'target_name', None)
+
+
+@contextlib.contextmanager
+def _batch_target(target_name):
+    # all log records of current thread belong to this batch target
+    prev_name = _get_batch_target()
+    _batch_local.target_name = target_name
+    try:
+        yield
+    finally:
+        _batch_local.target_name = prev_name
+
+
+def _call_in_batch_target(target_name, func, *args, **kwargs):
+    # calls "func" in batch target of submitting thread
+    # =>thread-local target is lost in threads of executors, target has to be taken at submission
+    with _batch_target(target_name):
+        return func(*args, **kwargs)
+
+
+class Batch_target_filter(logging.Filter):
+    """ adds batch target to log records (attribute "target"), optionally passes only records of one target """
+    def __init__(self, target_name=None):
+        super().__init__()
+        self._target_name = target_name
+
+    def filter(self, record):
+        # (filters are called in thread of logging call, so the thread-local target is the right one)
+        record.target = _get_batch_target() or '-'
+        return self._target_name is None or record.target == self._target_name
+
+
+def _read_batchfile(batch_file):
+    # one target per line: "<DMS server> <DMS port> [<project folder>]", empty lines and lines starting with "#" are ignored
+    # (project folder is the remainder of the line, so it may contain spaces)
+    targets_list = []
+    with open(batch_file, mode='r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split(None, 2)
+            try:
+                dms_port = int(fields[1])
+            except (IndexError, ValueError):
+                raise ValueError('batchfile "' + batch_file + '", line ' + str(line_no) + ': expected "<DMS server> <DMS port> [<project folder>]", got "' + line + '"')
+            targets_list.append(Batch_target(dms_server=fields[0],
+                                             dms_port=dms_port,
+                                             project_path=fields[2] if len(fields) > 2 else None))
+    return targets_list
+
+
+def _run_batch_target(target, psc_cache, options):
+    # main() for one target, returns its outcome for summary of main_batch()
+    target_name = target.dms_server + ':' + str(target.dms_port)
+    metrics = Run_metrics()
+    status_str = 'ok'
+    file_handler = None
+    with _batch_target(target_name):
+        if options.log_path:
+            # logfile with all log records of this target
+            file_handler = logging.FileHandler(os.path.join(options.log_path, re.sub(r'\W', '_', target_name) + '.log'), encoding='utf-8')
+            file_handler.setFormatter(formatter)
+            file_handler.addFilter(Batch_target_filter(target_name))
+            logger.addHandler(file_handler)
+        try:
+            # (metrics of all targets are written by main_batch())
+            main(options.replace(dms_server=target.dms_server,
+                                 dms_port=target.dms_port,
+                                 project_path=target.project_path,
+                                 metrics_file=None),
+                 metrics=metrics,
+                 psc_cache=psc_cache)
+        except Exception as ex:
+            # other targets are not affected
+            logger.exception('main_batch(): mapping of "' + target_name + '" failed!')
+            status_str = 'failed: ' + repr(ex)
+        finally:
+            if file_handler:
+                metrics.write_json(os.path.join(options.log_path, re.sub(r'\W', '_', target_name) + '_metrics.json'))
+                logger.removeHandler(file_handler)
+                file_handler.close()
+    return target_name, status_str, metrics.as_dict()
+
+
+def main_batch(options):
+    # main() for all targets in batchfile "batch_file" of Run_options, "nof_targets" of them at the same time
+    # =>every target has its own logfile and metrics in "log_path",
+    #   PSC files are parsed only once for all targets (e.g. same project on redundant DMS servers, or library images)
+    targets_list = _read_batchfile(options.batch_file)
+    logger.info('main_batch(): mapping ' + str(len(targets_list)) + ' targets with ' + str(options.nof_targets) + ' workers...')
+    if options.log_path:
+        os.makedirs(options.log_path, exist_ok=True)
+    psc_cache = PSC_sharedcache()
+
+    # console shows batch target of every log record
+    console_filter = Batch_target_filter()
+    ch.addFilter(console_filter)
+    ch.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(target)s] %(message)s'))
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=options.nof_targets) as executor:
+            results_list = list(executor.map(lambda target: _run_batch_target(target, psc_cache, options), targets_list))
+    finally:
+        ch.removeFilter(console_filter)
+        ch.setFormatter(formatter)
+
+    print('{:<30} {:>10} {:>8} {:>8} {:>8}  {}'.format('target', 'seconds', 'parsed', 'cached', 'writes', 'status'))
+    for target_name, status_str, metrics_dict in results_list:
+        counters_dict = metrics_dict['counters']
+        print('{:<30} {:>10.1f} {:>8} {:>8} {:>8}  {}'.format(target_name,
+                                                              metrics_dict['total']['wall_s'],
+                                                              counters_dict.get('files_parsed', 0),
+                                                              counters_dict.get('files_cached', 0),
+                                                              counters_dict.get('dms_writes', 0),
+                                                              status_str))
+    if options.metrics_file:
+        with open(options.metrics_file, mode='w', encoding='utf-8') as f:
+            json.dump(collections.OrderedDict((target_name, metrics_dict) for target_name, status_str, metrics_dict in results_list), f, indent=2)
+
+    nof_failed = sum(1 for target_name, status_str, metrics_dict in results_list if status_str != 'ok')
+    logger.info('main_batch(): ' + str(len(results_list) - nof_failed) + ' targets successful, ' + str(nof_failed) + ' targets failed.')
+    return 1 if nof_failed else 0
+
+
 if __name__ == '__main__':
+    # needed for worker processes in frozen executable (PyInstaller) on Windows
+    multiprocessing.freeze_support()
+
     parser = argparse.ArgumentParser(description='Mapping most accurate PSC image to ALM datapoint (used in "Alarm-Viewer")')
 
     parser.add_argument('--backup', '-b', action='store_true', dest='write_backupfile', default=False, help='export DMS backupfile of PSC mappings (default: False)')
+    parser.add_argument('--backup_mode', dest='backup_mode', default=BACKUP_MODE_FULL, choices=BACKUP_MODES, help='content of DMS backupfile: all screen-mappings or only old values of changed DMS keys (default: ' + BACKUP_MODE_FULL + ')')
+    parser.add_argument('--backup_gzip', action='store_true', dest='backup_compress', default=False, help='compress DMS backupfile with gzip (default: False)')
+    parser.add_argument('--backup_keep', dest='backup_keep', default=None, type=int, help='keep only this number of newest DMS backupfiles (default: keep all)')
+    parser.add_argument('--backup_days', dest='backup_days', default=None, type=float, help='keep DMS backupfiles of this number of days (together with --backup_keep: files matching any rule are kept, default: keep all)')
+    parser.add_argument('--snapshot', dest='snapshot_file', nargs='?', const='', default=None, type=str, help='compare with applied screen-mappings in this SQLite file and read only changed ones from DMS (default location without filename: <project>\\cfg\\PSC_to_ALM_Mapper_snapshot_<DMS server>_<DMS port>.sqlite)')
+    parser.add_argument('--reconcile', action='store_true', dest='reconcile', default=False, help='with --snapshot: read all screen-mappings from DMS in this run (default: False)')
+    parser.add_argument('--reconcile_days', dest='reconcile_days', default=SNAPSHOT_RECONCILE_DAYS, type=float, help='with --snapshot: read all screen-mappings from DMS when last full reconciliation is older (default: ' + str(SNAPSHOT_RECONCILE_DAYS) + ')')
     parser.add_argument('--dryrun', '-d', action='store_true', dest='only_dryrun', default=False, help='no writes into DMS, only print statistics (default: False)')
     parser.add_argument('--dms_servername', '-s', dest='dms_server', default='127.0.0.1', type=str, help='hostname or IP address for DMS JSON Data Exchange (default: 127.0.0.1)')
     parser.add_argument('--dms_port', '-p', dest='dms_port', default=9020, type=int, help='TCP port for DMS JSON Data Exchange (default: 9020)')
+    parser.add_argument('--workers', '-w', dest='nof_workers', default=1, type=int, help='number of parallel workers for parsing PSC files (default: 1)')
+    parser.add_argument('--threads', action='store_true', dest='use_threads', default=False, help='use threads instead of processes as parallel workers, e.g. for PSC files on network shares (default: False)')
+    parser.add_argument('--cache', '-c', dest='cache_file', nargs='?', const='', default=None, type=str, help='reuse results of unchanged PSC files from this cachefile (default location without filename: <project>\\cfg\\PSC_to_ALM_Mapper_cache.json)')
+    parser.add_argument('--async', '-a', action='store_true', dest='use_async', default=False, help='send independent DMS queries at the same time and analyze PSC files meanwhile (default: False)')
+    parser.add_argument('--write_window', dest='write_window', default=1, type=int, help='number of parallel write requests into DMS, also used for reading changed screen-mappings with --snapshot (default: 1)')
+    parser.add_argument('--write_rate', dest='write_rate', default=0, type=float, help='maximum number of DMS writes per second, 0 means no limit (default: 0)')
+    parser.add_argument('--metrics_json', dest='metrics_file', default=None, type=str, help='write timings and counters of all phases into this JSON file (default: no file)')
+    parser.add_argument('--watch', action='store_true', dest='watch', default=False, help='keep running and update mappings after changes of PSC files or DMS (default: False)')
+    parser.add_argument('--poll_interval', dest='poll_interval', default=WATCH_POLL_INTERVAL, type=float, help='seconds between scans of PSC folder in watch mode (default: ' + str(WATCH_POLL_INTERVAL) + ')')
+    parser.add_argument('--offline', '-o', dest='export_file', default=None, type=str, help='offline mode: read DMS datapoints from this DMS exportfile instead of connecting to DMS (default: online)')
+    parser.add_argument('--project', dest='project_path', default=None, type=str, help='project folder (default: "System:Project" in DMS or DMS exportfile)')
+    parser.add_argument('--output', dest='output_file', default=None, type=str, help='file for result of offline mode (default: log to console)')
+    parser.add_argument('--output_format', dest='output_format', default='diff', choices=['diff', 'dms'], help='result of offline mode: "diff" of changed DMS keys or "dms" importfile (default: diff)')
+    parser.add_argument('--encoding', dest='encoding', default=DMS_EXPORTFILE_ENCODING, type=str, help='encoding of DMS exportfile (default: ' + DMS_EXPORTFILE_ENCODING + ')')
+    parser.add_argument('--link_ranking', dest='link_ranking', default=LINK_RANKING_INDEGREE, choices=LINK_RANKINGS, help='rating of links to PSC files for BMOs version 1: number of links, depth from start images or PageRank (default: ' + LINK_RANKING_INDEGREE + ')')
+    parser.add_argument('--start_image', dest='start_images', action='append', default=None, type=str, help='start image for --link_ranking depth, can be given more than once (default: all PSC files without links to them)')
+    parser.add_argument('--link_graph', dest='link_graph_file', default=None, type=str, help='export graph of links between PSC files into this JSON file (default: no file)')
+    parser.add_argument('--link_graph_in', dest='link_graph_in_file', default=None, type=str, help='rate links with graph in this JSON file (as written by --link_graph) instead of links found in PSC files (default: no file)')
+    parser.add_argument('--recursive', '-r', action='store_true', dest='recursive', default=False, help='search PSC files also in subfolders of PSC folder (default: False)')
+    parser.add_argument('--include', dest='include_patterns', action='append', default=None, type=str, help='regex for filenames of PSC files, can be given more than once (default: ' + _PSC_FILENAME_PATTERN.pattern + ')')
+    parser.add_argument('--exclude', dest='exclude_patterns', action='append', default=None, type=str, help='regex for filenames of PSC files and subfolders to skip, can be given more than once (default: none)')
+    parser.add_argument('--batch', dest='batch_file', default=None, type=str, help='batch mode: map all DMS servers in this file, one "<DMS server> <DMS port> [<project folder>]" per line (default: only one DMS server)')
+    parser.add_argument('--batch_workers', dest='nof_targets', default=4, type=int, help='number of DMS servers mapped at the same time in batch mode (default: 4)')
+    parser.add_argument('--batch_logdir', dest='log_path', default=None, type=str, help='folder for logfile and metrics of every DMS server in batch mode (default: only console)')
+    parser.add_argument('--profile', dest='profile_file', default=None, type=str, help='run with cProfile and save statistics into this file, e.g. for "snakeviz" (default: no profiling)')
 
     args = parser.parse_args()
-
-    status = main(dms_server = args.dms_server,
-                  dms_port = args.dms_port,
-                  only_dryrun = args.only_dryrun,
-                  write_backupfile = args.write_backupfile
-                  )
+    psc_discovery = PSC_discovery(include_patterns=args.include_patterns,
+                                  exclude_patterns=args.exclude_patterns,
+                                  recursive=args.recursive)
+    if args.batch_file:
+        if args.export_file or args.watch:
+            parser.error('batch mode is not available with --offline or --watch')
+        if args.cache_file is not None:
+            parser.error('batch mode uses a shared cache in memory, --cache is not available')
+        if args.link_graph_file or args.link_graph_in_file:
+            parser.error('--link_graph and --link_graph_in are not available in batch mode')
+        if args.snapshot_file:
+            parser.error('batch mode needs one snapshot per DMS server, use --snapshot without filename')
+
+    options = Run_options.from_args(args, psc_discovery=psc_discovery)
+
+    if args.profile_file:
+        # profiling of main process (worker processes are not included)
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            status = profiler.runcall(run, options)
+        finally:
+            profiler.dump_stats(args.profile_file)
+            logger.info('wrote profiling statistics into "' + args.profile_file + '"')
+    else:
+        status = run(options)
     #sys.exit(status)
\ No newline at end of file